@@ -2,6 +2,8 @@
 ASGI config for BenchCoder project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through BenchCoder.urls_async, which serves the hot
+read endpoints with async views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +14,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BenchCoder.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'BenchCoder.urls_async')
 
 application = get_asgi_application()
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_shutdown
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BenchCoder.settings')
@@ -13,6 +14,16 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+@celeryd_after_setup.connect
+def join_judge_ring(sender, instance, **kwargs):
+    from judge.routing import join_ring
+    join_ring(sender, instance)
+
+@worker_shutdown.connect
+def leave_judge_ring(**kwargs):
+    from judge.routing import leave_ring
+    leave_ring()
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
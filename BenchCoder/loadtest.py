@@ -0,0 +1,120 @@
+"""Concurrent HTTP load generator for comparing the sync and async deployments.
+
+Run each server with a single worker and point this at the same endpoint
+on both, e.g.
+
+    gunicorn --workers 1 --bind 127.0.0.1:8000 BenchCoder.wsgi:application
+    gunicorn --workers 1 -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8001 BenchCoder.asgi:application
+
+    python -m BenchCoder.loadtest http://127.0.0.1:8000/api/problems/ --token $ACCESS --concurrency 64
+    python -m BenchCoder.loadtest http://127.0.0.1:8001/api/problems/ --token $ACCESS --concurrency 64
+
+Each client sends requests back to back for --duration seconds, or
+--interval seconds apart to stand in for polling clients. The report
+gives throughput, latency percentiles and errors, which is what a single
+worker can sustain at that concurrency. Only the standard library is used
+so it runs anywhere the project does.
+
+Measured on one CPU shared with this script, SQLite and a local Redis,
+one gunicorn sync worker against one uvicorn worker with DB_CONN_MAX_AGE=0
+as in docker-compose (requests/s, p50 ms):
+
+    endpoint          clients    sync          async
+    problem list      1          265 / 3.5     83 / 11.6
+                      64         195 / 321     77 / 817
+    problem detail    1          303 / 3.2     96 / 9.0
+                      64         309 / 218     116 / 502
+    leaderboard       1          313 / 3.0     130 / 7.1
+                      64         333 / 190     148 / 416
+
+    problem detail, 16 clients, with 64 clients watching a submission:
+      sync, polling every 0.25 s       183 / 82      (320 without them)
+      async, long-polling ?wait=5                    135 / 110     (161 without them)
+
+Runs of the same setup varied by up to a third on that machine.
+
+Cached reads that never wait are cheaper on the sync worker: under ASGI
+each sync middleware and each cache or ORM call is a hop to a thread.
+What the async worker gains is that a request waiting on something costs
+it next to nothing, so status watchers barely eat into its other traffic.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def client(url, headers, deadline, latencies, errors, lock, interval=0.0):
+    request = urllib.request.Request(url, headers=headers)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            failed = False
+        except (urllib.error.URLError, OSError):
+            failed = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            if failed:
+                errors.append(elapsed)
+            else:
+                latencies.append(elapsed)
+        time.sleep(interval)
+
+
+def run(url, token=None, concurrency=32, duration=10.0, interval=0.0):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(url, headers, deadline, latencies, errors, lock, interval), daemon=True)
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': ms(statistics.median(latencies) if latencies else None),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('url')
+    parser.add_argument('--token', help="JWT access token sent as a Bearer credential")
+    parser.add_argument('--concurrency', type=int, action='append', help="Clients; repeat for a sweep")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per run")
+    parser.add_argument('--interval', type=float, default=0.0, help="Seconds each client pauses between requests")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency or [32]:
+        print(json.dumps(run(args.url, args.token, concurrency, args.duration, args.interval)))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
@@ -19,6 +20,9 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# True while running `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -41,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
@@ -50,6 +55,7 @@ INSTALLED_APPS = [
     'problems',
     'submissions',
     'judge',
+    'contests',
 ]
 
 MIDDLEWARE = [
@@ -63,7 +69,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'BenchCoder.urls'
+# The ASGI entry point switches this to BenchCoder.urls_async
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'BenchCoder.urls')
 
 TEMPLATES = [
     {
@@ -89,7 +96,9 @@ WSGI_APPLICATION = 'BenchCoder.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),  # read from .env
-        conn_max_age=600,
+        # Set to 0 under ASGI, where each request's database work may run
+        # on a different thread and persistent connections pile up
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 600)),
         ssl_require=False  # optional for local dev
     )
 }
@@ -140,7 +149,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -155,6 +164,10 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Seconds an authenticated user is served from the cache; entries are also
+# dropped whenever the user is saved
+AUTH_USER_CACHE_TIMEOUT = 300
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080", # React dev server
@@ -163,6 +176,28 @@ CORS_ALLOWED_ORIGINS = [
 
 
 
+# Pagination counts
+# Counts are cached briefly per filter signature and catalog version; tests
+# always count exactly
+PAGINATION_COUNT_CACHE_TIMEOUT = 0 if TESTING else 30
+# Above this many estimated rows the Postgres planner estimate is reported,
+# marked as approximate
+PAGINATION_ESTIMATE_THRESHOLD = 100000
+
+
+# Cache configuration
+# Shares the Redis instance used as the Celery broker; tests use local memory
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')),
+        'KEY_PREFIX': 'benchcoder',
+    }
+}
+if TESTING:
+    CACHES['default'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
 # custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -170,8 +205,9 @@ AUTH_USER_MODEL = 'users.User'
 # celery configuration
 #CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 #CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
-CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -179,4 +215,120 @@ CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TIME_LIMIT = 300  # 5 minutes
 CELERY_TASK_SOFT_TIME_LIMIT = 240  # 4 minutes
 CELERY_TASK_MAX_RETRIES = 3
-CELERY_TASK_RETRY_DELAY = 30  # 30 seconds
\ No newline at end of file
+CELERY_TASK_RETRY_DELAY = 30  # 30 seconds
+# Run tasks inline during tests so they don't need a broker
+CELERY_TASK_ALWAYS_EAGER = TESTING
+# Measurement tasks go to a low-priority lane served by its own worker so
+# they never hold up normal judging
+CELERY_TASK_ROUTES = {
+    'judge.tasks.benchmark_submission': {'queue': 'benchmark'},
+    'judge.tasks.profile_submission': {'queue': 'benchmark'},
+}
+# Judged submissions are counted into per-problem stats in batches
+PROBLEM_STATS_FLUSH_INTERVAL = int(os.environ.get('PROBLEM_STATS_FLUSH_INTERVAL', 10))  # seconds
+CELERY_BEAT_SCHEDULE = {
+    'flush-problem-stats': {
+        'task': 'submissions.tasks.flush_problem_stats_task',
+        'schedule': PROBLEM_STATS_FLUSH_INTERVAL,
+    },
+    # Corrects any drift in the cached judge backlog counter
+    'sync-judge-backlog': {
+        'task': 'submissions.tasks.sync_judge_backlog',
+        'schedule': 60,
+    },
+    # Drops judge workers that stopped answering from the routing ring
+    'refresh-judge-ring': {
+        'task': 'judge.tasks.refresh_judge_ring',
+        'schedule': 30,
+    },
+    # Gives a runtime error to submissions whose judging worker was lost
+    'fail-stale-judging': {
+        'task': 'submissions.tasks.fail_stale_judging',
+        'schedule': 60,
+    },
+    # Picks up any wake-up the dispatcher missed while another one was running
+    'dispatch-judging': {
+        'task': 'submissions.tasks.dispatch_judging',
+        'schedule': 5,
+    },
+}
+
+# Admission control
+# Judge slots across all workers, used to turn the backlog into a wait time
+JUDGE_CONCURRENCY = int(os.environ.get('JUDGE_CONCURRENCY', 4))
+# New submissions are refused with 429 while this many are waiting
+JUDGE_MAX_BACKLOG = int(os.environ.get('JUDGE_MAX_BACKLOG', 200))
+# Assumed judging time until real ones have been measured
+JUDGE_DEFAULT_SECONDS = 2.0
+# Per-user token bucket for single submissions
+SUBMISSION_BURST = 10
+SUBMISSION_RATE = 0.2  # tokens per second
+# Most a batch is charged, by both the bucket and the backlog limit, however
+# many submissions it holds; fair scheduling keeps a class's batch from
+# holding up anyone else
+SUBMISSION_BATCH_MAX_COST = int(os.environ.get('SUBMISSION_BATCH_MAX_COST', 2 * SUBMISSION_BURST))
+
+# Live submission status
+SUBMISSION_STATUS_TIMEOUT = 60 * 60  # rebuilt from the database once expired
+# Longest ?wait= a status request may hold, and how often it checks for a
+# change; only the async view served under ASGI waits
+SUBMISSION_STATUS_MAX_WAIT = 30
+SUBMISSION_STATUS_POLL_INTERVAL = 0.25
+
+# Contests
+# Contest submissions are judged on their own queue, by dedicated workers,
+# so a contest's final-minutes rush isn't stuck behind practice submissions
+CONTEST_JUDGE_QUEUE = 'contest'
+# Seconds a scoreboard can lag behind verdicts; rebuilds are batched to this
+CONTEST_SCOREBOARD_REFRESH_INTERVAL = 1
+
+# Fair scheduling
+# Submissions handed to Celery at once; the rest wait in fair-share order
+JUDGE_DISPATCH_WINDOW = int(os.environ.get('JUDGE_DISPATCH_WINDOW', 2 * JUDGE_CONCURRENCY))
+# Dispatched submissions without a verdict after this long stop counting against the window
+JUDGE_DISPATCH_TIMEOUT = 600
+# Submissions still judging this long after being sent to the judge are given
+# a runtime error; longer than judging with every retry could take
+JUDGE_STALE_TIMEOUT = 30 * 60
+# Sharded judging
+# Testsets with at least twice this many tests are split into shards judged
+# in parallel, each of at least this many tests; 0 turns sharding off
+JUDGE_SHARD_MIN_TESTS = int(os.environ.get('JUDGE_SHARD_MIN_TESTS', 50))
+JUDGE_MAX_SHARDS = int(os.environ.get('JUDGE_MAX_SHARDS', JUDGE_CONCURRENCY))
+# Testset affinity
+# Bytes of test input and output each judge process keeps in memory; a few
+# problems with huge testsets mustn't exhaust the worker
+JUDGE_TESTSET_CACHE_BYTES = int(os.environ.get('JUDGE_TESTSET_CACHE_BYTES', 64 * 1024 * 1024))
+# Points per worker on the consistent hash ring; more spreads problems more evenly
+JUDGE_AFFINITY_REPLICAS = 100
+# Workers a problem's submissions may go to before spilling to the shared queue
+JUDGE_AFFINITY_CANDIDATES = 2
+# In-flight submissions a worker's own queue may hold. Workers take from
+# their own queue and the shared one in turn, so it must be deep enough that
+# the turns spent on the shared queue don't leave it empty
+JUDGE_AFFINITY_MAX_LOAD = int(os.environ.get('JUDGE_AFFINITY_MAX_LOAD', 8))
+# Seconds to wait for workers to answer when refreshing the ring
+JUDGE_AFFINITY_INSPECT_TIMEOUT = 2.0
+# Most submissions accepted by one request to the batch API
+SUBMISSION_BATCH_MAX_SIZE = int(os.environ.get('SUBMISSION_BATCH_MAX_SIZE', 500))
+
+# Submission archival
+# Submissions older than this are moved to gzip JSONL segments by archive_submissions
+SUBMISSION_ARCHIVE_AFTER_DAYS = int(os.environ.get('SUBMISSION_ARCHIVE_AFTER_DAYS', 365))
+SUBMISSION_ARCHIVE_DIR = os.environ.get('SUBMISSION_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+
+# benchmark configuration
+BENCHMARK_RUNS = int(os.environ.get('BENCHMARK_RUNS', 7))
+BENCHMARK_WARMUP_RUNS = int(os.environ.get('BENCHMARK_WARMUP_RUNS', 2))
+# Core the benchmark worker pins programs to; leave unset to not pin.
+# Nothing else may run on it: docker-compose keeps every other service and
+# sandbox on SANDBOX_CPUSET, and the host's own processes need isolcpus=<core>
+# on the kernel command line
+BENCHMARK_CPU = int(os.environ['BENCHMARK_CPU']) if os.environ.get('BENCHMARK_CPU') else None
+# Cores the judging and profiling containers are pinned to, e.g. "0-2"; unset to not pin
+SANDBOX_CPUSET = os.environ.get('SANDBOX_CPUSET') or None
+
+# leaderboard configuration
+# 'redis' keeps scores in a sorted set; 'memory' is process-local for tests
+LEADERBOARD_BACKEND = 'memory' if TESTING else 'redis'
+LEADERBOARD_MAX_SIZE = 100
\ No newline at end of file
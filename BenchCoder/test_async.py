@@ -0,0 +1,148 @@
+"""The async views served under ASGI must answer exactly as the sync views do"""
+import asyncio
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from problems.models import Problem, TestCase
+from submissions.live_status import publish_status
+from submissions.models import ProblemStats, Submission, SubmissionBatch, UserProblemStatus
+from users.authentication import tokens_for_user
+from users.leaderboard import get_leaderboard
+from users.models import User
+
+ASYNC_URLCONF = 'BenchCoder.urls_async'
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123', score=20)
+        self.other = User.objects.create_user(username='other', password='testpass123', score=10)
+        self.problems = [
+            Problem.objects.create(title=f"Problem {i}", description="Test " * 100, difficulty="easy", points=10)
+            for i in range(3)
+        ]
+        TestCase.objects.create(problem=self.problems[0], input="1", expected_output="1", is_public=True)
+        ProblemStats.objects.create(problem=self.problems[0], submissions=2, accepted=1, unique_solvers=1)
+        UserProblemStatus.objects.create(user=self.user, problem=self.problems[1])
+        batch = SubmissionBatch.objects.create(user=self.user, size=2)
+        self.submissions = [
+            Submission.objects.create(
+                user=self.user, problem=self.problems[0], code=f'print({i})', verdict=verdict, batch=batch
+            )
+            for i, verdict in enumerate(['WA', 'P'])
+        ]
+        self.batch = batch
+        board = get_leaderboard()
+        board.replace({self.user.id: 20, self.other.id: 10})
+        self.addCleanup(board.clear)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.user).access_token}')
+
+    def urls(self):
+        return [
+            (reverse('problem-list'), {}),
+            (reverse('problem-list'), {'fields': 'id,title,status', 'page_size': 2}),
+            (reverse('problem-list'), {'cursor': ''}),
+            (reverse('problem-detail', kwargs={'problem_id': self.problems[0].id}), {}),
+            (reverse('submission-detail', kwargs={'submission_id': self.submissions[0].id}), {'fields': 'id,code'}),
+            (reverse('submission-batch-status', kwargs={'batch_id': self.batch.id}), {}),
+            (reverse('submission-status', kwargs={'submission_id': self.submissions[0].id}), {}),
+            (reverse('leaderboard'), {'radius': 1}),
+        ]
+
+    def test_async_views_match_sync_views(self):
+        for url, params in self.urls():
+            with self.subTest(url=url, params=params):
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(url, urlconf=ASYNC_URLCONF).func))
+                expected = self.client.get(url, params)
+                self.assertEqual(expected.status_code, status.HTTP_200_OK)
+                cache.clear()
+                with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                # Cached statuses rebuilt after the clear get a new version
+                expected, response = expected.json(), response.json()
+                expected.pop('version', None)
+                response.pop('version', None)
+                self.assertEqual(response, expected)
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+    def test_cached_catalog_responses_and_conditional_requests(self):
+        url = reverse('problem-list')
+        first = self.client.get(url)
+        self.assertEqual([row['status'] for row in first.json()['results']], [None, 'attempted', None])
+        # Only the per-user status lookup needs the database once cached
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLCONF, SUBMISSION_STATUS_POLL_INTERVAL=0.01)
+    def test_status_long_poll(self):
+        submission = self.submissions[1]
+        url = reverse('submission-status', kwargs={'submission_id': submission.id})
+        version = self.client.get(url).json()['version']
+
+        # Nothing changes, so the request waits out ?wait=
+        started = time.monotonic()
+        response = self.client.get(url, {'since': version, 'wait': 0.2})
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(response.json()['version'], version)
+
+        def judge():
+            time.sleep(0.1)
+            submission.verdict = 'AC'
+            publish_status(submission, passed=1, total=1)
+
+        thread = threading.Thread(target=judge)
+        thread.start()
+        response = self.client.get(url, {'since': version, 'wait': 10})
+        thread.join()
+        self.assertEqual(response.json()['verdict'], 'AC')
+        self.assertTrue(response.json()['done'])
+
+    def test_async_errors_match_sync_errors(self):
+        for params in ({'page': 99}, {'cursor': 'garbage'}):
+            with self.subTest(params=params):
+                expected = self.client.get(reverse('problem-list'), params)
+                self.assertEqual(expected.status_code, status.HTTP_404_NOT_FOUND)
+                with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+                    response = self.client.get(reverse('problem-list'), params)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+    def test_errors(self):
+        missing = self.client.get(reverse('problem-detail', kwargs={'problem_id': 9999}))
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.other).access_token}')
+        response = self.client.get(reverse('submission-batch-status', kwargs={'batch_id': self.batch.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('leaderboard'), {'limit': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.credentials()
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+        token = tokens_for_user(self.user).access_token
+        self.user.revoke_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get(reverse('leaderboard'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_revoked')
@@ -0,0 +1,511 @@
+"""Query budgets, query plans and response-time baselines for the API.
+
+Every endpoint is requested at a small and a large page size against a
+seeded dataset. Both must stay within the endpoint's query budget, and
+must issue the same number of queries, so an N+1 shows up as a failure
+rather than a slowdown. Requests go through real JWT authentication with
+the response cache cleared, so the budgets cover the uncached path; the
+authenticated user is kept cached, as it is in steady state.
+
+Timings are only reported when asked for:
+
+    PERF_RESULTS_FILE=perf.json python manage.py test BenchCoder.test_performance
+
+writes each endpoint's query count and median response time as JSON.
+Passing a previous run's file as PERF_BASELINE_FILE fails any endpoint
+that now needs more queries, or is slower by more than PERF_TOLERANCE
+(default 2.0).
+
+The judge scheduler is load tested by simulation: one user floods the
+queue while others submit a solution each, and the light users' p99 wait
+under plain FIFO and under fair-share dispatch goes into the same file,
+as does the verdict latency of a sharded testset at each worker count,
+and the testset cache hit rate and load imbalance of judge workers with
+and without testset-affinity routing.
+"""
+import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase as DjangoTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from judge import tasks
+from judge.routing import HashRing, pick_node
+from judge.testsets import LRUCache
+from problems.models import Problem, TestCase
+from submissions.models import (
+    ArchivedSubmission, ProblemStats, ProblemStatsEvent, RuntimeHistogram, Submission,
+    SubmissionBatch, UserProblemStatus,
+)
+from submissions.scheduler import claim_next, next_queue_tags, queued_submissions
+from users.authentication import cache_user
+from users.leaderboard import get_leaderboard
+from users.models import User
+
+PROBLEM_COUNT = 120
+USER_COUNT = 30
+SUBMISSIONS_PER_USER = 60
+TEST_CASES_PER_PROBLEM = 4
+
+# Most queries each endpoint may issue; authentication needs none
+QUERY_BUDGETS = {
+    'problem-list': 3,
+    'problem-list-search': 3,
+    'problem-list-cursor': 2,
+    'problem-detail': 2,
+    'testcase-list': 3,
+    'submission-list': 1,
+    'submission-list-by-problem': 1,
+    'submission-detail': 3,
+    # Rebuilding the cached status; a cache hit needs none
+    'submission-status': 1,
+    'submission-batch-status': 2,
+    'leaderboard': 1,
+    # Profile fields beyond the cached ones are loaded in one query
+    'profile': 1,
+}
+
+PAGE_SIZES = (5, 50)
+TIMING_RUNS = 5
+
+RESULTS = {}
+SCHEDULING_RESULTS = {}
+
+
+def tearDownModule():
+    results_file = os.environ.get('PERF_RESULTS_FILE')
+    if results_file:
+        with open(results_file, 'w') as output:
+            json.dump({
+                'vendor': connection.vendor,
+                'endpoints': RESULTS,
+                'scheduling': SCHEDULING_RESULTS,
+            }, output, indent=2, sort_keys=True)
+
+
+def seed():
+    verdicts = ['AC', 'WA', 'TLE', 'RE', 'WA', 'AC']
+    problems = Problem.objects.bulk_create([
+        Problem(
+            title=f"Problem {i} {'graph' if i % 3 == 0 else 'array'}",
+            description=f"Solve problem {i}. " * 50,
+            difficulty=('easy', 'medium', 'hard')[i % 3],
+            points=10 * (1 + i % 3),
+            tags='graphs,bfs' if i % 3 == 0 else 'arrays',
+        )
+        for i in range(PROBLEM_COUNT)
+    ])
+    TestCase.objects.bulk_create([
+        TestCase(problem=problem, input=f'{j} ' * 500, expected_output=str(j), is_public=j == 0)
+        for problem in problems
+        for j in range(TEST_CASES_PER_PROBLEM)
+    ])
+    ProblemStats.objects.bulk_create([
+        ProblemStats(problem=problem, submissions=10, accepted=4, unique_solvers=3, verdicts={'AC': 4, 'WA': 6})
+        for problem in problems
+    ])
+
+    users = User.objects.bulk_create([
+        User(username=f'user{i}', password='!', score=i * 10) for i in range(USER_COUNT)
+    ])
+    admin = User.objects.create_superuser(username='admin', password='adminpass123')
+    batch = SubmissionBatch.objects.create(user=users[0], size=SUBMISSIONS_PER_USER)
+    now = timezone.now()
+    Submission.objects.bulk_create([
+        Submission(
+            user=user,
+            problem=problems[(i * 7 + u) % PROBLEM_COUNT],
+            code=f'print({i})\n' * 20,
+            language='python',
+            verdict=verdicts[i % len(verdicts)],
+            execution_time=0.01 * (i % 50 + 1),
+            memory_used=10.0 + i % 30,
+            batch=batch if u == 0 else None,
+        )
+        for u, user in enumerate(users)
+        for i in range(SUBMISSIONS_PER_USER)
+    ])
+    Submission.objects.update(submitted_at=now - timedelta(hours=1))
+    UserProblemStatus.objects.bulk_create([
+        UserProblemStatus(user=user, problem=problems[(i * 7 + u) % PROBLEM_COUNT], solved_at=now)
+        for u, user in enumerate(users)
+        for i in range(0, 30, 6)
+    ], ignore_conflicts=True)
+    return problems, users, admin
+
+
+def summarize_plan(plan):
+    return [line.strip() for line in plan.splitlines() if line.strip()]
+
+
+class PerformanceTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.problems, cls.users, cls.admin = seed()
+        cls.user = cls.users[0]
+        cls.batch = SubmissionBatch.objects.get()
+
+    def authenticate(self, user):
+        self.current_user = user
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+class QueryBudgetTests(PerformanceTestCase):
+    def setUp(self):
+        cache.clear()
+        board = get_leaderboard()
+        board.replace({user.id: user.score for user in self.users})
+        self.addCleanup(board.clear)
+        self.authenticate(self.user)
+
+    def request(self, url, params):
+        cache.clear()
+        cache_user(self.current_user)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(url, params)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content[:200])
+        return response, len(queries), elapsed
+
+    def check(self, name, url, params=None, paginated=True):
+        params = params or {}
+        counts = []
+        for page_size in PAGE_SIZES if paginated else (None,):
+            page_params = {**params, 'page_size': page_size} if page_size else params
+            _, query_count, _ = self.request(url, page_params)
+            counts.append(query_count)
+
+        self.assertEqual(len(set(counts)), 1, f"{name} query count depends on page size: {counts}")
+        self.assertLessEqual(counts[0], QUERY_BUDGETS[name], f"{name} is over its query budget")
+
+        timings = [self.request(url, params)[2] for _ in range(TIMING_RUNS)]
+        RESULTS[name] = {
+            'queries': counts[0],
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+        }
+        self.compare_to_baseline(name)
+
+    def compare_to_baseline(self, name):
+        baseline_file = os.environ.get('PERF_BASELINE_FILE')
+        if not baseline_file:
+            return
+        with open(baseline_file) as baseline_input:
+            baseline = json.load(baseline_input)['endpoints'].get(name)
+        if baseline is None:
+            return
+        tolerance = float(os.environ.get('PERF_TOLERANCE', 2.0))
+        current = RESULTS[name]
+        self.assertLessEqual(current['queries'], baseline['queries'], f"{name} issues more queries than the baseline")
+        self.assertLessEqual(
+            current['median_ms'], baseline['median_ms'] * tolerance,
+            f"{name} took {current['median_ms']}ms against a baseline of {baseline['median_ms']}ms"
+        )
+
+    def test_problem_endpoints(self):
+        self.check('problem-list', reverse('problem-list'))
+        self.check('problem-list-search', reverse('problem-list'), {'search': 'graph'})
+        self.check('problem-list-cursor', reverse('problem-list'), {'cursor': ''})
+        self.check(
+            'problem-detail', reverse('problem-detail', kwargs={'problem_id': self.problems[0].id}), paginated=False
+        )
+
+    def test_admin_endpoints(self):
+        self.authenticate(self.admin)
+        self.check('testcase-list', reverse('testcase-list', kwargs={'problem_id': self.problems[0].id}))
+
+    def test_submission_endpoints(self):
+        self.check('submission-list', reverse('submission-list'))
+        self.check('submission-list-by-problem', reverse('submission-list'), {'problem': self.problems[0].id})
+
+        submission = Submission.objects.filter(user=self.user, verdict='AC').first()
+        self.check(
+            'submission-detail', reverse('submission-detail', kwargs={'submission_id': submission.id}),
+            paginated=False
+        )
+        self.check(
+            'submission-status', reverse('submission-status', kwargs={'submission_id': submission.id}),
+            paginated=False
+        )
+        self.check(
+            'submission-batch-status',
+            reverse('submission-batch-status', kwargs={'batch_id': self.batch.id}),
+            paginated=False
+        )
+
+    def test_user_endpoints(self):
+        self.check('leaderboard', reverse('leaderboard'), {'limit': 50}, paginated=False)
+        self.check('profile', reverse('profile'), paginated=False)
+
+
+class QueryPlanTests(PerformanceTestCase):
+    """Hot lookups must be served by an index, not a full table scan"""
+
+    def assert_uses_index(self, queryset, table):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # With sequential scans priced out, one can only appear if
+                # no index fits the query
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+                self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+            elif connection.vendor == 'sqlite':
+                plan = queryset.explain()
+                for line in summarize_plan(plan):
+                    self.assertIsNone(re.search(rf'\bSCAN {table}\b', line), plan)
+            else:
+                self.skipTest(f"No plan check for {connection.vendor}")
+
+    def test_submission_history(self):
+        submissions = Submission.objects.filter(user=self.user).order_by('-submitted_at', '-id')[:20]
+        self.assert_uses_index(submissions, 'submissions_submission')
+
+        by_problem = Submission.objects.filter(
+            user=self.user, problem=self.problems[0]
+        ).order_by('-submitted_at', '-id')[:20]
+        self.assert_uses_index(by_problem, 'submissions_submission')
+
+    def test_batch_status(self):
+        self.assert_uses_index(Submission.objects.filter(batch=self.batch).values('verdict'), 'submissions_submission')
+
+    def test_judge_queue(self):
+        self.assert_uses_index(queued_submissions().order_by('queue_tag', 'id')[:8], 'submissions_submission')
+        self.assert_uses_index(
+            Submission.objects.filter(dispatched_at__gte=timezone.now(), verdict__in=('P', 'Judging')),
+            'submissions_submission'
+        )
+
+    def test_problem_statuses(self):
+        statuses = UserProblemStatus.objects.filter(
+            user=self.user, problem_id__in=[problem.id for problem in self.problems[:10]]
+        )
+        self.assert_uses_index(statuses, 'submissions_userproblemstatus')
+
+    def test_problem_detail_lookups(self):
+        problem = self.problems[0]
+        self.assert_uses_index(
+            Problem.objects.select_related('stats').filter(pk=problem.pk), 'problems_problem'
+        )
+        self.assert_uses_index(TestCase.objects.filter(problem=problem, is_public=True), 'problems_testcase')
+
+    def test_percentile_histogram(self):
+        histograms = RuntimeHistogram.objects.filter(problem=self.problems[0], language='python', metric='time')
+        self.assert_uses_index(histograms, 'submissions_runtimehistogram')
+
+    def test_stats_flush_and_archive(self):
+        self.assert_uses_index(
+            ProblemStatsEvent.objects.filter(id__in=range(1, 100)).values('problem_id', 'verdict'),
+            'submissions_problemstatsevent'
+        )
+        self.assert_uses_index(ArchivedSubmission.objects.filter(pk=1), 'submissions_archivedsubmission')
+
+
+class FairSchedulingLoadTests(DjangoTestCase):
+    """A flood from one user must not hold up everyone else's verdicts.
+
+    Time advances in ticks of one judging each. The heavy user queues
+    HEAVY_SUBMISSIONS at once; each light user submits one solution on a
+    later tick. Both runs do the same work, so only the order differs.
+    """
+    JUDGES = 4
+    HEAVY_SUBMISSIONS = 200
+    LIGHT_USERS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.problem = Problem.objects.create(title="Load", description="Test", difficulty="easy", points=10)
+        cls.heavy = User.objects.create_user(username='heavy', password='!')
+        cls.light = [User.objects.create_user(username=f'light{i}', password='!') for i in range(cls.LIGHT_USERS)]
+
+    def enqueue(self, user, count=1):
+        return Submission.objects.bulk_create([
+            Submission(user=user, problem=self.problem, code='print(1)', verdict='P', queue_tag=queue_tag)
+            for queue_tag in next_queue_tags(user.id, count)
+        ])
+
+    def simulate(self, take_next):
+        """Run the queue dry and return the light users' waits and the tick the last verdict came in"""
+        arrivals = {2 * i + 1: user for i, user in enumerate(self.light)}
+        self.enqueue(self.heavy, self.HEAVY_SUBMISSIONS)
+        submitted = {}
+        running = []
+        waits = []
+        tick = 0
+        while tick <= max(arrivals) or running or queued_submissions().exists():
+            if tick in arrivals:
+                submission, = self.enqueue(arrivals[tick])
+                submitted[submission.id] = tick
+            for finish, submission_id in [job for job in running if job[0] == tick]:
+                running.remove((finish, submission_id))
+                if submission_id in submitted:
+                    waits.append(finish - submitted[submission_id])
+            for submission_id in take_next(self.JUDGES - len(running)):
+                running.append((tick + 1, submission_id))
+            tick += 1
+        return waits, tick
+
+    def fifo(self, limit):
+        submission_ids = list(queued_submissions().order_by('id').values_list('id', flat=True)[:limit])
+        Submission.objects.filter(id__in=submission_ids).update(queue_tag=None)
+        return submission_ids
+
+    def test_light_users_p99_under_a_flood(self):
+        def p99(waits):
+            return statistics.quantiles(waits, n=100, method='inclusive')[98]
+
+        fifo_waits, fifo_ticks = self.simulate(self.fifo)
+        Submission.objects.all().delete()
+        fair_waits, fair_ticks = self.simulate(claim_next)
+
+        SCHEDULING_RESULTS['light-user-p99-ticks'] = {'fifo': p99(fifo_waits), 'fair': p99(fair_waits)}
+        self.assertEqual(len(fair_waits), self.LIGHT_USERS)
+        # Fair dispatch costs the heavy user nothing overall
+        self.assertEqual(fair_ticks, fifo_ticks)
+        # Under FIFO a light user waits behind the whole flood; under fair
+        # dispatch they go out with the next free judge
+        self.assertGreater(p99(fifo_waits), self.HEAVY_SUBMISSIONS / self.JUDGES / 2, SCHEDULING_RESULTS)
+        self.assertLessEqual(p99(fair_waits), 2, SCHEDULING_RESULTS)
+
+
+class ShardedJudgingLoadTests(DjangoTestCase):
+    """Verdict latency of a heavy testset must fall as workers are added.
+
+    The submission goes through judge_submission and, sharded, the real
+    chord of judge_shard tasks and its reducer. Only running a test is
+    simulated: it takes no time here but reports a duration, which grows
+    along the testset, as it usually does. Every shard runs on its own
+    worker, so the verdict comes in when the slowest shard finishes; the
+    eager chord runs them one after another, so that is read off the
+    outcomes the reducer receives.
+    """
+    TESTS = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='sharded', password='!')
+        cls.problem = Problem.objects.create(title="Heavy", description="Test", difficulty="easy", points=10)
+        TestCase.objects.bulk_create([
+            TestCase(problem=cls.problem, input=str(index), expected_output=str(index)) for index in range(cls.TESTS)
+        ])
+        cls.durations = [0.05 + 2.0 * index / cls.TESTS for index in range(cls.TESTS)]
+
+    def setUp(self):
+        cache.clear()
+
+    def judge(self, workers):
+        """Judge a submission on `workers` workers; its verdict and the seconds until it came in"""
+        def run_test_case(client, config, code_file, test_case, language):
+            return None, self.durations[int(test_case.input)], None
+
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='print(input())')
+        with self.settings(JUDGE_SHARD_MIN_TESTS=1, JUDGE_MAX_SHARDS=workers), \
+                mock.patch('judge.tasks.get_docker_client', return_value=None), \
+                mock.patch('judge.tasks.run_test_case', side_effect=run_test_case) as runs, \
+                mock.patch('judge.tasks.reduce_shard_results', wraps=tasks.reduce_shard_results) as reduce:
+            tasks.judge_submission.delay(submission.id)
+        submission.refresh_from_db()
+        self.assertEqual(runs.call_count, self.TESTS)
+        if workers == 1:
+            self.assertFalse(reduce.called)
+            latency = sum(self.durations)
+        else:
+            shard_results, _ = reduce.call_args.args
+            self.assertEqual(len(shard_results), workers)
+            latency = max(sum(outcome[2] for outcome in results) for results in shard_results)
+        return submission.verdict, round(latency, 2)
+
+    def test_latency_scales_with_workers(self):
+        latencies = {}
+        for workers in (1, 2, 4, 8):
+            verdict, latencies[workers] = self.judge(workers)
+            self.assertEqual(verdict, 'AC')
+
+        SCHEDULING_RESULTS['sharded-verdict-seconds'] = latencies
+        for workers, latency in latencies.items():
+            # Within 5% of a perfect split of the work
+            self.assertLessEqual(latency, latencies[1] / workers * 1.05, SCHEDULING_RESULTS)
+
+
+@override_settings(JUDGE_AFFINITY_MAX_LOAD=8, JUDGE_AFFINITY_CANDIDATES=2)
+class AffinityRoutingLoadTests(SimpleTestCase):
+    """Routing by problem must keep testsets warm without unbalancing the workers.
+
+    Problem popularity follows a Zipf distribution and submissions arrive
+    as fast as the workers judge them. Each tick every worker judges one
+    submission, taking from its own queue and the shared queue in turn, as
+    a Celery worker does, and from whichever has work when the other is
+    empty. Without affinity everything goes through the shared queue.
+    """
+    WORKERS = 8
+    PROBLEMS = 400
+    SUBMISSIONS = 8000
+    CACHE_SIZE = 32
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.arrivals = rng.choices(
+            range(self.PROBLEMS), [1 / (rank + 1) for rank in range(self.PROBLEMS)], k=self.SUBMISSIONS
+        )
+        self.nodes = [f'celery@judge{i}' for i in range(self.WORKERS)]
+
+    def simulate(self, ring=None):
+        caches = {node: LRUCache(self.CACHE_SIZE) for node in self.nodes}
+        own = {node: deque() for node in self.nodes}
+        shared = deque()
+        judged = Counter()
+        turn = {node: True for node in self.nodes}
+        arrivals = deque(self.arrivals)
+        while arrivals or shared or any(own.values()):
+            for _ in range(min(self.WORKERS, len(arrivals))):
+                problem_id = arrivals.popleft()
+                loads = {node: len(queue) for node, queue in own.items()}
+                node = pick_node(ring, problem_id, loads) if ring else None
+                (own[node] if node else shared).append(problem_id)
+            for node in self.nodes:
+                # Workers take from their queues in turn, skipping empty ones
+                queues = [own[node], shared] if turn[node] else [shared, own[node]]
+                turn[node] = not turn[node]
+                queue = next((queue for queue in queues if queue), None)
+                if queue:
+                    problem_id = queue.popleft()
+                    if caches[node].get(problem_id) is None:
+                        caches[node].put(problem_id, True)
+                    judged[node] += 1
+        hits = sum(cache.hits for cache in caches.values())
+        misses = sum(cache.misses for cache in caches.values())
+        counts = [judged[node] for node in self.nodes]
+        return {
+            'hit_rate': round(hits / (hits + misses), 3),
+            'imbalance': round(max(counts) / (sum(counts) / len(counts)), 3),
+        }
+
+    def test_affinity_keeps_testsets_warm(self):
+        shared = self.simulate()
+        affinity = self.simulate(HashRing(self.nodes))
+        ring = HashRing(self.nodes)
+        grown = HashRing(self.nodes + ['celery@judge8'])
+        moved = sum(
+            ring.preference(problem_id, 1) != grown.preference(problem_id, 1) for problem_id in range(self.PROBLEMS)
+        ) / self.PROBLEMS
+
+        SCHEDULING_RESULTS['testset-affinity'] = {'shared': shared, 'affinity': affinity, 'moved-on-join': moved}
+        self.assertGreater(affinity['hit_rate'], shared['hit_rate'] + 0.2, SCHEDULING_RESULTS)
+        # Stealing keeps every worker busy despite the skew
+        self.assertLessEqual(affinity['imbalance'], 1.05, SCHEDULING_RESULTS)
+        # A ninth worker takes about 1/9 of the problems, rather than all of them moving
+        self.assertLess(moved, 2 / 9, SCHEDULING_RESULTS)
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from BenchCoder.views import welcome_view
+from users.views import leaderboard
 
 urlpatterns = [
     path('', welcome_view, name='welcome'),
@@ -27,6 +28,8 @@ urlpatterns = [
     path('api/auth/', include('users.urls')),
     path('api/problems/', include('problems.urls')),
     path('api/submissions/', include('submissions.urls')),
+    path('api/contests/', include('contests.urls')),
+    path('api/leaderboard/', leaderboard, name='leaderboard'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,28 @@
+"""
+URL configuration for serving BenchCoder from an ASGI server.
+
+The read-heavy endpoints are routed to async views under the same paths and
+names; everything else falls through to the sync URLconf in BenchCoder.urls.
+asgi.py selects this module through DJANGO_ROOT_URLCONF.
+"""
+from django.urls import path
+
+from BenchCoder.urls import urlpatterns as sync_urlpatterns
+from problems import async_views as problem_views
+from submissions import async_views as submission_views
+from users import async_views as user_views
+
+urlpatterns = [
+    path('api/problems/', problem_views.problem_list, name='problem-list'),
+    path('api/problems/<int:problem_id>/', problem_views.problem_detail, name='problem-detail'),
+    path(
+        'api/submissions/batch/<uuid:batch_id>/', submission_views.submission_batch_status,
+        name='submission-batch-status'
+    ),
+    path('api/submissions/<int:submission_id>/', submission_views.submission_detail, name='submission-detail'),
+    path(
+        'api/submissions/<int:submission_id>/status/', submission_views.submission_status,
+        name='submission-status'
+    ),
+    path('api/leaderboard/', user_views.leaderboard, name='leaderboard'),
+] + sync_urlpatterns
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import Contest, ContestParticipant, ContestProblem
+
+class ContestProblemInline(admin.TabularInline):
+    model = ContestProblem
+    extra = 1
+
+class ContestAdmin(admin.ModelAdmin):
+    list_display = ('title', 'start_time', 'end_time', 'freeze_time', 'unfrozen')
+    list_filter = ('start_time',)
+    search_fields = ('title',)
+    inlines = [ContestProblemInline]
+
+class ContestParticipantAdmin(admin.ModelAdmin):
+    list_display = ('contest', 'user', 'registered_at')
+    search_fields = ('contest__title', 'user__username')
+
+admin.site.register(Contest, ContestAdmin)
+admin.site.register(ContestParticipant, ContestParticipantAdmin)
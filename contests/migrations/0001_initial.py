@@ -0,0 +1,83 @@
+# Generated by Django 4.2 on 2026-10-19 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('problems', '0004_problem_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, default='')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('freeze_time', models.DateTimeField(blank=True, null=True)),
+                ('unfrozen', models.BooleanField(default=False)),
+                ('penalty_minutes', models.PositiveIntegerField(default=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContestProblem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=10)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contest_problems', to='contests.contest')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='problems.problem')),
+            ],
+            options={
+                'ordering': ['label'],
+                'unique_together': {('contest', 'problem'), ('contest', 'label')},
+            },
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='problems',
+            field=models.ManyToManyField(related_name='contests', through='contests.ContestProblem', to='problems.problem'),
+        ),
+        migrations.CreateModel(
+            name='ContestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('judged', models.JSONField(default=dict)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('solved_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('public_attempts', models.PositiveIntegerField(default=0)),
+                ('public_solved_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='contests.contest')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='problems.problem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('contest', 'user', 'problem')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ContestParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registered_at', models.DateTimeField(auto_now_add=True)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='contests.contest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contest_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('contest', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Contest(models.Model):
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, default='')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    # Results of submissions made from this time on are hidden from the
+    # public scoreboard until the contest is unfrozen
+    freeze_time = models.DateTimeField(null=True, blank=True)
+    unfrozen = models.BooleanField(default=False)
+    # Minutes added for each rejected attempt on a problem that is later solved
+    penalty_minutes = models.PositiveIntegerField(default=20)
+    problems = models.ManyToManyField('problems.Problem', through='ContestProblem', related_name='contests')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-start_time']
+
+    def __str__(self):
+        return self.title
+
+    def is_running(self, now=None):
+        now = now or timezone.now()
+        return self.start_time <= now < self.end_time
+
+    def is_frozen(self, now=None):
+        """Whether the public scoreboard is currently hiding results"""
+        now = now or timezone.now()
+        return self.freeze_time is not None and not self.unfrozen and now >= self.freeze_time
+
+    def elapsed_seconds(self, when):
+        return int((when - self.start_time).total_seconds())
+
+
+class ContestProblem(models.Model):
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='contest_problems')
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE)
+    label = models.CharField(max_length=10)  # A, B, C...
+
+    class Meta:
+        ordering = ['label']
+        unique_together = [('contest', 'label'), ('contest', 'problem')]
+
+    def __str__(self):
+        return f"{self.label}. {self.problem}"
+
+
+class ContestParticipant(models.Model):
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='contest_entries')
+    registered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('contest', 'user')
+
+    def __str__(self):
+        return f"{self.user} in {self.contest}"
+
+
+class ContestResult(models.Model):
+    """A participant's standing on one contest problem, kept up to date from verdicts.
+
+    `judged` maps each judged submission id to [seconds into the contest,
+    accepted], so verdicts can arrive in any order, or more than once on a
+    rejudge, and still give the same result. The other fields are derived
+    from it by record() and are what the scoreboard reads.
+    """
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='results')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE, related_name='+')
+    judged = models.JSONField(default=dict)
+    # Rejected submissions made before the first accepted one
+    attempts = models.PositiveIntegerField(default=0)
+    solved_seconds = models.PositiveIntegerField(null=True, blank=True)
+    # The same as seen on the frozen scoreboard, which only counts
+    # submissions made before the freeze
+    public_attempts = models.PositiveIntegerField(default=0)
+    public_solved_seconds = models.PositiveIntegerField(null=True, blank=True)
+    # Submissions made after the freeze, shown as pending while frozen
+    pending = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('contest', 'user', 'problem')
+
+    def record(self, submission_id, seconds, accepted, freeze_seconds=None):
+        """Apply one verdict and recompute the derived fields"""
+        self.judged[str(submission_id)] = [seconds, accepted]
+        events = sorted(self.judged.values())
+        self.solved_seconds, self.attempts = self._standing(events)
+        if freeze_seconds is None:
+            self.public_solved_seconds, self.public_attempts = self.solved_seconds, self.attempts
+            self.pending = 0
+        else:
+            self.public_solved_seconds, self.public_attempts = self._standing(
+                [event for event in events if event[0] < freeze_seconds]
+            )
+            self.pending = sum(1 for event in events if event[0] >= freeze_seconds)
+
+    @staticmethod
+    def _standing(events):
+        """(seconds of the first accepted submission or None, rejections before it)"""
+        attempts = 0
+        for seconds, accepted in events:
+            if accepted:
+                return seconds, attempts
+            attempts += 1
+        return None, attempts
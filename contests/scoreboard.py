@@ -0,0 +1,200 @@
+"""Contest scoreboards, maintained from judge verdicts and served from the cache.
+
+Each verdict updates one ContestResult row. The scoreboard is then rebuilt
+from those rows, never from submissions, at most once per
+CONTEST_SCOREBOARD_REFRESH_INTERVAL however many verdicts come in, and
+stored in the cache. Reading it is one cache get.
+
+While a contest is frozen there are two boards: the public one only
+reflects submissions made before the freeze, and the final one, for
+staff, has everything.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from submissions.progress import UNJUDGED_VERDICTS
+from .models import Contest, ContestResult
+
+logger = logging.getLogger(__name__)
+
+# Verdicts that neither solve a problem nor count as a penalised attempt
+UNPENALIZED_VERDICTS = UNJUDGED_VERDICTS + ('CE',)
+
+SCOREBOARD_TIMEOUT = 24 * 60 * 60
+# Upper bound on how long a lost refresh task can hold back the next one
+REFRESH_LOCK_TIMEOUT = 60
+# How long spectators wait for a board another request is rebuilding
+REBUILD_WAIT = 5
+REBUILD_POLL_INTERVAL = 0.1
+
+
+def scoreboard_key(contest_id, final=False):
+    return f"contest:{contest_id}:scoreboard:{'final' if final else 'public'}"
+
+
+def refresh_lock_key(contest_id):
+    return f'contest:{contest_id}:scoreboard:refresh'
+
+
+def rebuild_lock_key(contest_id):
+    return f'contest:{contest_id}:scoreboard:rebuild'
+
+
+def record_contest_verdict(submission):
+    """Apply a final verdict of a contest submission to its participant's result"""
+    if submission.verdict in UNPENALIZED_VERDICTS:
+        return
+    contest = Contest.objects.get(pk=submission.contest_id)
+    if not contest.is_running(submission.submitted_at):
+        return
+    freeze_seconds = contest.elapsed_seconds(contest.freeze_time) if contest.freeze_time else None
+
+    with transaction.atomic():
+        result, _ = ContestResult.objects.select_for_update().get_or_create(
+            contest=contest, user_id=submission.user_id, problem_id=submission.problem_id
+        )
+        result.record(
+            submission.id, contest.elapsed_seconds(submission.submitted_at), submission.verdict == 'AC', freeze_seconds
+        )
+        result.save()
+        transaction.on_commit(lambda: schedule_refresh(contest.id))
+
+
+def schedule_refresh(contest_id):
+    """Rebuild the scoreboard soon, folding in any other changes made meanwhile"""
+    from .tasks import refresh_scoreboard_task
+
+    try:
+        if not cache.add(refresh_lock_key(contest_id), 1, REFRESH_LOCK_TIMEOUT):
+            return
+    except Exception as e:
+        logger.warning(f"Scoreboard refresh lock unavailable: {e}")
+    refresh_scoreboard_task.apply_async((contest_id,), countdown=settings.CONTEST_SCOREBOARD_REFRESH_INTERVAL)
+
+
+def refresh_scoreboard(contest_id):
+    """Rebuild and cache the contest's public and final scoreboards; returns them"""
+    # Changes from here on need another refresh, so let them schedule one
+    try:
+        cache.delete(refresh_lock_key(contest_id))
+    except Exception as e:
+        logger.warning(f"Failed to release scoreboard refresh lock: {e}")
+
+    contest = Contest.objects.get(pk=contest_id)
+    final = build_scoreboard(contest, final=True)
+    public = build_scoreboard(contest, final=False) if contest.is_frozen() else final
+    try:
+        cache.set_many(
+            {scoreboard_key(contest_id): public, scoreboard_key(contest_id, final=True): final},
+            SCOREBOARD_TIMEOUT
+        )
+    except Exception as e:
+        logger.warning(f"Scoreboard cache write failed: {e}")
+    return public, final
+
+
+def _cached_scoreboard(contest_id, final):
+    try:
+        return cache.get(scoreboard_key(contest_id, final))
+    except Exception as e:
+        logger.warning(f"Scoreboard cache read failed: {e}")
+        return None
+
+
+def get_scoreboard(contest_id, final=False):
+    """The cached scoreboard, rebuilt on a miss by one request while the others wait for it.
+
+    A request that has waited REBUILD_WAIT seconds without seeing the board
+    rebuilds it itself, in case the one rebuilding it died.
+    """
+    board = _cached_scoreboard(contest_id, final)
+    if board is not None:
+        return board
+
+    try:
+        rebuilding = not cache.add(rebuild_lock_key(contest_id), 1, REBUILD_WAIT)
+    except Exception as e:
+        logger.warning(f"Scoreboard rebuild lock unavailable: {e}")
+        rebuilding = False
+    if rebuilding:
+        deadline = time.monotonic() + REBUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(REBUILD_POLL_INTERVAL)
+            board = _cached_scoreboard(contest_id, final)
+            if board is not None:
+                return board
+
+    try:
+        public, final_board = refresh_scoreboard(contest_id)
+    finally:
+        if not rebuilding:
+            try:
+                cache.delete(rebuild_lock_key(contest_id))
+            except Exception as e:
+                logger.warning(f"Failed to release scoreboard rebuild lock: {e}")
+    return final_board if final else public
+
+
+def build_scoreboard(contest, final):
+    """Ranked rows, ICPC style: most problems solved, then least penalty time"""
+    labels = dict(contest.contest_problems.values_list('problem_id', 'label'))
+    rows = {
+        user_id: {
+            'user_id': user_id, 'username': username, 'solved': 0, 'penalty': 0, 'last_solved': 0, 'problems': {},
+        }
+        for user_id, username in contest.participants.values_list('user_id', 'user__username')
+    }
+
+    # Everyone who solved a problem at its earliest solve time gets the first-solve mark
+    first_solves = {}
+    results = contest.results.values_list(
+        'user_id', 'problem_id', 'attempts', 'solved_seconds', 'public_attempts', 'public_solved_seconds', 'pending'
+    )
+    for user_id, problem_id, attempts, solved, public_attempts, public_solved, pending in results:
+        row = rows.get(user_id)
+        if row is None or problem_id not in labels:
+            continue
+        if not final:
+            attempts, solved = public_attempts, public_solved
+        cell = {
+            'solved': solved is not None,
+            'attempts': attempts,
+            'minute': solved // 60 if solved is not None else None,
+            'pending': 0 if final or solved is not None else pending,
+            'first': False,
+        }
+        row['problems'][labels[problem_id]] = cell
+        if solved is not None:
+            row['solved'] += 1
+            row['penalty'] += solved // 60 + attempts * contest.penalty_minutes
+            row['last_solved'] = max(row['last_solved'], solved)
+            earliest, cells = first_solves.get(problem_id, (solved, []))
+            if solved < earliest:
+                earliest, cells = solved, []
+            if solved == earliest:
+                cells.append(cell)
+            first_solves[problem_id] = (earliest, cells)
+
+    for _, cells in first_solves.values():
+        for cell in cells:
+            cell['first'] = True
+
+    ordered = sorted(rows.values(), key=lambda row: (-row['solved'], row['penalty'], row['last_solved'], row['username']))
+    for position, row in enumerate(ordered):
+        previous = ordered[position - 1] if position else None
+        tied = previous and (previous['solved'], previous['penalty']) == (row['solved'], row['penalty'])
+        row['rank'] = previous['rank'] if tied else position + 1
+        del row['last_solved']
+
+    return {
+        'contest_id': contest.id,
+        'frozen': not final and contest.is_frozen(),
+        'problems': list(labels.values()),
+        'rows': ordered,
+        'generated_at': timezone.now(),
+    }
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+from .models import Contest, ContestProblem
+
+class ContestProblemSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='problem.title', read_only=True)
+    
+    class Meta:
+        model = ContestProblem
+        fields = ('label', 'problem', 'title')
+
+class ContestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contest
+        fields = ('id', 'title', 'description', 'start_time', 'end_time', 'freeze_time', 'unfrozen', 'penalty_minutes')
+
+class ContestDetailSerializer(ContestSerializer):
+    problems = serializers.SerializerMethodField()
+    registered = serializers.SerializerMethodField()
+    
+    class Meta(ContestSerializer.Meta):
+        fields = ContestSerializer.Meta.fields + ('problems', 'registered')
+    
+    def get_problems(self, obj):
+        # The problem set is revealed when the contest starts
+        request = self.context['request']
+        if not (obj.start_time <= self.context['now'] or request.user.is_staff):
+            return None
+        return ContestProblemSerializer(obj.contest_problems.select_related('problem'), many=True).data
+    
+    def get_registered(self, obj):
+        return obj.participants.filter(user=self.context['request'].user).exists()
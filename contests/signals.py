@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Contest, ContestParticipant, ContestProblem
+from .scoreboard import schedule_refresh
+
+
+@receiver(post_save, sender=Contest)
+def contest_saved(sender, instance, raw=False, **kwargs):
+    # Unfreezing, or a new penalty, changes the boards
+    if raw:
+        return
+    transaction.on_commit(lambda: schedule_refresh(instance.pk))
+
+
+@receiver(post_save, sender=ContestProblem)
+@receiver(post_delete, sender=ContestProblem)
+@receiver(post_save, sender=ContestParticipant)
+@receiver(post_delete, sender=ContestParticipant)
+def contest_entries_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: schedule_refresh(instance.contest_id))
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .scoreboard import refresh_scoreboard
+
+
+@shared_task
+def refresh_scoreboard_task(contest_id):
+    refresh_scoreboard(contest_id)
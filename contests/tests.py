@@ -0,0 +1,181 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from problems.models import Problem, TestCase
+from submissions.admission import get_backlog, set_backlog
+from submissions.models import Submission
+from submissions.tasks import sync_judge_backlog
+from .models import Contest, ContestParticipant, ContestProblem, ContestResult
+from .scoreboard import get_scoreboard, rebuild_lock_key, scoreboard_key
+
+User = get_user_model()
+
+
+class ContestResultTests(APITestCase):
+    def setUp(self):
+        self.result = ContestResult()
+
+    def test_verdicts_in_any_order_give_the_same_result(self):
+        # Submitted: WA at 5:00, AC at 10:00, WA at 15:00; judged out of order
+        self.result.record(2, 600, True)
+        self.result.record(3, 900, False)
+        self.result.record(1, 300, False)
+        self.assertEqual((self.result.solved_seconds, self.result.attempts), (600, 1))
+        
+        # A rejudge replaces the earlier verdict rather than adding to it
+        self.result.record(1, 300, True)
+        self.assertEqual((self.result.solved_seconds, self.result.attempts), (300, 0))
+
+    def test_freeze_hides_later_submissions(self):
+        self.result.record(1, 300, False, freeze_seconds=1200)
+        self.result.record(2, 1500, False, freeze_seconds=1200)
+        self.result.record(3, 1800, True, freeze_seconds=1200)
+        self.assertEqual((self.result.solved_seconds, self.result.attempts), (1800, 2))
+        self.assertEqual((self.result.public_solved_seconds, self.result.public_attempts), (None, 1))
+        self.assertEqual(self.result.pending, 2)
+
+
+class ContestTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.contest = Contest.objects.create(
+            title="Round 1", start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1)
+        )
+        self.problems = []
+        for label in 'AB':
+            problem = Problem.objects.create(title=f"Problem {label}", description="Test", difficulty="easy", points=10)
+            TestCase.objects.create(problem=problem, input="", expected_output="1")
+            ContestProblem.objects.create(contest=self.contest, problem=problem, label=label)
+            self.problems.append(problem)
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(3)]
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        
+    def register(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('contest-register', kwargs={'contest_id': self.contest.id}))
+        
+    def submit(self, user, problem, correct=True):
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('contest-submit', kwargs={'contest_id': self.contest.id}),
+                {'problem': problem.id, 'code': 'print(1)' if correct else 'print(2)'},
+                format='json'
+            )
+        
+    def scoreboard(self, **params):
+        return APIClient().get(reverse('contest-scoreboard', kwargs={'contest_id': self.contest.id}), params)
+        
+    def test_scoreboard_follows_verdicts(self):
+        for user in self.users:
+            self.assertEqual(self.register(user).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.submit(self.users[0], self.problems[0], correct=False).status_code, status.HTTP_201_CREATED)
+        self.submit(self.users[0], self.problems[0])
+        self.submit(self.users[1], self.problems[0])
+        self.submit(self.users[1], self.problems[1])
+        self.assertEqual(Submission.objects.filter(contest=self.contest, verdict='AC').count(), 3)
+        
+        board = self.scoreboard().data
+        self.assertFalse(board['frozen'])
+        self.assertEqual(board['problems'], ['A', 'B'])
+        first, second, third = board['rows']
+        self.assertEqual((first['username'], first['rank'], first['solved']), ('user1', 1, 2))
+        self.assertEqual(first['penalty'], 2 * 60)
+        self.assertEqual((second['username'], second['solved']), ('user0', 1))
+        # user1 may tie for it if both solves fall in the same second
+        self.assertTrue(second['problems']['A']['first'])
+        self.assertEqual(second['penalty'], 60 + 20)
+        self.assertEqual(second['problems']['A']['attempts'], 1)
+        self.assertEqual((third['username'], third['solved'], third['problems']), ('user2', 0, {}))
+        
+        # Spectators are served from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.scoreboard().data, board)
+        
+    def test_spectators_wait_for_a_scoreboard_being_rebuilt(self):
+        # Another request missed the cache first and is rebuilding the board
+        cache.add(rebuild_lock_key(self.contest.id), 1)
+        board = {'rows': []}
+        
+        def rebuilt_meanwhile(seconds):
+            cache.set(scoreboard_key(self.contest.id), board)
+        
+        with mock.patch('contests.scoreboard.time.sleep', side_effect=rebuilt_meanwhile), \
+                mock.patch('contests.scoreboard.build_scoreboard') as build:
+            self.assertEqual(get_scoreboard(self.contest.id), board)
+        build.assert_not_called()
+        
+        # It gave up, so after the wait the board is rebuilt here
+        cache.delete(scoreboard_key(self.contest.id))
+        with mock.patch('contests.scoreboard.REBUILD_WAIT', 0):
+            self.assertEqual(get_scoreboard(self.contest.id)['problems'], ['A', 'B'])
+        
+    def test_frozen_scoreboard(self):
+        self.contest.freeze_time = timezone.now() - timedelta(minutes=1)
+        self.contest.save()
+        self.register(self.users[0])
+        self.submit(self.users[0], self.problems[0], correct=False)
+        self.submit(self.users[0], self.problems[0])
+        
+        board = self.scoreboard().data
+        self.assertTrue(board['frozen'])
+        cell = board['rows'][0]['problems']['A']
+        self.assertEqual((cell['solved'], cell['attempts'], cell['pending']), (False, 0, 2))
+        # Only staff see through the freeze
+        self.assertEqual(self.scoreboard(final='true').data, board)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(
+            reverse('contest-scoreboard', kwargs={'contest_id': self.contest.id}), {'final': 'true'}
+        )
+        self.assertEqual(response.data['rows'][0]['solved'], 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contest.unfrozen = True
+            self.contest.save()
+        board = self.scoreboard().data
+        self.assertFalse(board['frozen'])
+        self.assertEqual(board['rows'][0]['solved'], 1)
+        
+    def test_submissions_are_checked(self):
+        self.assertEqual(self.submit(self.users[0], self.problems[0]).status_code, status.HTTP_403_FORBIDDEN)
+        self.register(self.users[0])
+        other = Problem.objects.create(title="Other", description="Test", difficulty="easy", points=10)
+        self.assertEqual(self.submit(self.users[0], other).status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.contest.end_time = timezone.now()
+        self.contest.save()
+        self.assertEqual(self.submit(self.users[0], self.problems[0]).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Submission.objects.exists())
+        
+    def test_contest_submissions_have_their_own_backlog(self):
+        self.register(self.users[0])
+        with mock.patch('contests.views.judge_submission.apply_async'):
+            self.assertEqual(self.submit(self.users[0], self.problems[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_backlog(), 0)
+        self.assertEqual(get_backlog(contest=True), 1)
+        
+        # The periodic resync keeps the lanes apart too
+        set_backlog(5)
+        self.assertEqual(sync_judge_backlog(), 0)
+        self.assertEqual(get_backlog(contest=True), 1)
+        
+    def test_problems_are_hidden_until_the_start(self):
+        self.contest.start_time = timezone.now() + timedelta(hours=1)
+        self.contest.end_time = timezone.now() + timedelta(hours=2)
+        self.contest.save()
+        self.register(self.users[0])
+        response = self.client.get(reverse('contest-detail', kwargs={'contest_id': self.contest.id}))
+        self.assertIsNone(response.data['problems'])
+        self.assertTrue(response.data['registered'])
+        
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('contest-detail', kwargs={'contest_id': self.contest.id}))
+        self.assertEqual([problem['label'] for problem in response.data['problems']], ['A', 'B'])
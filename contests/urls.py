@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.ContestListView.as_view(), name='contest-list'),
+    path('<int:contest_id>/', views.ContestDetailView.as_view(), name='contest-detail'),
+    path('<int:contest_id>/register/', views.ContestRegisterView.as_view(), name='contest-register'),
+    path('<int:contest_id>/submit/', views.ContestSubmitView.as_view(), name='contest-submit'),
+    path('<int:contest_id>/scoreboard/', views.ContestScoreboardView.as_view(), name='contest-scoreboard'),
+]
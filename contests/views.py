@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from judge.tasks import judge_submission
+from submissions.admission import SubmissionRateThrottle, record_enqueued
+from submissions.live_status import publish_status
+from submissions.serializers import SubmissionCreateSerializer, SubmissionSerializer
+from .models import Contest, ContestParticipant
+from .scoreboard import get_scoreboard
+from .serializers import ContestDetailSerializer, ContestSerializer
+
+class ContestListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        contests = Contest.objects.all()
+        return Response(ContestSerializer(contests, many=True).data, status=status.HTTP_200_OK)
+
+class ContestDetailView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, contest_id):
+        contest = get_object_or_404(Contest, id=contest_id)
+        serializer = ContestDetailSerializer(contest, context={'request': request, 'now': timezone.now()})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class ContestRegisterView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, contest_id):
+        contest = get_object_or_404(Contest, id=contest_id)
+        if timezone.now() >= contest.end_time:
+            return Response({'detail': 'The contest is over.'}, status=status.HTTP_400_BAD_REQUEST)
+        _, created = ContestParticipant.objects.get_or_create(contest=contest, user=request.user)
+        if not created:
+            return Response({'detail': 'Already registered.'}, status=status.HTTP_200_OK)
+        return Response({'detail': 'Registered.'}, status=status.HTTP_201_CREATED)
+
+class ContestSubmitView(APIView):
+    """Submit a solution to a running contest.
+
+    Contest submissions skip the fair-share queue and the shared backlog
+    limit and go straight to the contest judge queue, counted in a backlog
+    of their own; the per-user rate limit still applies.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [SubmissionRateThrottle]
+    
+    def post(self, request, contest_id):
+        contest = get_object_or_404(Contest, id=contest_id)
+        if not contest.is_running():
+            return Response({'detail': 'The contest is not running.'}, status=status.HTTP_403_FORBIDDEN)
+        if not contest.participants.filter(user=request.user).exists():
+            return Response({'detail': 'Register for the contest first.'}, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = SubmissionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not contest.contest_problems.filter(problem=serializer.validated_data['problem']).exists():
+            return Response({'problem': ['Not a problem of this contest.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        submission = serializer.save(user=request.user, verdict='P', contest=contest)
+        publish_status(submission)
+        record_enqueued(contest=True)
+        judge_submission.apply_async((submission.id,), queue=settings.CONTEST_JUDGE_QUEUE)
+        return Response(SubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
+
+class ContestScoreboardView(APIView):
+    """The contest scoreboard, read straight from the cache.
+
+    Open to spectators. While the contest is frozen staff can ask for the
+    unfrozen board with ?final=true.
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, contest_id):
+        final = request.query_params.get('final', '').lower() in ('1', 'true', 'yes')
+        try:
+            board = get_scoreboard(contest_id)
+            if final and board['frozen'] and request.user.is_staff:
+                board = get_scoreboard(contest_id, final=True)
+        except Contest.DoesNotExist:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(board, status=status.HTTP_200_OK)
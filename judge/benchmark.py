@@ -0,0 +1,46 @@
+import statistics
+
+
+def summarize(values):
+    """Median, median absolute deviation and minimum of a series of runs"""
+    median = statistics.median(values)
+    return {
+        'median': median,
+        'mad': statistics.median(abs(value - median) for value in values),
+        'min': min(values),
+    }
+
+
+def summarize_rounds(rounds, warmup_runs):
+    """Reduce benchmark rounds to per-test and whole-testset statistics.
+
+    rounds is a list of rounds, each mapping a test case id to the
+    run_measured() result for that test. The first warmup_runs rounds are
+    discarded before any statistics are computed.
+    """
+    measured = rounds[warmup_runs:]
+    if not measured:
+        return None
+
+    tests = []
+    for test_case_id in measured[0]:
+        runs = [round_results[test_case_id] for round_results in measured]
+        tests.append({
+            'test_case': test_case_id,
+            'cpu_time': summarize([run['cpu_time'] for run in runs]),
+            'peak_memory': summarize([run['peak_memory'] for run in runs]),
+        })
+
+    return {
+        'tests': tests,
+        'total': {
+            'cpu_time': summarize([
+                sum(run['cpu_time'] for run in round_results.values())
+                for round_results in measured
+            ]),
+            'peak_memory': summarize([
+                max(run['peak_memory'] for run in round_results.values())
+                for round_results in measured
+            ]),
+        },
+    }
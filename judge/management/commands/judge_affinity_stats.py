@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from judge.routing import affinity_stats
+
+
+class Command(BaseCommand):
+    help = "Report each judge worker's testset cache hit rate and share of the judging load"
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(affinity_stats(), indent=2, sort_keys=True))
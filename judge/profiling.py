@@ -0,0 +1,130 @@
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+# Sizes used with a problem's input generator when it doesn't list its own
+DEFAULT_PROFILE_SIZES = [1000, 2000, 4000, 8000, 16000, 32000]
+
+# Each size is run this many times and the fastest run is kept
+PROFILE_REPEATS = 3
+
+# Candidate growth functions, simplest first so that ties favour them
+COMPLEXITY_CLASSES = [
+    ('O(1)', lambda n: 1.0),
+    ('O(log n)', lambda n: math.log2(n)),
+    ('O(n)', lambda n: float(n)),
+    ('O(n log n)', lambda n: n * math.log2(n)),
+    ('O(n^2)', lambda n: float(n) ** 2),
+    ('O(n^3)', lambda n: float(n) ** 3),
+]
+
+
+def run_measured(cmd, input_data, timeout=10, cpu=None):
+    """Run a command and report its own CPU time and peak memory.
+
+    Returns a dict with output, error, cpu_time (seconds), wall_time (seconds)
+    and peak_memory (MB). Resource usage comes from wait4() so it only covers
+    the child process, not the worker that spawned it. If cpu is given the
+    child is pinned to that core.
+    """
+    timed_out = threading.Event()
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as stdin_file, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as stdout_file, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as stderr_file:
+        stdin_file.write(input_data)
+        stdin_file.seek(0)
+
+        start_time = time.perf_counter()
+        process = subprocess.Popen(
+            cmd,
+            stdin=stdin_file,
+            stdout=stdout_file,
+            stderr=stderr_file,
+            preexec_fn=(lambda: os.sched_setaffinity(0, {cpu})) if cpu is not None else None
+        )
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            _, wait_status, usage = os.wait4(process.pid, 0)
+        finally:
+            timer.cancel()
+        wall_time = time.perf_counter() - start_time
+        process.returncode = os.waitstatus_to_exitcode(wait_status)
+
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        output = stdout_file.read().strip()
+        stderr = stderr_file.read().strip()
+
+    error = None
+    if timed_out.is_set():
+        error = "Time Limit Exceeded"
+    elif process.returncode != 0:
+        error = stderr or f"Exited with status {process.returncode}"
+
+    return {
+        'output': output,
+        'error': error,
+        'cpu_time': usage.ru_utime + usage.ru_stime,
+        'wall_time': wall_time,
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_memory': usage.ru_maxrss / 1024,
+    }
+
+
+def _linear_fit(xs, ys):
+    """Least-squares fit of ys = a + b * xs, returning (a, b, residual)"""
+    count = len(xs)
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+
+    if var_x == 0:
+        slope = 0.0
+    else:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    # A shrinking cost is noise, not a growth curve
+    if slope < 0:
+        slope = 0.0
+    intercept = mean_y - slope * mean_x
+
+    residual = sum((y - (intercept + slope * x)) ** 2 for x, y in zip(xs, ys))
+    return intercept, slope, residual
+
+
+def fit_complexity(sizes, values):
+    """Pick the complexity class whose curve best fits the measurements.
+
+    Returns a dict with the class label, the fitted coefficient and the
+    coefficient of determination, or None if there are fewer than three
+    distinct sizes to fit against.
+    """
+    if len(set(sizes)) < 3:
+        return None
+
+    mean_y = sum(values) / len(values)
+    total = sum((y - mean_y) ** 2 for y in values)
+
+    best = None
+    for label, func in COMPLEXITY_CLASSES:
+        xs = [func(n) for n in sizes]
+        _, slope, residual = _linear_fit(xs, values)
+        # Only switch to a faster-growing class on a clear improvement
+        if best is None or residual < best['residual'] * 0.9:
+            best = {'complexity': label, 'coefficient': slope, 'residual': residual}
+
+    r_squared = 1.0 if total == 0 else max(0.0, 1 - best['residual'] / total)
+    return {
+        'complexity': best['complexity'],
+        'coefficient': best['coefficient'],
+        'r_squared': round(r_squared, 4),
+    }
@@ -0,0 +1,221 @@
+"""Testset-affinity routing of submissions to judge workers.
+
+Every judge worker also consumes a queue of its own, judge.<hostname>,
+and the workers form a consistent hash ring. A submission goes to the
+first of its problem's JUDGE_AFFINITY_CANDIDATES workers on the ring that
+has fewer than JUDGE_AFFINITY_MAX_LOAD submissions in flight, so the
+problem's testset is usually already in that worker's memory. When they
+are all that busy it goes to the shared queue instead, which every judge
+worker also consumes, so the overflow goes to whichever worker is free.
+
+The broker doesn't favour a worker's own queue: a worker consuming both
+takes from them in turn, and from either one when the other is empty.
+Stolen work therefore takes up to half a busy worker's turns, and
+JUDGE_AFFINITY_MAX_LOAD is set deep enough that its own queue still has
+work waiting when its turn comes round.
+
+Each worker sits at JUDGE_AFFINITY_REPLICAS points on the ring. A worker
+joining or leaving only moves the problems next to its points, about 1/n
+of them, and the rest keep their warm workers.
+"""
+import bisect
+import hashlib
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+NODES_KEY = 'judge:nodes'
+NODE_QUEUE_PREFIX = 'judge.'
+STATS_FIELDS = ('hits', 'misses', 'judged', 'stolen')
+
+# Hostname of the judge worker in this process, set when it joins the ring
+current_node = None
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes, replicas=None):
+        replicas = replicas or settings.JUDGE_AFFINITY_REPLICAS
+        self.nodes = tuple(sorted(nodes))
+        points = sorted((_hash(f'{node}#{replica}'), node) for node in self.nodes for replica in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.owners = [node for _, node in points]
+
+    def preference(self, key, count=None):
+        """Up to `count` distinct nodes for key, in ring order from its hash"""
+        count = min(count or len(self.nodes), len(self.nodes))
+        found = []
+        start = bisect.bisect(self.hashes, _hash(key))
+        for offset in range(len(self.owners)):
+            node = self.owners[(start + offset) % len(self.owners)]
+            if node not in found:
+                found.append(node)
+                if len(found) == count:
+                    break
+        return found
+
+
+_ring = None
+
+
+def get_ring(nodes):
+    global _ring
+    if _ring is None or _ring.nodes != tuple(sorted(nodes)):
+        _ring = HashRing(nodes)
+    return _ring
+
+
+def node_queue(node):
+    return f'{NODE_QUEUE_PREFIX}{node}'
+
+
+def is_node_queue(queue):
+    return bool(queue) and queue.startswith(NODE_QUEUE_PREFIX)
+
+
+def get_nodes():
+    try:
+        return cache.get(NODES_KEY) or []
+    except Exception as e:
+        logger.warning(f"Judge ring unavailable: {e}")
+        return []
+
+
+def set_nodes(nodes):
+    try:
+        cache.set(NODES_KEY, sorted(set(nodes)), None)
+    except Exception as e:
+        logger.warning(f"Failed to update the judge ring: {e}")
+
+
+def pick_node(ring, problem_id, loads):
+    """The first of the problem's candidate nodes with room, or None for the shared queue"""
+    for node in ring.preference(problem_id, settings.JUDGE_AFFINITY_CANDIDATES):
+        if loads.get(node, 0) < settings.JUDGE_AFFINITY_MAX_LOAD:
+            loads[node] = loads.get(node, 0) + 1
+            return node
+    return None
+
+
+def route_submissions(submission_ids):
+    """Map each claimed submission to the queue it should be judged from; None is the shared queue"""
+    from submissions.scheduler import in_flight_by_node
+
+    nodes = get_nodes()
+    if not nodes:
+        return {submission_id: None for submission_id in submission_ids}
+
+    Submission = apps.get_model('submissions', 'Submission')
+    problems = dict(Submission.objects.filter(id__in=submission_ids).values_list('id', 'problem_id'))
+    ring = get_ring(nodes)
+    loads = in_flight_by_node()
+    routed = {}
+    for submission_id in submission_ids:
+        node = pick_node(ring, problems[submission_id], loads)
+        if node:
+            routed.setdefault(node, []).append(submission_id)
+
+    for node, node_submission_ids in routed.items():
+        Submission.objects.filter(id__in=node_submission_ids).update(judge_node=node)
+    queues = {submission_id: node_queue(node) for node, ids in routed.items() for submission_id in ids}
+    return {submission_id: queues.get(submission_id) for submission_id in submission_ids}
+
+
+def join_ring(hostname, worker):
+    """Give a judge worker its own queue and add it to the ring.
+
+    Only workers that take from the default queue judge practice
+    submissions; the benchmark and contest workers stay out.
+    """
+    global current_node
+    queues = worker.app.amqp.queues
+    default_queue = worker.app.conf.task_default_queue
+    if queues.consume_from and default_queue not in queues.consume_from:
+        return
+    queues.select_add(node_queue(hostname))
+    current_node = hostname
+    set_nodes(get_nodes() + [hostname])
+    logger.info(f"{hostname} joined the judge ring")
+
+
+def leave_ring():
+    if current_node:
+        set_nodes([node for node in get_nodes() if node != current_node])
+        logger.info(f"{current_node} left the judge ring")
+
+
+def refresh_nodes(app):
+    """Rebuild the ring from the workers that answer, and requeue what was routed to gone ones"""
+    from submissions.scheduler import requeue_routed
+
+    replies = app.control.inspect(timeout=settings.JUDGE_AFFINITY_INSPECT_TIMEOUT).active_queues() or {}
+    nodes = [
+        hostname for hostname, queues in replies.items()
+        if node_queue(hostname) in {queue['name'] for queue in queues}
+    ]
+    departed = set(get_nodes()) - set(nodes)
+    set_nodes(nodes)
+    requeued = requeue_routed(departed) if departed else 0
+    if departed:
+        logger.warning(f"Judge workers left the ring: {sorted(departed)}; requeued {requeued} submissions")
+    return nodes
+
+
+def stats_key(node, field):
+    return f'judge:affinity:{node}:{field}'
+
+
+def record_stat(field, count=1):
+    """Count an event against this worker's affinity stats"""
+    if not current_node:
+        return
+    key = stats_key(current_node, field)
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key, count)
+    except Exception as e:
+        logger.warning(f"Failed to record affinity stat {field}: {e}")
+
+
+def record_pickup(queue):
+    """Count a submission judged here, and whether it was stolen from the shared queue"""
+    record_stat('judged')
+    if current_node and queue != node_queue(current_node):
+        record_stat('stolen')
+
+
+def affinity_stats():
+    """Testset cache hit rate and judging load of each worker in the ring"""
+    nodes = get_nodes()
+    try:
+        counts = cache.get_many([stats_key(node, field) for node in nodes for field in STATS_FIELDS])
+    except Exception as e:
+        logger.warning(f"Affinity stats unavailable: {e}")
+        counts = {}
+
+    def hit_rate(hits, misses):
+        return round(hits / (hits + misses), 3) if hits + misses else None
+
+    per_node = {}
+    for node in nodes:
+        stats = {field: counts.get(stats_key(node, field), 0) for field in STATS_FIELDS}
+        stats['hit_rate'] = hit_rate(stats['hits'], stats['misses'])
+        per_node[node] = stats
+
+    judged = [stats['judged'] for stats in per_node.values()]
+    mean = sum(judged) / len(judged) if judged else 0
+    return {
+        'nodes': per_node,
+        'hit_rate': hit_rate(
+            sum(stats['hits'] for stats in per_node.values()), sum(stats['misses'] for stats in per_node.values())
+        ),
+        # Busiest worker's share over the average one's; 1.0 is perfectly even
+        'imbalance': round(max(judged) / mean, 3) if mean else None,
+    }
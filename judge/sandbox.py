@@ -0,0 +1,134 @@
+"""Running untrusted code in a throwaway container while measuring it.
+
+Profiling and benchmarking need the program's own CPU time and peak
+memory. Inside the container those come from its cgroup, which only
+holds the program and the shell that starts it: each run gets a fresh
+container, so the counters start at zero. The program's output, its exit
+status and the cgroup readings come back on the container's stdout,
+separated by a random boundary that the program can't guess.
+
+Without Docker, measure() falls back to running the program on the
+worker itself, as the judge does.
+"""
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+
+from .profiling import run_measured
+
+# Same limit as judging
+MEMORY_LIMIT = '100m'
+# Exit status of `timeout -s KILL`
+KILLED_STATUS = 137
+
+# cgroup v2 files first, then v1
+CPU_FILES = ('/sys/fs/cgroup/cpu.stat', '/sys/fs/cgroup/cpuacct/cpuacct.usage')
+MEMORY_FILES = ('/sys/fs/cgroup/memory.peak', '/sys/fs/cgroup/memory/memory.max_usage_in_bytes')
+
+SCRIPT = (
+    'start=$(date +%s%N); '
+    'timeout -s KILL {timeout} {command} /app/code{extension} < /app/input.txt > /tmp/stdout 2> /tmp/stderr; '
+    'status=$?; end=$(date +%s%N); '
+    'cat /tmp/stdout; printf "\\n{boundary}\\n"; '
+    'echo "status $status"; echo "wall $((end - start))"; '
+    'for f in {files}; do [ -r "$f" ] && echo "$f $(tr "\\n" " " < "$f")"; done; '
+    'printf "{boundary}\\n"; cat /tmp/stderr'
+)
+
+
+def _parse_stats(lines):
+    stats = {}
+    for line in lines:
+        name, _, value = line.partition(' ')
+        stats[name] = value.split()
+    return stats
+
+
+def _cpu_time(stats):
+    if CPU_FILES[0] in stats:
+        values = stats[CPU_FILES[0]]
+        fields = dict(zip(values[::2], values[1::2]))
+        return int(fields['usage_usec']) / 1e6
+    if CPU_FILES[1] in stats:
+        return int(stats[CPU_FILES[1]][0]) / 1e9
+    return None
+
+
+def _peak_memory(stats):
+    for name in MEMORY_FILES:
+        if name in stats:
+            return int(stats[name][0]) / (1024 * 1024)
+    return None
+
+
+def run_sandboxed(client, config, code_file, input_data, timeout=10, cpu=None):
+    """run_measured() for a program run in a container; returns the same dict.
+
+    If cpu is given the container is pinned to that core, otherwise to
+    SANDBOX_CPUSET when set.
+    """
+    boundary = uuid.uuid4().hex
+    input_file_path = None
+    try:
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as input_file:
+            input_file.write(input_data)
+            input_file_path = input_file.name
+
+        cpuset = str(cpu) if cpu is not None else settings.SANDBOX_CPUSET
+        run_kwargs = {'cpuset_cpus': cpuset} if cpuset else {}
+        container = client.containers.run(
+            config['image'],
+            ['sh', '-c', SCRIPT.format(
+                timeout=timeout, command=config['command'], extension=config['extension'],
+                boundary=boundary, files=' '.join(CPU_FILES + MEMORY_FILES),
+            )],
+            volumes={
+                code_file: {'bind': f'/app/code{config["extension"]}', 'mode': 'ro'},
+                input_file_path: {'bind': '/app/input.txt', 'mode': 'ro'},
+            },
+            working_dir='/app',
+            mem_limit=MEMORY_LIMIT,
+            network_disabled=True,
+            detach=True,
+            **run_kwargs,
+        )
+        try:
+            # Room for the container to start on top of the program's own limit
+            container.wait(timeout=timeout + 30)
+            logs = container.logs(stdout=True, stderr=False).decode('utf-8', errors='replace')
+        finally:
+            container.remove(force=True)
+    finally:
+        if input_file_path and os.path.exists(input_file_path):
+            os.remove(input_file_path)
+
+    output, _, rest = logs.partition(f'\n{boundary}\n')
+    stats_text, _, stderr = rest.partition(f'{boundary}\n')
+    stats = _parse_stats(stats_text.splitlines())
+    status = int(stats.get('status', ['1'])[0])
+
+    error = None
+    if status == KILLED_STATUS:
+        error = "Time Limit Exceeded"
+    elif status != 0:
+        error = stderr.strip() or f"Exited with status {status}"
+    cpu_time, peak_memory = _cpu_time(stats), _peak_memory(stats)
+    if error is None and (cpu_time is None or peak_memory is None):
+        error = "Container resource usage unavailable"
+
+    return {
+        'output': output.strip(),
+        'error': error,
+        'cpu_time': cpu_time,
+        'wall_time': int(stats['wall'][0]) / 1e9 if 'wall' in stats else None,
+        'peak_memory': peak_memory,
+    }
+
+
+def measure(client, config, code_file, input_data, timeout=10, cpu=None):
+    """Run and measure a program in a container, or on the worker when client is None"""
+    if client is not None:
+        return run_sandboxed(client, config, code_file, input_data, timeout=timeout, cpu=cpu)
+    return run_measured([config['local_command'], code_file], input_data, timeout=timeout, cpu=cpu)
@@ -0,0 +1,112 @@
+"""Splitting a submission's test cases across workers and combining the results.
+
+Tests are dealt out round-robin, so heavy tests clustered at the end of a
+testset are spread over every shard. Each shard runs its tests in order
+and reports [index, failing verdict or None, seconds, peak memory] for
+each one it ran.
+
+A failure at test index k is recorded in the cache, and every shard stops
+before running a test after k. Tests before k still run, so the earliest
+failing test always gets a result. The verdict is that test's, the same as
+judging the tests one after another would give, however the shards were
+timed.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Long enough to outlive any judging; the keys are deleted once it's done
+SHARD_STATE_TIMEOUT = 60 * 60
+
+
+def shard_count(total_tests):
+    """How many shards to judge a testset in; 1 judges it in one task"""
+    if settings.JUDGE_SHARD_MIN_TESTS <= 0:
+        return 1
+    return max(1, min(settings.JUDGE_MAX_SHARDS, total_tests // settings.JUDGE_SHARD_MIN_TESTS))
+
+
+def split_tests(test_case_ids, shards):
+    """Deal [index, test case id] pairs round-robin into `shards` lists"""
+    indexed = [[index, test_case_id] for index, test_case_id in enumerate(test_case_ids)]
+    return [indexed[shard::shards] for shard in range(shards)]
+
+
+def failure_key(token):
+    return f'judge:shards:{token}:failed'
+
+
+def passed_key(token):
+    return f'judge:shards:{token}:passed'
+
+
+def lowest_failure(token):
+    """Index of the earliest failing test reported so far, or None"""
+    try:
+        return cache.get(failure_key(token))
+    except Exception as e:
+        logger.warning(f"Shard failure flag unavailable: {e}")
+        return None
+
+
+def report_failure(token, index):
+    # Not atomic, but a lost race only leaves a later index, which makes
+    # shards run tests they could have skipped and never skip one they need
+    try:
+        current = cache.get(failure_key(token))
+        if current is None or index < current:
+            cache.set(failure_key(token), index, SHARD_STATE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Failed to report shard failure: {e}")
+
+
+def count_passed(token):
+    """Count one more passed test across the shards and return the total so far"""
+    try:
+        cache.add(passed_key(token), 0, SHARD_STATE_TIMEOUT)
+        return cache.incr(passed_key(token))
+    except Exception as e:
+        logger.warning(f"Shard progress counter unavailable: {e}")
+        return None
+
+
+def clear_shard_state(token):
+    try:
+        cache.delete_many([failure_key(token), passed_key(token)])
+    except Exception as e:
+        logger.warning(f"Failed to clear shard state: {e}")
+
+
+def reduce_shard_results(shard_results, total_tests):
+    """Combine the shards' outcomes into (verdict, passed tests, execution time, peak memory).
+
+    A test that should have run but has no outcome belongs to a shard that
+    died, and counts as a runtime error.
+    """
+    outcomes = {outcome[0]: outcome for results in shard_results for outcome in results}
+    memory_used = None
+    execution_time = 0
+    for index in range(total_tests):
+        outcome = outcomes.get(index)
+        if outcome is None:
+            return 'RE', index, None, None
+        _, failure, seconds, peak_memory = outcome
+        if failure:
+            return failure, index, None, None
+        execution_time = seconds
+        if peak_memory is not None:
+            memory_used = max(memory_used or 0, peak_memory)
+    return 'AC', total_tests, execution_time, memory_used
+
+
+def judging_seconds(shard_results):
+    """Worker time the shards spent running tests, summed over all of them.
+
+    This is what the submission cost the judges, which the backlog's wait
+    estimate counts in. Wall time from dispatch would also count the time
+    shards spent queued, and the time they ran side by side more than once.
+    """
+    return sum(outcome[2] for results in shard_results for outcome in results if outcome[2] is not None)
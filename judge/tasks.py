@@ -5,10 +5,30 @@ import logging
 import platform
 import time
 import subprocess
-from celery import shared_task
+import uuid
+from celery import chord, shared_task
 from django.apps import apps
+from django.conf import settings
 import ast
 
+from submissions.percentiles import record_accepted_submission
+from submissions.admission import record_judged
+from submissions.live_status import publish_status
+from submissions.progress import UNJUDGED_VERDICTS, record_verdict
+from submissions.tasks import dispatch_judging
+
+from .benchmark import summarize_rounds
+from .profiling import (
+    DEFAULT_PROFILE_SIZES, PROFILE_REPEATS, fit_complexity, run_measured,
+)
+from .routing import is_node_queue, record_pickup, record_stat, refresh_nodes
+from .sandbox import measure, run_sandboxed
+from .sharding import (
+    clear_shard_state, count_passed, judging_seconds, lowest_failure, reduce_shard_results,
+    report_failure, shard_count, split_tests,
+)
+from .testsets import get_test_cases
+
 logger = logging.getLogger(__name__)
 
 # Add language-specific execution logic
@@ -65,7 +85,10 @@ def get_docker_client():
         return None
 
 def execute_code_locally(code_file, input_data, language, timeout=5):
-    """Fallback execution without Docker"""
+    """Fallback execution without Docker.
+
+    Returns (output, error, peak_memory) with peak_memory in MB.
+    """
     try:
         config = LANGUAGE_CONFIGS.get(language, LANGUAGE_CONFIGS['python'])
         
@@ -77,7 +100,18 @@ def execute_code_locally(code_file, input_data, language, timeout=5):
         else:
             cmd = [config['local_command'], code_file]
         
-        # Execute with input - FIXED: removed timeout from Popen
+        # Replace literal '\n' with actual newlines in input
+        formatted_input = input_data.replace('\\n', '\n')
+        
+        # Run through run_measured so the peak memory of the program is known
+        if hasattr(os, 'wait4'):
+            result = run_measured(cmd, formatted_input, timeout=timeout)
+            if result['error']:
+                return None, result['error'], None
+            
+            return result['output'], None, result['peak_memory']
+        
+        # Without wait4() (Windows) the program runs unmeasured
         process = subprocess.Popen(
             cmd,
             stdin=subprocess.PIPE,
@@ -86,193 +120,269 @@ def execute_code_locally(code_file, input_data, language, timeout=5):
             text=True
         )
         
-        # Replace literal '\n' with actual newlines in input
-        formatted_input = input_data.replace('\\n', '\n')
-        
         try:
             stdout, stderr = process.communicate(input=formatted_input, timeout=timeout)
             
             if process.returncode != 0:
-                return None, stderr.strip()
+                return None, stderr.strip(), None
             
-            return stdout.strip(), None
+            return stdout.strip(), None, None
             
         except subprocess.TimeoutExpired:
             process.kill()
-            stdout, stderr = process.communicate()
-            return None, "Time Limit Exceeded"
+            process.communicate()
+            return None, "Time Limit Exceeded", None
+        
+    except Exception as e:
+        return None, str(e), None
+
+def run_test_case(client, config, code_file, test_case, language):
+    """Run the code on one test case, in Docker when a client is given.
+
+    Returns (failing verdict or None if it passed, seconds, peak memory in MB).
+    """
+    input_file_path = None
+    start_time = time.time()
+    try:
+        output = None
+        error = None
+        peak_memory = None
+        
+        if client is not None:
+            # Docker execution
+            try:
+                # Create a temporary input file
+                with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as input_file:
+                    formatted_input = test_case.input.replace('\\n', '\n')
+                    input_file.write(formatted_input)
+                    input_file_path = input_file.name
+                
+                run_kwargs = {}
+                if settings.SANDBOX_CPUSET:
+                    run_kwargs['cpuset_cpus'] = settings.SANDBOX_CPUSET
+                
+                # Run the code in a container with input from file
+                container = client.containers.run(
+                    config['image'],
+                    f'sh -c "cat /app/input.txt | {config["command"]} /app/code{config["extension"]}"',
+                    volumes={
+                        code_file: {'bind': f'/app/code{config["extension"]}', 'mode': 'ro'},
+                        input_file_path: {'bind': '/app/input.txt', 'mode': 'ro'}
+                    },
+                    working_dir='/app',
+                    remove=True,
+                    mem_limit='100m',
+                    stdout=True,
+                    stderr=True,
+                    detach=False,
+                    **run_kwargs
+                )
+                
+                output = container.decode('utf-8').strip()
+                
+            except docker.errors.ContainerError as e:
+                error = f"Container error: {e.stderr.decode('utf-8') if hasattr(e, 'stderr') else str(e)}"
+            except Exception as e:
+                error = f"Docker execution error: {str(e)}"
+                
+        else:
+            # Local execution fallback
+            logger.info("Using local execution fallback")
+            output, error, peak_memory = execute_code_locally(
+                code_file, 
+                test_case.input, 
+                language
+            )
+        
+        execution_time = time.time() - start_time
+        
+        if error:
+            logger.error(f"Execution error: {error}")
+            if "Time Limit Exceeded" in error:
+                return 'TLE', execution_time, peak_memory
+            return 'RE', execution_time, peak_memory  # Runtime Error
         
+        expected = test_case.expected_output.strip()
+        logger.info(f"Expected: '{expected}' | Got: '{output}'")
+
+        # Try to parse outputs for comparison
+        try:
+            # For numeric or boolean outputs
+            parsed_output = ast.literal_eval(output)
+            parsed_expected = ast.literal_eval(expected)
+            is_correct = parsed_output == parsed_expected
+            logger.info(f"Parsed comparison: {parsed_output} == {parsed_expected} -> {is_correct}")
+        except:
+            # For string outputs, compare directly
+            is_correct = output == expected
+            logger.info(f"String comparison: '{output}' == '{expected}' -> {is_correct}")
+        
+        return (None if is_correct else 'WA'), execution_time, peak_memory  # Wrong Answer
+            
     except Exception as e:
-        return None, str(e)
+        logger.error(f"Error executing test case {test_case.id}: {e}")
+        return 'RE', time.time() - start_time, None  # Runtime Error
+        
+    finally:
+        # Clean up input file
+        try:
+            if input_file_path and os.path.exists(input_file_path):
+                os.remove(input_file_path)
+        except Exception as e:
+            logger.warning(f"Failed to clean up input file: {e}")
+
+def write_code_file(submission, config):
+    with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False, encoding='utf-8') as f:
+        f.write(submission.code)
+        logger.info(f"Temporary code file created: {f.name}")
+        return f.name
+
+def finish_judging(submission, passed_tests, total_tests, elapsed):
+    """Everything that follows a final verdict"""
+    if submission.verdict == 'AC':
+        record_accepted_submission(submission)
+    # Update scores and solved/attempted status now the verdict is final
+    record_verdict(submission)
+    publish_status(submission, passed=passed_tests, total=total_tests)
+    record_judged(elapsed, contest=submission.contest_id is not None)
+    # A judge slot is free; hand out the next submission
+    dispatch_judging.delay()
+
+def fail_judging(submission_id, generation, elapsed):
+    """Give a submission judging gave up on a runtime error, unless it already has a verdict.
+
+    elapsed is None when how long it was judged for isn't known.
+    """
+    try:
+        Submission = apps.get_model('submissions', 'Submission')
+        unjudged = Submission.objects.filter(id=submission_id, verdict__in=UNJUDGED_VERDICTS)
+        if generation is not None:
+            unjudged = unjudged.filter(dispatch_generation=generation)
+        if not unjudged.update(verdict='RE'):
+            return
+        finish_judging(Submission.objects.get(id=submission_id), None, None, elapsed)
+    except Exception as save_error:
+        logger.error(f"Failed to update submission status: {save_error}")
+
+def judge_in_shards(task, submission, test_case_ids, shards):
+    """Judge the tests as a chord of shards on the queue this task came from.
+
+    Shards of a submission routed to one worker go to the shared queue
+    instead, so that other workers can take them.
+    """
+    token = uuid.uuid4().hex
+    queue = (task.request.delivery_info or {}).get('routing_key')
+    options = {'queue': queue} if queue and not is_node_queue(queue) else {}
+    header = [
+        judge_shard.si(submission.id, shard, token, len(test_case_ids)).set(**options)
+        for shard in split_tests(test_case_ids, shards)
+    ]
+    body = finish_sharded_judging.s(submission.id, len(test_case_ids), token).set(**options)
+    # A shard whose worker died fails the chord, and the body never runs
+    body.on_error(abandon_sharded_judging.si(submission.id, token).set(**options))
+    logger.info(f"Judging submission {submission.id} in {shards} shards")
+    chord(header)(body)
 
 @shared_task(bind=True, max_retries=3)
-def judge_submission(self, submission_id):
+def judge_submission(self, submission_id, generation=None):
+    """Judge a submission; generation is the dispatch it was claimed in, None outside the scheduler"""
     code_file = None
-    input_file_path = None
+    submission = None
+    started = time.monotonic()
     
     try:
         Submission = apps.get_model('submissions', 'Submission')
-        TestCase = apps.get_model('problems', 'TestCase')
         
         submission = Submission.objects.get(id=submission_id)
-        problem = submission.problem
-        test_cases = TestCase.objects.filter(problem=problem)
+        # Starting is one conditional update, so a requeue either happens
+        # first and is seen here, or finds it judging and leaves it alone.
+        # Only a retry of this task may pick up a submission already judging;
+        # a redelivered or duplicated message finds it started or judged
+        started_verdicts = UNJUDGED_VERDICTS if self.request.retries else ('P',)
+        current = Submission.objects.filter(id=submission_id, queue_tag__isnull=True, verdict__in=started_verdicts)
+        if generation is not None:
+            current = current.filter(dispatch_generation=generation)
+        if not current.update(verdict='Judging'):
+            # Put back in the queue after the worker it was sent to left,
+            # and maybe dispatched again since, or a second delivery
+            logger.info(f"Submission {submission_id} was requeued or already started, skipping")
+            return
+        record_pickup((self.request.delivery_info or {}).get('routing_key'))
+        test_cases, cached = get_test_cases(submission.problem_id)
+        record_stat('hits' if cached else 'misses')
         language = submission.language
         
-        # Update submission status
+        # Already saved by the update above
         submission.verdict = 'Judging'
-        submission.save()
+        
+        passed_tests = 0
+        total_tests = len(test_cases)
+        publish_status(submission, passed=0, total=total_tests)
+        
+        # Large testsets are spread over several workers
+        shards = shard_count(total_tests)
+        if shards > 1:
+            judge_in_shards(self, submission, [test_case.id for test_case in test_cases], shards)
+            return
         
         # Get language configuration
         config = LANGUAGE_CONFIGS.get(language, LANGUAGE_CONFIGS['python'])
         
         # Create a temporary file with the user's code
-        with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False, encoding='utf-8') as f:
-            f.write(submission.code)
-            code_file = f.name
-            logger.info(f"Temporary code file created: {code_file}")
+        code_file = write_code_file(submission, config)
 
         # Try Docker first, then fallback to local execution
         client = get_docker_client()
-        use_docker = client is not None
         
-        passed_tests = 0
-        total_tests = test_cases.count()
         execution_time = 0
+        memory_used = None
         
         for i, test_case in enumerate(test_cases):
             logger.info(f"Running test case {i+1}/{total_tests}")
             
-            try:
-                start_time = time.time()
-                output = None
-                error = None
-                
-                if use_docker:
-                    # Docker execution
-                    try:
-                        # Create a temporary input file
-                        with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as input_file:
-                            formatted_input = test_case.input.replace('\\n', '\n')
-                            input_file.write(formatted_input)
-                            input_file_path = input_file.name
-                        
-                        # Run the code in a container with input from file
-                        container = client.containers.run(
-                            config['image'],
-                            f'sh -c "cat /app/input.txt | {config["command"]} /app/code{config["extension"]}"',
-                            volumes={
-                                code_file: {'bind': f'/app/code{config["extension"]}', 'mode': 'ro'},
-                                input_file_path: {'bind': '/app/input.txt', 'mode': 'ro'}
-                            },
-                            working_dir='/app',
-                            remove=True,
-                            mem_limit='100m',
-                            stdout=True,
-                            stderr=True,
-                            detach=False
-                        )
-                        
-                        output = container.decode('utf-8').strip()
-                        
-                    except docker.errors.ContainerError as e:
-                        error = f"Container error: {e.stderr.decode('utf-8') if hasattr(e, 'stderr') else str(e)}"
-                    except Exception as e:
-                        error = f"Docker execution error: {str(e)}"
-                        
-                else:
-                    # Local execution fallback
-                    logger.info("Using local execution fallback")
-                    output, error = execute_code_locally(
-                        code_file, 
-                        test_case.input, 
-                        language
-                    )
-                
-                execution_time = time.time() - start_time
-                
-                if error:
-                    logger.error(f"Execution error: {error}")
-                    if "Time Limit Exceeded" in error:
-                        submission.verdict = 'TLE'
-                    else:
-                        submission.verdict = 'RE'  # Runtime Error
-                    submission.save()
-                    break
-                
-                expected = test_case.expected_output.strip()
-                logger.info(f"Expected: '{expected}' | Got: '{output}'")
-
-                # Try to parse outputs for comparison
-                try:
-                    # For numeric or boolean outputs
-                    parsed_output = ast.literal_eval(output)
-                    parsed_expected = ast.literal_eval(expected)
-                    is_correct = parsed_output == parsed_expected
-                    logger.info(f"Parsed comparison: {parsed_output} == {parsed_expected} -> {is_correct}")
-                except:
-                    # For string outputs, compare directly
-                    is_correct = output == expected
-                    logger.info(f"String comparison: '{output}' == '{expected}' -> {is_correct}")
-                
-                # Check if the output matches the expected output
-                if is_correct:
-                    passed_tests += 1
-                    logger.info(f"Test case {i+1} passed")
-                else:
-                    submission.verdict = 'WA'  # Wrong Answer
-                    submission.save()
-                    logger.info(f"Test case {i+1} failed")
-                    break
-                    
-            except Exception as e:
-                logger.error(f"Error executing test case {i+1}: {e}")
-                submission.verdict = 'RE'  # Runtime Error
+            failure, execution_time, peak_memory = run_test_case(client, config, code_file, test_case, language)
+            if peak_memory is not None:
+                memory_used = max(memory_used or 0, peak_memory)
+            
+            # Check if the output matches the expected output
+            if failure:
+                submission.verdict = failure
                 submission.save()
+                logger.info(f"Test case {i+1} failed")
                 break
-                
-            finally:
-                # Clean up input file
-                try:
-                    if input_file_path and os.path.exists(input_file_path):
-                        os.remove(input_file_path)
-                        input_file_path = None
-                except Exception as e:
-                    logger.warning(f"Failed to clean up input file: {e}")
+            
+            passed_tests += 1
+            logger.info(f"Test case {i+1} passed")
+            publish_status(submission, passed=passed_tests, total=total_tests)
                 
         else:
             # All test cases passed (no break)
             if passed_tests == total_tests:
                 submission.verdict = 'AC'  # Accepted
                 submission.execution_time = execution_time
+                submission.memory_used = memory_used
                 submission.save()
                 logger.info(f"Submission {submission_id} judged successfully - All {passed_tests}/{total_tests} tests passed")
             else:
                 submission.verdict = 'WA'
                 submission.save()
+        
+        finish_judging(submission, passed_tests, total_tests, time.monotonic() - started)
                 
     except Submission.DoesNotExist:
         logger.error(f"Submission {submission_id} does not exist")
         return
     except Exception as e:
         logger.error(f"Error in judge_submission task: {e}")
-        # Update submission status to indicate error
-        try:
-            Submission = apps.get_model('submissions', 'Submission')
-            submission = Submission.objects.get(id=submission_id)
-            submission.verdict = 'RE'
-            submission.save()
-        except Exception as save_error:
-            logger.error(f"Failed to update submission status: {save_error}")
         
-        # Retry the task only for certain errors
+        # Retry the task only for certain errors; it stays 'Judging' meanwhile
         if "connection" in str(e).lower() or "docker" in str(e).lower():
-            try:
-                self.retry(exc=e, countdown=60)
-            except self.MaxRetriesExceededError:
-                logger.error(f"Max retries exceeded for submission {submission_id}")
+            if self.request.retries < self.max_retries:
+                raise self.retry(exc=e, countdown=60)
+            logger.error(f"Max retries exceeded for submission {submission_id}")
         else:
             logger.error(f"Non-retryable error for submission {submission_id}")
+        fail_judging(submission_id, generation, time.monotonic() - started)
             
     finally:
         # Clean up temporary files
@@ -281,12 +391,82 @@ def judge_submission(self, submission_id):
                 os.remove(code_file)
         except Exception as e:
             logger.warning(f"Failed to clean up code file: {e}")
+
+@shared_task
+def judge_shard(submission_id, shard, token, total_tests):
+    """Run one shard's [index, test case id] pairs in order and return their outcomes.
+
+    Stops before any test after the earliest failure reported by a shard.
+    Never raises, so the chord always reaches its reducer; tests it didn't
+    get to are treated as runtime errors there.
+    """
+    code_file = None
+    results = []
+    
+    try:
+        Submission = apps.get_model('submissions', 'Submission')
         
+        submission = Submission.objects.get(id=submission_id)
+        test_cases = {test_case.id: test_case for test_case in get_test_cases(submission.problem_id)[0]}
+        config = LANGUAGE_CONFIGS.get(submission.language, LANGUAGE_CONFIGS['python'])
+        code_file = write_code_file(submission, config)
+        client = get_docker_client()
+        
+        for index, test_case_id in shard:
+            failed = lowest_failure(token)
+            if failed is not None and index > failed:
+                logger.info(f"Shard of submission {submission_id} cancelled at test {index + 1}")
+                break
+            
+            failure, execution_time, peak_memory = run_test_case(
+                client, config, code_file, test_cases[test_case_id], submission.language
+            )
+            results.append([index, failure, execution_time, peak_memory])
+            if failure:
+                report_failure(token, index)
+                break
+            publish_status(submission, passed=count_passed(token), total=total_tests)
+            
+    except Exception as e:
+        logger.error(f"Error in judge_shard task for submission {submission_id}: {e}")
+        
+    finally:
         try:
-            if input_file_path and os.path.exists(input_file_path):
-                os.remove(input_file_path)
+            if code_file and os.path.exists(code_file):
+                os.remove(code_file)
         except Exception as e:
-            logger.warning(f"Failed to clean up input file: {e}")
+            logger.warning(f"Failed to clean up code file: {e}")
+    
+    return results
+
+@shared_task
+def finish_sharded_judging(shard_results, submission_id, total_tests, token):
+    """Chord body: settle the verdict from every shard's outcomes, unless judging was given up on"""
+    clear_shard_state(token)
+    Submission = apps.get_model('submissions', 'Submission')
+    
+    verdict, passed_tests, execution_time, memory_used = reduce_shard_results(shard_results, total_tests)
+    fields = {'verdict': verdict}
+    if verdict == 'AC':
+        fields.update(execution_time=execution_time, memory_used=memory_used)
+    if not Submission.objects.filter(id=submission_id, verdict='Judging').update(**fields):
+        logger.info(f"Submission {submission_id} already has a verdict, dropping its shards' results")
+        return
+    submission = Submission.objects.get(id=submission_id)
+    logger.info(f"Submission {submission_id} judged in shards - {verdict}, {passed_tests}/{total_tests} tests passed")
+    
+    finish_judging(submission, passed_tests, total_tests, judging_seconds(shard_results))
+
+@shared_task
+def abandon_sharded_judging(submission_id, token):
+    """Chord error callback: a shard failed, so give the submission a runtime error"""
+    logger.error(f"A shard of submission {submission_id} failed, giving up on judging it")
+    clear_shard_state(token)
+    fail_judging(submission_id, None, None)
+
+@shared_task(bind=True)
+def refresh_judge_ring(self):
+    return refresh_nodes(self.app)
 
 @shared_task
 def analyze_submission(submission_id):
@@ -324,4 +504,189 @@ def analyze_submission(submission_id):
             submission.ai_status = 'Failed'
             submission.save()
         except:
-            pass
\ No newline at end of file
+            pass
+
+def generate_profile_inputs(problem, client=None, timeout=30):
+    """Collect (size, input) pairs for profiling, smallest first.
+
+    The problem's generator runs in a container when a Docker client is given.
+    """
+    inputs = [
+        (profile_input.size, profile_input.input.replace('\\n', '\n'))
+        for profile_input in problem.profile_inputs.all()
+    ]
+    if inputs or not problem.profile_generator:
+        return inputs
+
+    generator_file = None
+    try:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
+            f.write(problem.profile_generator)
+            generator_file = f.name
+
+        for size in sorted(problem.profile_sizes or DEFAULT_PROFILE_SIZES):
+            if client is not None:
+                result = run_sandboxed(client, LANGUAGE_CONFIGS['python'], generator_file, str(size), timeout=timeout)
+                if result['error']:
+                    raise RuntimeError(f"Input generator failed for n={size}: {result['error']}")
+                inputs.append((size, result['output']))
+                continue
+            result = subprocess.run(
+                [LANGUAGE_CONFIGS['python']['local_command'], generator_file],
+                input=str(size),
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"Input generator failed for n={size}: {result.stderr.strip()}")
+            inputs.append((size, result.stdout))
+    finally:
+        if generator_file and os.path.exists(generator_file):
+            os.remove(generator_file)
+
+    return inputs
+
+@shared_task
+def profile_submission(submission_id):
+    code_file = None
+
+    try:
+        Submission = apps.get_model('submissions', 'Submission')
+        submission = Submission.objects.select_related('problem').get(id=submission_id)
+
+        submission.profile_status = 'Processing'
+        submission.save(update_fields=['profile_status'])
+
+        # Like judging, run in a container and only fall back to the worker without Docker
+        client = get_docker_client()
+        inputs = generate_profile_inputs(submission.problem, client)
+        if not inputs:
+            submission.profile_status = 'Failed'
+            submission.profile_result = {'error': 'Problem has no profiling inputs'}
+            submission.save(update_fields=['profile_status', 'profile_result'])
+            return
+
+        config = LANGUAGE_CONFIGS.get(submission.language, LANGUAGE_CONFIGS['python'])
+        with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False, encoding='utf-8') as f:
+            f.write(submission.code)
+            code_file = f.name
+
+        samples = []
+        for size, input_data in inputs:
+            runs = [measure(client, config, code_file, input_data) for _ in range(PROFILE_REPEATS)]
+            failed = next((run for run in runs if run['error']), None)
+            if failed:
+                # Larger sizes will only fail the same way, so stop here
+                samples.append({'n': size, 'error': failed['error']})
+                break
+            samples.append({
+                'n': size,
+                'cpu_time': min(run['cpu_time'] for run in runs),
+                'peak_memory': min(run['peak_memory'] for run in runs),
+            })
+            logger.info(f"Profiled submission {submission_id} at n={size}: {samples[-1]}")
+
+        measured = [sample for sample in samples if 'error' not in sample]
+        sizes = [sample['n'] for sample in measured]
+        time_fit = fit_complexity(sizes, [sample['cpu_time'] for sample in measured])
+        memory_fit = fit_complexity(sizes, [sample['peak_memory'] for sample in measured])
+
+        submission.profile_result = {
+            'samples': samples,
+            'time': time_fit,
+            'memory': memory_fit,
+        }
+        submission.complexity = time_fit['complexity'] if time_fit else ''
+        submission.profile_status = 'Completed'
+        submission.save(update_fields=['profile_status', 'profile_result', 'complexity'])
+
+    except Exception as e:
+        logger.error(f"Error in profile_submission task: {e}")
+        try:
+            Submission = apps.get_model('submissions', 'Submission')
+            Submission.objects.filter(id=submission_id).update(
+                profile_status='Failed',
+                profile_result={'error': str(e)}
+            )
+        except Exception as save_error:
+            logger.error(f"Failed to update profile status: {save_error}")
+
+    finally:
+        try:
+            if code_file and os.path.exists(code_file):
+                os.remove(code_file)
+        except Exception as e:
+            logger.warning(f"Failed to clean up code file: {e}")
+
+
+@shared_task
+def benchmark_submission(submission_id):
+    code_file = None
+
+    try:
+        Submission = apps.get_model('submissions', 'Submission')
+        TestCase = apps.get_model('problems', 'TestCase')
+        submission = Submission.objects.get(id=submission_id)
+
+        submission.benchmark_status = 'Processing'
+        submission.save(update_fields=['benchmark_status'])
+
+        test_cases = list(
+            TestCase.objects.filter(problem_id=submission.problem_id, is_benchmark=True).order_by('id')
+        )
+        if not test_cases:
+            submission.benchmark_status = 'Failed'
+            submission.benchmark_result = {'error': 'Problem has no benchmark tests'}
+            submission.save(update_fields=['benchmark_status', 'benchmark_result'])
+            return
+
+        config = LANGUAGE_CONFIGS.get(submission.language, LANGUAGE_CONFIGS['python'])
+        with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False, encoding='utf-8') as f:
+            f.write(submission.code)
+            code_file = f.name
+
+        # Runs in a container pinned to the benchmark core, or on the worker without Docker
+        client = get_docker_client()
+
+        # Interleave the tests within each round so slow drift on the core
+        # affects every test equally instead of skewing the last ones
+        rounds = []
+        for _ in range(settings.BENCHMARK_WARMUP_RUNS + settings.BENCHMARK_RUNS):
+            round_results = {}
+            for test_case in test_cases:
+                result = measure(
+                    client, config, code_file, test_case.input.replace('\\n', '\n'), cpu=settings.BENCHMARK_CPU
+                )
+                if result['error']:
+                    raise RuntimeError(f"Test case {test_case.id} failed: {result['error']}")
+                round_results[test_case.id] = result
+            rounds.append(round_results)
+
+        submission.benchmark_result = {
+            'runs': settings.BENCHMARK_RUNS,
+            'warmup_runs': settings.BENCHMARK_WARMUP_RUNS,
+            'cpu': settings.BENCHMARK_CPU,
+            **summarize_rounds(rounds, settings.BENCHMARK_WARMUP_RUNS),
+        }
+        submission.benchmark_status = 'Completed'
+        submission.save(update_fields=['benchmark_status', 'benchmark_result'])
+        logger.info(f"Benchmarked submission {submission_id} over {len(test_cases)} tests")
+
+    except Exception as e:
+        logger.error(f"Error in benchmark_submission task: {e}")
+        try:
+            Submission = apps.get_model('submissions', 'Submission')
+            Submission.objects.filter(id=submission_id).update(
+                benchmark_status='Failed',
+                benchmark_result={'error': str(e)}
+            )
+        except Exception as save_error:
+            logger.error(f"Failed to update benchmark status: {save_error}")
+
+    finally:
+        try:
+            if code_file and os.path.exists(code_file):
+                os.remove(code_file)
+        except Exception as e:
+            logger.warning(f"Failed to clean up code file: {e}")
@@ -1,3 +1,383 @@
-from django.test import TestCase
+import math
+import os
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from problems.models import Problem, TestCase as ProblemTestCase
+from submissions.admission import get_backlog, record_enqueued
+from submissions.live_status import get_status
+from submissions.models import Submission, UserProblemStatus
+from submissions.scheduler import next_queue_tags, requeue_routed
+from submissions.tasks import dispatch_judging, fail_stale_judging
+from . import routing, tasks
+from .benchmark import summarize, summarize_rounds
+from .profiling import fit_complexity, run_measured
+from .routing import HashRing, affinity_stats, get_nodes, refresh_nodes, set_nodes
+from .sandbox import measure, run_sandboxed
+from .sharding import judging_seconds, reduce_shard_results, shard_count, split_tests
+from .testsets import LRUCache, clear_testsets, get_test_cases
+
+
+class ComplexityFitTests(SimpleTestCase):
+    sizes = [1000, 2000, 4000, 8000, 16000, 32000]
+
+    def test_fit_linear(self):
+        times = [0.02 + 3e-6 * n for n in self.sizes]
+        self.assertEqual(fit_complexity(self.sizes, times)['complexity'], 'O(n)')
+
+    def test_fit_n_log_n(self):
+        times = [0.02 + 1e-7 * n * math.log2(n) for n in self.sizes]
+        self.assertEqual(fit_complexity(self.sizes, times)['complexity'], 'O(n log n)')
+
+    def test_fit_quadratic(self):
+        times = [0.02 + 1e-9 * n * n for n in self.sizes]
+        self.assertEqual(fit_complexity(self.sizes, times)['complexity'], 'O(n^2)')
+
+    def test_fit_constant(self):
+        times = [0.05] * len(self.sizes)
+        self.assertEqual(fit_complexity(self.sizes, times)['complexity'], 'O(1)')
+
+    def test_fit_needs_three_sizes(self):
+        self.assertIsNone(fit_complexity([10, 20], [0.1, 0.2]))
+
+
+class RunMeasuredTests(SimpleTestCase):
+    def test_reports_output_and_usage(self):
+        result = run_measured([sys.executable, '-c', 'print(input()[::-1])'], 'abc\n')
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['output'], 'cba')
+        self.assertGreater(result['peak_memory'], 0)
+
+    def test_time_limit(self):
+        result = run_measured([sys.executable, '-c', 'while True: pass'], '', timeout=0.5)
+        self.assertEqual(result['error'], 'Time Limit Exceeded')
+
+    def test_local_execution_without_wait4(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py') as code_file:
+            code_file.write('print(input()[::-1])')
+            code_file.flush()
+            with mock.patch.dict(os.__dict__):
+                del os.wait4
+                self.assertEqual(tasks.execute_code_locally(code_file.name, 'abc', 'python'), ('cba', None, None))
+
+
+class BenchmarkStatisticsTests(SimpleTestCase):
+    def test_summarize(self):
+        stats = summarize([1.0, 1.2, 0.9, 5.0, 1.1])
+        self.assertEqual(stats['median'], 1.1)
+        self.assertAlmostEqual(stats['mad'], 0.1)
+        self.assertEqual(stats['min'], 0.9)
+
+    def test_warmup_rounds_are_discarded(self):
+        rounds = [
+            {1: {'cpu_time': cpu_time, 'peak_memory': 10.0}, 2: {'cpu_time': cpu_time, 'peak_memory': 20.0}}
+            for cpu_time in (9.0, 1.0, 1.0, 1.0)
+        ]
+        result = summarize_rounds(rounds, warmup_runs=1)
+        self.assertEqual(result['tests'][0]['cpu_time']['median'], 1.0)
+        self.assertEqual(result['total']['cpu_time']['median'], 2.0)
+        self.assertEqual(result['total']['peak_memory']['median'], 20.0)
+
+    def test_only_warmup_rounds(self):
+        self.assertIsNone(summarize_rounds([{1: {'cpu_time': 1.0, 'peak_memory': 1.0}}], warmup_runs=1))
+
+
+class ShardReductionTests(SimpleTestCase):
+    def test_tests_are_dealt_round_robin(self):
+        self.assertEqual(split_tests([10, 11, 12, 13, 14], 2), [[[0, 10], [2, 12], [4, 14]], [[1, 11], [3, 13]]])
+
+    @override_settings(JUDGE_SHARD_MIN_TESTS=50, JUDGE_MAX_SHARDS=4)
+    def test_shard_count(self):
+        self.assertEqual([shard_count(total) for total in (0, 99, 100, 150, 1000)], [1, 1, 2, 3, 4])
+
+    def test_earliest_failure_decides_whatever_the_order(self):
+        shards = [[[0, None, 0.1, 5.0], [3, 'WA', 0.1, 5.0]], [[1, None, 0.1, 5.0], [4, 'TLE', 5.0, None]], [[2, 'RE', 0.1, None]]]
+        self.assertEqual(reduce_shard_results(shards, 6), ('RE', 2, None, None))
+        self.assertEqual(reduce_shard_results(shards[::-1], 6), ('RE', 2, None, None))
+
+    def test_all_passed(self):
+        shards = [[[0, None, 0.1, 5.0], [2, None, 0.3, 4.0]], [[1, None, 0.2, 7.0]]]
+        self.assertEqual(reduce_shard_results(shards, 3), ('AC', 3, 0.3, 7.0))
+
+    def test_missing_tests_are_runtime_errors(self):
+        self.assertEqual(reduce_shard_results([[[0, None, 0.1, 5.0]], []], 2), ('RE', 1, None, None))
+
+    def test_judging_time_is_summed_over_shards(self):
+        shards = [[[0, None, 0.5, 5.0], [2, 'WA', 0.25, 4.0]], [[1, 'RE', 1.0, None]], []]
+        self.assertEqual(judging_seconds(shards), 1.75)
+
+
+@override_settings(JUDGE_SHARD_MIN_TESTS=2, JUDGE_MAX_SHARDS=3)
+class ShardedJudgingTests(TestCase):
+    CODE = "s = input()\nif s == 'crash':\n    raise SystemExit(1)\nprint(s)\n"
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpass123')
+        self.problem = Problem.objects.create(title="Many tests", description="Test", difficulty="easy", points=10)
+
+    def judge(self, inputs, expected):
+        for input_data, output in zip(inputs, expected):
+            ProblemTestCase.objects.create(problem=self.problem, input=input_data, expected_output=output)
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code=self.CODE)
+        with mock.patch('judge.tasks.run_test_case', wraps=tasks.run_test_case) as run_test_case:
+            tasks.judge_submission.delay(submission.id)
+        submission.refresh_from_db()
+        return submission, run_test_case.call_count
+
+    def test_accepted(self):
+        submission, runs = self.judge(['1', '2', '3', '4', '5', '6'], ['1', '2', '3', '4', '5', '6'])
+        self.assertEqual(submission.verdict, 'AC')
+        self.assertEqual(runs, 6)
+        self.assertIsNotNone(submission.execution_time)
+        status = get_status(submission.id, self.user.id)
+        self.assertEqual((status['passed'], status['total'], status['done']), (6, 6, True))
+
+    def test_earliest_failure_cancels_later_tests(self):
+        # Shards are [0, 3], [1, 4] and [2, 5], run one after another here.
+        # Test 3 fails first, but test 1 comes earlier in the testset and
+        # decides the verdict; tests 2, 4 and 5 are skipped
+        submission, runs = self.judge(['1', 'crash', '3', '4', '5', '6'], ['1', '2', '3', 'x', '5', '6'])
+        self.assertEqual(submission.verdict, 'RE')
+        self.assertEqual(runs, 3)
+        status = get_status(submission.id, self.user.id)
+        self.assertEqual((status['passed'], status['total']), (1, 6))
+
+
+class HashRingTests(SimpleTestCase):
+    nodes = [f'celery@judge{i}' for i in range(4)]
+
+    def test_preference_lists_distinct_nodes(self):
+        ring = HashRing(self.nodes)
+        for problem_id in range(50):
+            preference = ring.preference(problem_id)
+            self.assertEqual(sorted(preference), self.nodes)
+            self.assertEqual(ring.preference(problem_id, 2), preference[:2])
+
+    def test_only_a_leaving_nodes_problems_move(self):
+        ring = HashRing(self.nodes)
+        smaller = HashRing(self.nodes[1:])
+        for problem_id in range(200):
+            owner = ring.preference(problem_id, 1)[0]
+            if owner != self.nodes[0]:
+                self.assertEqual(smaller.preference(problem_id, 1), [owner])
+
+
+class JudgeFailureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpass123')
+        self.problem = Problem.objects.create(title="Failing", description="Test", difficulty="easy", points=10)
+        ProblemTestCase.objects.create(problem=self.problem, input="", expected_output="1")
+
+    def test_giving_up_on_retries_releases_the_backlog(self):
+        record_enqueued()
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='print(1)')
+        error = ConnectionError("Docker daemon unreachable")
+        with mock.patch('judge.tasks.get_test_cases', side_effect=error) as get_test_cases, \
+                mock.patch('judge.tasks.dispatch_judging.delay') as dispatch:
+            tasks.judge_submission.apply((submission.id,))
+        self.assertEqual(get_test_cases.call_count, tasks.judge_submission.max_retries + 1)
+        submission.refresh_from_db()
+        self.assertEqual(submission.verdict, 'RE')
+        self.assertEqual(get_backlog(), 0)
+        dispatch.assert_called_once()
+        self.assertTrue(UserProblemStatus.objects.filter(user=self.user, problem=self.problem).exists())
+
+    def test_failed_shard_gives_a_runtime_error(self):
+        record_enqueued()
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='print(1)', verdict='Judging')
+        with mock.patch('judge.tasks.dispatch_judging.delay'):
+            tasks.abandon_sharded_judging(submission.id, 'token')
+            # Shards that finish after all are too late to change it
+            tasks.finish_sharded_judging([[[0, None, 0.1, None]]], submission.id, 1, 'token')
+        submission.refresh_from_db()
+        self.assertEqual(submission.verdict, 'RE')
+        self.assertEqual(get_backlog(), 0)
+
+    def test_stale_judging_is_given_up_on(self):
+        record_enqueued()
+        record_enqueued()
+        stale, recent = Submission.objects.bulk_create([
+            Submission(user=self.user, problem=self.problem, code='print(1)', verdict='Judging', dispatched_at=sent_at)
+            for sent_at in (timezone.now() - timedelta(seconds=settings.JUDGE_STALE_TIMEOUT + 1), timezone.now())
+        ])
+        with mock.patch('judge.tasks.dispatch_judging.delay'):
+            self.assertEqual(fail_stale_judging(), 1)
+        stale.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual((stale.verdict, recent.verdict), ('RE', 'Judging'))
+        self.assertEqual(get_backlog(), 1)
+
+
+@override_settings(JUDGE_AFFINITY_MAX_LOAD=1, JUDGE_AFFINITY_CANDIDATES=2)
+class AffinityRoutingTests(TestCase):
+    nodes = ['celery@a', 'celery@b', 'celery@c']
+
+    def setUp(self):
+        cache.clear()
+        clear_testsets()
+        set_nodes(self.nodes)
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpass123')
+        self.problem = Problem.objects.create(title="Affinity", description="Test", difficulty="easy", points=10)
+        ProblemTestCase.objects.create(problem=self.problem, input="", expected_output="1")
+
+    def enqueue(self, count):
+        return Submission.objects.bulk_create([
+            Submission(user=self.user, problem=self.problem, code='print(1)', queue_tag=queue_tag)
+            for queue_tag in next_queue_tags(self.user.id, count)
+        ])
+
+    def test_problem_goes_to_its_nodes_then_the_shared_queue(self):
+        self.enqueue(3)
+        with mock.patch('judge.tasks.judge_submission.apply_async') as apply_async, \
+                mock.patch('judge.tasks.judge_submission.delay') as delay:
+            dispatch_judging()
+        owners = HashRing(self.nodes).preference(self.problem.id, 2)
+        self.assertEqual([call.kwargs['queue'] for call in apply_async.call_args_list], [f'judge.{node}' for node in owners])
+        # Both candidates are at JUDGE_AFFINITY_MAX_LOAD, so the third is up for stealing
+        self.assertEqual(delay.call_count, 1)
+        self.assertEqual(sorted(Submission.objects.values_list('judge_node', flat=True)), sorted(owners + ['']))
+
+    def test_submissions_of_departed_nodes_are_requeued(self):
+        submission, = self.enqueue(1)
+        with mock.patch('judge.tasks.judge_submission.apply_async'):
+            dispatch_judging()
+        submission.refresh_from_db()
+        app = mock.Mock()
+        app.control.inspect.return_value.active_queues.return_value = {
+            node: [{'name': 'celery'}, {'name': f'judge.{node}'}] for node in self.nodes if node != submission.judge_node
+        }
+        refresh_nodes(app)
+        self.assertNotIn(submission.judge_node, get_nodes())
+        submission.refresh_from_db()
+        self.assertEqual((submission.judge_node, submission.dispatched_at), ('', None))
+        self.assertIsNotNone(submission.queue_tag)
+
+    def test_messages_from_before_a_requeue_are_skipped(self):
+        submission, = self.enqueue(1)
+        with mock.patch('judge.tasks.judge_submission.apply_async') as apply_async:
+            dispatch_judging()
+            stale = apply_async.call_args.args[0]
+            # Its worker drops out of the ring and it is sent out again
+            submission.refresh_from_db()
+            requeue_routed([submission.judge_node])
+            dispatch_judging()
+            fresh = apply_async.call_args.args[0]
+
+        tasks.judge_submission.apply(stale)
+        submission.refresh_from_db()
+        self.assertEqual(submission.verdict, 'P')
+        tasks.judge_submission.apply(fresh)
+        submission.refresh_from_db()
+        self.assertEqual(submission.verdict, 'AC')
+
+    def test_duplicate_messages_are_skipped(self):
+        submission, = self.enqueue(1)
+        with mock.patch('judge.tasks.judge_submission.apply_async') as apply_async:
+            dispatch_judging()
+        args = apply_async.call_args.args[0]
+        tasks.judge_submission.apply(args)
+        submission.refresh_from_db()
+        self.assertEqual(submission.verdict, 'AC')
+
+        # Redelivered after it was judged, or while it still is
+        with mock.patch('judge.tasks.finish_judging') as finish_judging:
+            tasks.judge_submission.apply(args)
+            Submission.objects.filter(id=submission.id).update(verdict='Judging')
+            tasks.judge_submission.apply(args)
+        finish_judging.assert_not_called()
+
+    def test_testsets_stay_in_memory_until_changed(self):
+        self.assertFalse(get_test_cases(self.problem.id)[1])
+        test_cases, cached = get_test_cases(self.problem.id)
+        self.assertTrue(cached)
+        self.assertEqual([test_case.expected_output for test_case in test_cases], ['1'])
+        # Other problems' test cases have versions of their own
+        other = Problem.objects.create(title="Other", description="Test", difficulty="easy", points=10)
+        ProblemTestCase.objects.create(problem=other, input="", expected_output="1")
+        self.assertTrue(get_test_cases(self.problem.id)[1])
+        ProblemTestCase.objects.filter(problem=self.problem).update(expected_output='2')
+        ProblemTestCase.objects.get(problem=self.problem).save()
+        test_cases, cached = get_test_cases(self.problem.id)
+        self.assertFalse(cached)
+        self.assertEqual(test_cases[0].expected_output, '2')
+
+    def test_testsets_are_bounded_by_size(self):
+        testsets = LRUCache(10, sizeof=len)
+        for key in 'abc':
+            testsets.put(key, 'x' * 4)
+        self.assertEqual((list(testsets.entries), testsets.total), (['b', 'c'], 8))
+        # Too big to keep at all, and doesn't push anything out
+        testsets.put('d', 'x' * 11)
+        self.assertEqual(list(testsets.entries), ['b', 'c'])
+        testsets.put('b', 'x')
+        self.assertEqual((list(testsets.entries), testsets.total), (['c', 'b'], 5))
+
+    def test_stats(self):
+        submissions = Submission.objects.bulk_create([
+            Submission(user=self.user, problem=self.problem, code='print(1)') for _ in range(3)
+        ])
+        with mock.patch.object(routing, 'current_node', 'celery@a'):
+            for submission in submissions:
+                tasks.judge_submission.delay(submission.id)
+        stats = affinity_stats()
+        self.assertEqual(stats['nodes']['celery@a'], {'hits': 2, 'misses': 1, 'judged': 3, 'stolen': 3, 'hit_rate': 0.667})
+        self.assertEqual(stats['hit_rate'], 0.667)
+        self.assertEqual(stats['imbalance'], 3.0)
+
+
+class SandboxTests(SimpleTestCase):
+    def run_in_fake_container(self, logs, **kwargs):
+        client = mock.Mock()
+        container = client.containers.run.return_value
+        container.logs.return_value = logs.encode()
+        with tempfile.NamedTemporaryFile('w', suffix='.py') as code_file:
+            result = run_sandboxed(client, tasks.LANGUAGE_CONFIGS['python'], code_file.name, '5', **kwargs)
+        container.remove.assert_called_once_with(force=True)
+        return client, result
+
+    def boundary(self):
+        return mock.patch('judge.sandbox.uuid.uuid4', return_value=mock.Mock(hex='b0undary'))
+
+    def test_usage_comes_from_the_containers_cgroup(self):
+        with self.boundary():
+            client, result = self.run_in_fake_container(
+                "10\nb0undary\nstatus 0\nwall 250000000\n"
+                "/sys/fs/cgroup/cpu.stat usage_usec 120000 user_usec 100000 \n"
+                "/sys/fs/cgroup/memory.peak 10485760 \nb0undary\n"
+            )
+        self.assertEqual(result, {
+            'output': '10', 'error': None, 'cpu_time': 0.12, 'wall_time': 0.25, 'peak_memory': 10.0,
+        })
+        options = client.containers.run.call_args.kwargs
+        self.assertTrue(options['network_disabled'])
+        self.assertNotIn('cpuset_cpus', options)
+
+    def test_errors_and_pinning(self):
+        with self.boundary():
+            client, result = self.run_in_fake_container(
+                "\nb0undary\nstatus 137\nwall 1\nb0undary\n", cpu=3
+            )
+        self.assertEqual(result['error'], 'Time Limit Exceeded')
+        self.assertEqual(client.containers.run.call_args.kwargs['cpuset_cpus'], '3')
+
+        with self.boundary():
+            _, result = self.run_in_fake_container("\nb0undary\nstatus 1\nb0undary\nTraceback: boom\n")
+        self.assertEqual(result['error'], 'Traceback: boom')
+
+    def test_local_runs_only_without_docker(self):
+        config = tasks.LANGUAGE_CONFIGS['python']
+        with mock.patch('judge.sandbox.run_sandboxed') as sandboxed, mock.patch('judge.sandbox.run_measured') as local:
+            measure(mock.Mock(), config, 'code.py', '')
+            self.assertEqual((sandboxed.call_count, local.call_count), (1, 0))
+            measure(None, config, 'code.py', '')
+            self.assertEqual((sandboxed.call_count, local.call_count), (1, 1))
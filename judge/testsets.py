@@ -0,0 +1,89 @@
+"""Test cases kept in judge worker memory between submissions.
+
+Each worker process holds the testsets of the problems it judged most
+recently, up to JUDGE_TESTSET_CACHE_BYTES of test data. Routing sends a
+problem's submissions to the same workers (see judge.routing), so most
+lookups are hits. Entries are tagged with the problem's testset version,
+which changes whenever one of its test cases does, so an edited testset
+is never judged against.
+"""
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+
+from problems.cache import get_testset_state
+
+
+class LRUCache:
+    """Least recently used mapping that counts its hits and misses.
+
+    Holds entries up to a total of `capacity`, measured by `sizeof` (one per
+    entry by default). An entry bigger than the whole capacity isn't kept.
+    """
+
+    def __init__(self, capacity, sizeof=None):
+        self.capacity = capacity
+        self.sizeof = sizeof or (lambda value: 1)
+        self.entries = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version=None):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value, version=None):
+        self.discard(key)
+        size = self.sizeof(value)
+        if size > self.capacity:
+            return
+        self.entries[key] = (version, value, size)
+        self.total += size
+        while self.total > self.capacity:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.total -= evicted
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total -= entry[2]
+
+    def clear(self):
+        self.entries.clear()
+        self.total = 0
+
+
+def testset_size(test_cases):
+    """Bytes of input and expected output a testset holds in memory"""
+    return sum(len(test_case.input.encode()) + len(test_case.expected_output.encode()) for test_case in test_cases)
+
+
+_testsets = LRUCache(settings.JUDGE_TESTSET_CACHE_BYTES, sizeof=testset_size)
+
+
+def get_test_cases(problem_id):
+    """The problem's test cases in judging order, and whether they came from memory"""
+    state = get_testset_state(problem_id)
+    if state is not None:
+        test_cases = _testsets.get(problem_id, state['version'])
+        if test_cases is not None:
+            return test_cases, True
+    TestCase = apps.get_model('problems', 'TestCase')
+    test_cases = list(
+        TestCase.objects.filter(problem_id=problem_id).order_by('id').only('id', 'input', 'expected_output')
+    )
+    # Without the version there's no telling when to drop them
+    if state is not None:
+        _testsets.put(problem_id, test_cases, state['version'])
+    return test_cases, False
+
+
+def clear_testsets():
+    _testsets.clear()
@@ -1,15 +1,19 @@
 from django.contrib import admin
-from .models import Problem, TestCase
+from .models import Problem, TestCase, ProfileInput
 
 class TestCaseInline(admin.TabularInline):
     model = TestCase
     extra = 1
 
+class ProfileInputInline(admin.TabularInline):
+    model = ProfileInput
+    extra = 0
+
 class ProblemAdmin(admin.ModelAdmin):
     list_display = ('title', 'difficulty', 'points', 'created_at')
     list_filter = ('difficulty', 'created_at')
     search_fields = ('title', 'description')
-    inlines = [TestCaseInline]
+    inlines = [TestCaseInline, ProfileInputInline]
 
 admin.site.register(Problem, ProblemAdmin)
 admin.site.register(TestCase)
\ No newline at end of file
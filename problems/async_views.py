@@ -0,0 +1,59 @@
+"""Async versions of the catalog reads, routed by BenchCoder.urls_async.
+
+Responses match the sync views in problems.views, which they share their
+query and serialization code with.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import status
+from rest_framework.response import Response
+
+from submissions.progress import aget_problem_statuses
+from submissions.stats import aget_problem_stats
+from utils.async_views import async_api_view
+from .cache import acached_catalog_response, aget_user_state
+from .models import Problem
+from .serializers import ProblemSerializer
+from .views import ProblemDetailView, ProblemListView
+
+
+@async_api_view
+async def problem_list(request):
+    # Pages are served from the response cache almost always; on a miss the
+    # search and pagination code runs in a worker thread
+    view = ProblemListView()
+
+    async def refresh_stats(data):
+        problem_ids = view.stats_problem_ids(data)
+        if problem_ids is None:
+            return None
+        return view.merge_stats(data, await aget_problem_stats(problem_ids))
+
+    response = await acached_catalog_response(
+        request,
+        sync_to_async(lambda: view.list_problems(request)),
+        user_state=await aget_user_state(request.user.id),
+        refresh_stats=refresh_stats
+    )
+    if response.status_code == status.HTTP_200_OK and view.wants_statuses(request):
+        statuses = await aget_problem_statuses(request.user.id, view.page_problem_ids(response))
+        view.add_statuses(response, statuses)
+    return response
+
+
+@async_api_view
+async def problem_detail(request, problem_id):
+    async def retrieve_problem():
+        try:
+            problem = await ProblemDetailView.get_queryset(request).aget(id=problem_id)
+        except Problem.DoesNotExist:
+            raise Http404
+        serializer = ProblemSerializer(problem, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    async def refresh_stats(data):
+        if 'stats' not in data:
+            return data
+        return {**data, 'stats': (await aget_problem_stats([problem_id]))[problem_id]}
+
+    return await acached_catalog_response(request, retrieve_problem, refresh_stats=refresh_stats)
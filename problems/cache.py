@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+CATALOG_STATE_KEY = 'problems:catalog'
+STATS_STATE_KEY = 'problems:stats'
+RESPONSE_CACHE_TIMEOUT = 60 * 60  # 1 hour; stale entries also age out by version
+
+
+def _get_state(key):
+    """Version and last modification time stored under key.
+
+    Versions are nanosecond timestamps rather than a counter so that losing
+    the key (eviction, flush) can never bring back an old version and with
+    it a stale cached response or ETag.
+    """
+    try:
+        state = cache.get(key)
+        if state is None:
+            state = {'version': time.time_ns(), 'modified': int(time.time())}
+            if not cache.add(key, state, None):
+                state = cache.get(key) or state
+        return state
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {e}")
+        return None
+
+
+async def _aget_state(key):
+    try:
+        state = await cache.aget(key)
+        if state is None:
+            state = {'version': time.time_ns(), 'modified': int(time.time())}
+            if not await cache.aadd(key, state, None):
+                state = await cache.aget(key) or state
+        return state
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {e}")
+        return None
+
+
+def _bump_state(key):
+    try:
+        cache.set(key, {'version': time.time_ns(), 'modified': int(time.time())}, None)
+    except Exception as e:
+        logger.warning(f"Failed to bump version {key}: {e}")
+
+
+def get_catalog_state():
+    return _get_state(CATALOG_STATE_KEY)
+
+
+def bump_catalog_version():
+    _bump_state(CATALOG_STATE_KEY)
+
+
+def get_testset_state(problem_id):
+    """Version of a problem's test cases, which judge workers keep in memory.
+
+    Only public tests are in the catalog, as sample tests, so a change to
+    any other test leaves cached catalog responses alone.
+    """
+    return _get_state(f'problems:testset:{problem_id}')
+
+
+def bump_testset_version(problem_id):
+    _bump_state(f'problems:testset:{problem_id}')
+
+
+def get_stats_state():
+    """Version of the submission counters shown alongside problems.
+
+    Kept apart from the catalog version so that a stats flush neither
+    rebuilds the search index nor drops cached responses; only the stats
+    merged into them are reloaded.
+    """
+    return _get_state(STATS_STATE_KEY)
+
+
+def bump_stats_version():
+    _bump_state(STATS_STATE_KEY)
+
+
+def get_user_state(user_id):
+    """Version of a user's per-problem statuses, which vary listings per user"""
+    return _get_state(f'problems:user:{user_id}')
+
+
+async def aget_user_state(user_id):
+    return await _aget_state(f'problems:user:{user_id}')
+
+
+def bump_user_version(user_id):
+    _bump_state(f'problems:user:{user_id}')
+
+
+def response_cache_key(request, version):
+    params = sorted(request.query_params.lists())
+    digest = hashlib.sha1(f'{request.path}?{params}'.encode()).hexdigest()
+    return f'problems:response:{version}:{digest}'
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def _catalog_validators(request, state, stats_state, user_state):
+    """Response cache key, ETag and last modification time of a catalog request"""
+    key = response_cache_key(request, state['version'])
+    modified = max(state['modified'], stats_state['modified'])
+    etag_source = f"{key}:{stats_state['version']}"
+    if user_state is not None:
+        etag_source = f"{etag_source}:{user_state['version']}"
+        modified = max(modified, user_state['modified'])
+    etag = f'"{hashlib.sha1(etag_source.encode()).hexdigest()}"'
+    return key, etag, modified
+
+
+def cached_catalog_response(request, build_response, user_state=None, refresh_stats=None):
+    """Serve a catalog GET from the response cache, with conditional request support.
+
+    build_response is called on a miss; only 200 responses are cached. The
+    cached body depends only on the request path, query parameters and
+    catalog version, so the ETag is derived from those and the stats
+    version without hashing the body. Views that add per-user data to the
+    shared body pass that user's state so it is reflected in the ETag and
+    Last-Modified.
+
+    Stats change far more often than the catalog, so a stats flush doesn't
+    throw the body away: a body built under an older stats version is
+    passed through refresh_stats, which merges in the current stats (or
+    returns None to have it rebuilt), and stored again.
+    """
+    state = get_catalog_state()
+    stats_state = get_stats_state()
+    if state is None or stats_state is None:
+        return build_response()
+
+    key, etag, modified = _catalog_validators(request, state, stats_state, user_state)
+    headers = {'ETag': etag, 'Last-Modified': http_date(modified)}
+    if _not_modified(request, etag, modified):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        entry = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Response cache read failed: {e}")
+        entry = None
+
+    if entry is not None and (entry[0] == stats_state['version'] or refresh_stats is None):
+        response = Response(entry[1], status=status.HTTP_200_OK)
+    else:
+        data = refresh_stats(entry[1]) if entry is not None else None
+        if data is not None:
+            response = Response(data, status=status.HTTP_200_OK)
+        else:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        try:
+            cache.set(key, (stats_state['version'], response.data), RESPONSE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+async def acached_catalog_response(request, build_response, user_state=None, refresh_stats=None):
+    """cached_catalog_response() for async views; build_response and refresh_stats are coroutine functions"""
+    state = await _aget_state(CATALOG_STATE_KEY)
+    stats_state = await _aget_state(STATS_STATE_KEY)
+    if state is None or stats_state is None:
+        return await build_response()
+
+    key, etag, modified = _catalog_validators(request, state, stats_state, user_state)
+    headers = {'ETag': etag, 'Last-Modified': http_date(modified)}
+    if _not_modified(request, etag, modified):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        entry = await cache.aget(key)
+    except Exception as e:
+        logger.warning(f"Response cache read failed: {e}")
+        entry = None
+
+    if entry is not None and (entry[0] == stats_state['version'] or refresh_stats is None):
+        response = Response(entry[1], status=status.HTTP_200_OK)
+    else:
+        data = await refresh_stats(entry[1]) if entry is not None else None
+        if data is not None:
+            response = Response(data, status=status.HTTP_200_OK)
+        else:
+            response = await build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        try:
+            await cache.aset(key, (stats_state['version'], response.data), RESPONSE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
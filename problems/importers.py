@@ -0,0 +1,201 @@
+import json
+import os
+import re
+import tarfile
+import zipfile
+
+from django.db import transaction
+
+from .cache import bump_catalog_version, bump_testset_version
+from .models import TestCase
+
+# Test cases written per bulk_create, also capped by the size of their data
+IMPORT_CHUNK_SIZE = 500
+IMPORT_CHUNK_CHARS = 16 * 1024 * 1024
+
+FORMATS = ('zip', 'tar', 'ndjson')
+
+# Archive members are paired by name: 01.in goes with 01.out
+INPUT_SUFFIXES = ('.in',)
+OUTPUT_SUFFIXES = ('.out', '.ans')
+
+
+class TestCaseImportError(ValueError):
+    pass
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith('.zip'):
+        return 'zip'
+    if name.endswith(('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')):
+        return 'tar'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    raise TestCaseImportError(f"Can't tell the format of {filename!r}; expected one of {', '.join(FORMATS)}")
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def _split_member(name):
+    """(stem, 'input'|'output') for a test data file, or None to skip it"""
+    stem, suffix = os.path.splitext(name)
+    if os.path.basename(stem).startswith('.'):
+        return None
+    if suffix in INPUT_SUFFIXES:
+        return stem, 'input'
+    if suffix in OUTPUT_SUFFIXES:
+        return stem, 'expected_output'
+    return None
+
+
+def _decode(name, data):
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        raise TestCaseImportError(f"{name} is not valid UTF-8")
+
+
+def iter_zip(fileobj):
+    """Test cases from a zip, read one member at a time.
+
+    The central directory is enough to pair inputs with outputs, so members
+    are only decompressed as each test case is produced.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise TestCaseImportError(f"Invalid zip archive: {e}")
+
+    with archive:
+        pairs = {}
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            member = _split_member(info.filename)
+            if member:
+                pairs.setdefault(member[0], {})[member[1]] = info.filename
+
+        for stem in sorted(pairs, key=_natural_key):
+            names = pairs[stem]
+            if len(names) != 2:
+                raise TestCaseImportError(f"{stem} has no matching {'output' if 'input' in names else 'input'} file")
+            yield {
+                field: _decode(name, archive.read(name))
+                for field, name in names.items()
+            }
+
+
+def iter_tar(fileobj):
+    """Test cases from a (possibly compressed) tar, read as a stream.
+
+    Works on unseekable input such as stdin. Each test case is produced as
+    soon as both of its files have been seen, so only files still waiting
+    for their partner are held in memory.
+    """
+    pending = {}
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+        with archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                member = _split_member(info.name)
+                if not member:
+                    continue
+                stem, field = member
+                data = _decode(info.name, archive.extractfile(info).read())
+                pending.setdefault(stem, {})[field] = data
+                if len(pending[stem]) == 2:
+                    yield pending.pop(stem)
+    except tarfile.TarError as e:
+        raise TestCaseImportError(f"Invalid tar archive: {e}")
+
+    if pending:
+        stem = sorted(pending, key=_natural_key)[0]
+        raise TestCaseImportError(f"{stem} has no matching {'output' if 'input' in pending[stem] else 'input'} file")
+
+
+def iter_ndjson(fileobj):
+    """Test cases from one JSON object per line, read line by line"""
+    for line_number, line in enumerate(fileobj, start=1):
+        if isinstance(line, bytes):
+            line = _decode(f"Line {line_number}", line)
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise TestCaseImportError(f"Line {line_number}: invalid JSON ({e})")
+        if not isinstance(row, dict):
+            raise TestCaseImportError(f"Line {line_number}: expected an object")
+        for field in ('input', 'expected_output'):
+            if not isinstance(row.get(field), str):
+                raise TestCaseImportError(f"Line {line_number}: {field} must be a string")
+        yield {
+            'input': row['input'],
+            'expected_output': row['expected_output'],
+            'is_public': bool(row.get('is_public', False)),
+            'is_benchmark': bool(row.get('is_benchmark', False)),
+        }
+
+
+READERS = {
+    'zip': iter_zip,
+    'tar': iter_tar,
+    'ndjson': iter_ndjson,
+}
+
+
+def import_test_cases(problem, fileobj, format, replace=False,
+                      chunk_size=IMPORT_CHUNK_SIZE, chunk_chars=IMPORT_CHUNK_CHARS):
+    """Add every test case in fileobj to problem in a single transaction.
+
+    Test cases are inserted with bulk_create in chunks as they are parsed,
+    so memory use is bounded by the chunk rather than the archive. If
+    replace is set the problem's existing test cases are removed first. On
+    any error nothing is imported. Returns the number of test cases added.
+    """
+    if format not in READERS:
+        raise TestCaseImportError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+
+    created = 0
+    batch = []
+    batch_chars = 0
+    # Whether sample tests, which the catalog serves, were added or removed
+    public = False
+
+    def flush():
+        nonlocal created, batch, batch_chars
+        TestCase.objects.bulk_create(batch)
+        created += len(batch)
+        batch = []
+        batch_chars = 0
+
+    with transaction.atomic():
+        if replace:
+            # A raw delete neither loads the payloads nor sends post_delete
+            # for every row; nothing references test cases, so nothing cascades
+            existing = TestCase.objects.filter(problem=problem)
+            public = existing.filter(is_public=True).exists()
+            existing._raw_delete(existing.db)
+
+        for fields in READERS[format](fileobj):
+            batch.append(TestCase(problem=problem, **fields))
+            public = public or fields.get('is_public', False)
+            batch_chars += len(fields['input']) + len(fields['expected_output'])
+            if len(batch) >= chunk_size or batch_chars >= chunk_chars:
+                flush()
+        if batch:
+            flush()
+
+        if not created:
+            raise TestCaseImportError("No test cases found")
+        # Neither the bulk insert nor the raw delete sends signals, so
+        # invalidate once for the import
+        transaction.on_commit(lambda: bump_testset_version(problem.id))
+        if public:
+            transaction.on_commit(bump_catalog_version)
+    return created
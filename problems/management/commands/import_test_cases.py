@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from problems.importers import FORMATS, IMPORT_CHUNK_SIZE, TestCaseImportError, detect_format, import_test_cases
+from problems.models import Problem
+
+
+class Command(BaseCommand):
+    help = "Bulk import a problem's test cases from a zip, tar or NDJSON file ('-' reads a tar or NDJSON stream from stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('problem_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--replace', action='store_true', help="Remove the problem's existing test cases first")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            problem = Problem.objects.get(pk=options['problem_id'])
+        except Problem.DoesNotExist:
+            raise CommandError(f"Problem {options['problem_id']} does not exist")
+
+        path = options['path']
+        try:
+            data_format = options['format'] or detect_format(path)
+            if path == '-':
+                created = import_test_cases(
+                    problem, sys.stdin.buffer, data_format,
+                    replace=options['replace'], chunk_size=options['chunk_size']
+                )
+            else:
+                with open(path, 'rb') as fileobj:
+                    created = import_test_cases(
+                        problem, fileobj, data_format,
+                        replace=options['replace'], chunk_size=options['chunk_size']
+                    )
+        except (TestCaseImportError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} test cases into {problem.title}"))
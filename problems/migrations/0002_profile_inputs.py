@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-19 02:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='profile_generator',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='profile_sizes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='ProfileInput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.PositiveIntegerField()),
+                ('input', models.TextField()),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_inputs', to='problems.problem')),
+            ],
+            options={
+                'ordering': ['size'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0002_profile_inputs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='is_benchmark',
+            field=models.BooleanField(default=False),
+        ),
+    ]
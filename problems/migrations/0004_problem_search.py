@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-19 02:16
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN indexes only exist on Postgres; other backends search in process
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS problem_search_vector_idx '
+        'ON problems_problem USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS problem_title_trgm_idx '
+        'ON problems_problem USING gin (title gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        "UPDATE problems_problem SET search_vector = "
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS problem_search_vector_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS problem_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0003_testcase_is_benchmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='tags',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Length, Substr
 
 # Create your models here.
 class Problem(models.Model):
@@ -12,6 +14,13 @@ class Problem(models.Model):
     description = models.TextField()
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES)
     points = models.IntegerField(default=10)
+    tags = models.CharField(max_length=255, blank=True, default='')  # comma separated
+    # Optional input generator for complexity profiling: a Python script that
+    # reads a size n from stdin and prints a test input of that size
+    profile_generator = models.TextField(blank=True, default='')
+    profile_sizes = models.JSONField(default=list, blank=True)
+    # Weighted title/tags/description tsvector, only maintained on Postgres
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -19,11 +28,39 @@ class Problem(models.Model):
         return self.title
 
 
+class TestCaseQuerySet(models.QuerySet):
+    def with_previews(self, length):
+        """Annotate size-capped previews and full sizes without loading the payloads"""
+        return self.defer('input', 'expected_output').annotate(
+            input_preview=Substr('input', 1, length),
+            output_preview=Substr('expected_output', 1, length),
+            input_size=Length('input'),
+            output_size=Length('expected_output'),
+        )
+
+
 class TestCase(models.Model):
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='test_cases')
     input = models.TextField()
     expected_output = models.TextField()
     is_public = models.BooleanField(default=False)
+    # Heavy tests rerun by the benchmark mode
+    is_benchmark = models.BooleanField(default=False)
+    
+    objects = TestCaseQuerySet.as_manager()
     
     def __str__(self):
-        return f"Test case for {self.problem.title}"
\ No newline at end of file
+        return f"Test case for {self.problem.title}"
+
+
+class ProfileInput(models.Model):
+    """Input of a known size used to measure how a solution scales"""
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='profile_inputs')
+    size = models.PositiveIntegerField()
+    input = models.TextField()
+
+    class Meta:
+        ordering = ['size']
+
+    def __str__(self):
+        return f"Profile input (n={self.size}) for {self.problem.title}"
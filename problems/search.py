@@ -0,0 +1,193 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F, Q
+
+from .cache import get_catalog_state
+from .models import Problem
+
+# Relative weight of a match in each indexed field
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'description': 1.0,
+}
+
+# Score multiplier for each kind of term match
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+TYPO_MATCH = 0.5
+
+# Bounds that keep a lookup's cost independent of catalog size
+MAX_PREFIX_EXPANSIONS = 50
+MIN_TYPO_LENGTH = 4
+MAX_RESULTS = 1000
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def _deletes(token):
+    """Every variant of token with one character removed"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class InvertedIndex:
+    """In-process search index used when Postgres full-text search is unavailable.
+
+    Typo tolerance uses a single-deletion neighbourhood (as in SymSpell), so
+    tokens within one edit of the query are found with a handful of dict
+    lookups rather than a scan of the vocabulary.
+    """
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        self.difficulty = {}
+        for problem_id, title, tags, description, difficulty in rows:
+            self.difficulty[problem_id] = difficulty
+            for field, text in (('title', title), ('tags', tags), ('description', description)):
+                for token in tokenize(text):
+                    weights = self.postings[token]
+                    weights[problem_id] = weights.get(problem_id, 0.0) + FIELD_WEIGHTS[field]
+
+        self.vocabulary = sorted(self.postings)
+        self.neighbours = defaultdict(set)
+        for token in self.vocabulary:
+            if len(token) >= MIN_TYPO_LENGTH:
+                for variant in _deletes(token) | {token}:
+                    self.neighbours[variant].add(token)
+
+    @classmethod
+    def build(cls):
+        rows = Problem.objects.values_list('id', 'title', 'tags', 'description', 'difficulty')
+        return cls(rows.iterator(chunk_size=2000))
+
+    def expand(self, term):
+        """Map index tokens matching term to the score multiplier of the match"""
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches[token] = EXACT_MATCH if token == term else PREFIX_MATCH
+
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in _deletes(term) | {term}:
+                for token in self.neighbours.get(variant, ()):
+                    matches.setdefault(token, TYPO_MATCH)
+        return matches
+
+    def search(self, query, difficulty=''):
+        """Return problem ids matching every query term, best match first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        document_count = max(len(self.difficulty), 1)
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for token, multiplier in self.expand(term).items():
+                weights = self.postings[token]
+                idf = math.log(1 + document_count / len(weights))
+                for problem_id, weight in weights.items():
+                    term_scores[problem_id] = max(term_scores[problem_id], weight * multiplier * idf)
+
+            if scores is None:
+                scores = dict(term_scores)
+            else:
+                scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+
+        if difficulty:
+            scores = {pid: score for pid, score in scores.items() if self.difficulty[pid] == difficulty}
+
+        return sorted(scores, key=lambda pid: (-scores[pid], pid))[:MAX_RESULTS]
+
+
+class RankedProblemList:
+    """Sliceable list of ranked problem ids that loads only the requested page"""
+
+    def __init__(self, problem_ids, queryset):
+        self.problem_ids = problem_ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.problem_ids)
+
+    def __getitem__(self, key):
+        page_ids = self.problem_ids[key]
+        problems = self.queryset.in_bulk(page_ids)
+        return [problems[pid] for pid in page_ids if pid in problems]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return this process's index, rebuilding it when the catalog version moves"""
+    global _index, _index_version
+    state = get_catalog_state()
+    version = state['version'] if state else None
+    with _index_lock:
+        if _index is None or (version is not None and version != _index_version):
+            _index = InvertedIndex.build()
+            _index_version = version
+        return _index
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('tags', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    )
+
+
+def update_search_vector(problem_id):
+    """Refresh the stored tsvector of a problem (Postgres only)"""
+    if connection.vendor == 'postgresql':
+        Problem.objects.filter(pk=problem_id).update(search_vector=search_vector())
+
+
+def _postgres_search(queryset, query, difficulty):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+
+    # Every term must match, each as a prefix
+    ts_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='english')
+    problems = queryset.filter(
+        Q(search_vector=ts_query) | Q(title__trigram_similar=query)
+    )
+    if difficulty:
+        problems = problems.filter(difficulty=difficulty)
+
+    return problems.annotate(
+        rank=SearchRank(F('search_vector'), ts_query) + TrigramSimilarity('title', query)
+    ).order_by('-rank', 'id')
+
+
+def search_problems(queryset, query, difficulty=''):
+    """Ranked problems from queryset matching query, restricted to difficulty if given.
+
+    Returns a queryset on Postgres and a RankedProblemList elsewhere; both can
+    be handed straight to a paginator.
+    """
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, query, difficulty)
+    return RankedProblemList(get_index().search(query, difficulty), queryset)
@@ -1,5 +1,14 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Problem, TestCase
+from submissions.serializers import ProblemStatsSerializer
+from utils.serializers import SparseFieldsetMixin
+
+# Characters of the description returned by the problem list by default
+DESCRIPTION_PREVIEW_LENGTH = 200
+
+# Characters of test input/output shown inline; full data is downloaded
+TEST_PREVIEW_LENGTH = 1000
 
 class TestCaseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,15 +16,59 @@ class TestCaseSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id',)
 
-class ProblemSerializer(serializers.ModelSerializer):
-    test_cases = TestCaseSerializer(many=True, read_only=True)
+class TestCasePreviewSerializer(serializers.ModelSerializer):
+    # Annotated by TestCaseQuerySet.with_previews()
+    input_preview = serializers.CharField(read_only=True)
+    output_preview = serializers.CharField(read_only=True)
+    input_size = serializers.IntegerField(read_only=True)
+    output_size = serializers.IntegerField(read_only=True)
+    truncated = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TestCase
+        fields = ('id', 'input_preview', 'output_preview', 'input_size', 'output_size', 'truncated')
+    
+    def get_truncated(self, obj):
+        return obj.input_size > len(obj.input_preview) or obj.output_size > len(obj.output_preview)
+
+class TestCaseAdminSerializer(TestCasePreviewSerializer):
+    input_url = serializers.SerializerMethodField()
+    output_url = serializers.SerializerMethodField()
+    
+    class Meta(TestCasePreviewSerializer.Meta):
+        fields = TestCasePreviewSerializer.Meta.fields + ('is_public', 'is_benchmark', 'input_url', 'output_url')
+    
+    def get_download_url(self, obj, kind):
+        url = reverse('testcase-download', kwargs={
+            'problem_id': obj.problem_id, 'testcase_id': obj.id, 'kind': kind
+        })
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_input_url(self, obj):
+        return self.get_download_url(obj, 'input')
+    
+    def get_output_url(self, obj):
+        return self.get_download_url(obj, 'output')
+
+class ProblemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Public tests only, prefetched with previews by ProblemDetailView
+    sample_tests = TestCasePreviewSerializer(many=True, read_only=True)
+    # Null until the problem's first judged submission is flushed
+    stats = ProblemStatsSerializer(read_only=True)
     
     class Meta:
         model = Problem
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('id', 'created_at', 'updated_at')
 
-class ProblemListSerializer(serializers.ModelSerializer):
+class ProblemListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Annotated by the list view, see DESCRIPTION_PREVIEW_LENGTH
+    description_preview = serializers.CharField(read_only=True)
+    stats = ProblemStatsSerializer(read_only=True)
+    
     class Meta:
         model = Problem
-        fields = ('id', 'title', 'difficulty', 'points', 'description')
\ No newline at end of file
+        fields = ('id', 'title', 'difficulty', 'points', 'tags', 'description', 'description_preview', 'stats')
+        # The full description is only sent when asked for with ?fields=
+        default_fields = ('id', 'title', 'difficulty', 'points', 'tags', 'description_preview', 'stats')
\ No newline at end of file
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version, bump_testset_version
+from .models import Problem, TestCase
+from .search import update_search_vector
+
+# Saving only these leaves what the catalog serves unchanged
+UNSERVED_PROBLEM_FIELDS = frozenset({'search_vector'})
+
+
+@receiver(post_save, sender=Problem)
+def problem_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= UNSERVED_PROBLEM_FIELDS:
+        return
+    update_search_vector(instance.pk)
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Problem)
+def problem_deleted(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=TestCase)
+def test_case_saving(sender, instance, raw=False, **kwargs):
+    # Whether it was a sample test before this save, for test_case_changed
+    instance.was_public = (
+        not raw and not instance._state.adding
+        and TestCase.objects.filter(pk=instance.pk, is_public=True).exists()
+    )
+
+
+@receiver(post_save, sender=TestCase)
+@receiver(post_delete, sender=TestCase)
+def test_case_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_testset_version(instance.problem_id)
+    # Public tests are served in the catalog as sample tests
+    if instance.is_public or getattr(instance, 'was_public', False):
+        bump_catalog_version()
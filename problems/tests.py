@@ -1,8 +1,22 @@
-from django.test import TestCase
+import io
+import json
+import tarfile
+import zipfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model  
+from utils.pagination import CachedCountPaginator
+from submissions.models import Submission
+from submissions.progress import record_verdict
+from .cache import get_testset_state
 from .models import Problem, TestCase
 
 # Use get_user_model to avoid import issues
@@ -44,6 +58,35 @@ class ProblemTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['title'], self.problem.title)
         
+    def test_problem_list_sends_description_preview(self):
+        self.problem.description = 'x' * 1000
+        self.problem.save()
+        self.client.force_authenticate(user=self.user)
+        
+        response = self.client.get(self.problem_list_url)
+        row = response.data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertEqual(len(row['description_preview']), 200)
+        
+    def test_problem_list_sparse_fieldset(self):
+        self.client.force_authenticate(user=self.user)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.problem_list_url, {'fields': 'id,title'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        # Unrequested columns are never selected
+        self.assertNotIn('"points"', queries[-1]['sql'])
+        
+        response = self.client.get(self.problem_list_url, {'fields': 'description', 'exclude': 'title'})
+        self.assertEqual(response.data['results'][0], {'description': 'Test Description'})
+        
+    def test_problem_detail_exclude(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.problem_detail_url, {'exclude': 'description,sample_tests'})
+        self.assertNotIn('description', response.data)
+        self.assertNotIn('sample_tests', response.data)
+        self.assertEqual(response.data['title'], self.problem.title)
+        
     def test_create_problem_as_admin(self):
         self.client.force_authenticate(user=self.admin_user)
         
@@ -69,4 +112,402 @@ class ProblemTests(APITestCase):
         }
         
         response = self.client.post(reverse('problem-create'), data)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestCaseEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.problem = Problem.objects.create(
+            title="Test Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        self.sample = TestCase.objects.create(
+            problem=self.problem, input='1 2', expected_output='3', is_public=True
+        )
+        self.hidden = TestCase.objects.create(
+            problem=self.problem, input='7' * 5000, expected_output='x', is_public=False
+        )
+        self.list_url = reverse('testcase-list', kwargs={'problem_id': self.problem.id})
+        
+    def test_problem_detail_only_has_sample_previews(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('problem-detail', kwargs={'problem_id': self.problem.id}))
+        self.assertEqual(response.data['sample_tests'], [{
+            'id': self.sample.id,
+            'input_preview': '1 2',
+            'output_preview': '3',
+            'input_size': 3,
+            'output_size': 1,
+            'truncated': False,
+        }])
+        
+    def test_test_case_listing_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_403_FORBIDDEN)
+        
+    def test_test_case_listing_is_paginated_with_previews(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.list_url, {'page_size': 1, 'page': 2})
+        self.assertEqual(response.data['total_count'], 2)
+        row = response.data['results'][0]
+        self.assertEqual(row['id'], self.hidden.id)
+        self.assertEqual(len(row['input_preview']), 1000)
+        self.assertEqual(row['input_size'], 5000)
+        self.assertTrue(row['truncated'])
+        
+        download = self.client.get(row['input_url'])
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertIn('attachment', download['Content-Disposition'])
+        self.assertEqual(b''.join(download.streaming_content).decode(), '7' * 5000)
+
+
+class PaginationCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        for i in range(3):
+            Problem.objects.create(title=f"Problem {i}", description="x", difficulty="easy")
+        
+    @override_settings(PAGINATION_COUNT_CACHE_TIMEOUT=60)
+    def test_counts_are_cached_per_filter(self):
+        self.assertEqual(CachedCountPaginator(Problem.objects.order_by('id'), 2).count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCountPaginator(Problem.objects.order_by('id'), 2).count, 3)
+        
+        # A different filter is a different signature
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCountPaginator(Problem.objects.filter(difficulty='hard'), 2).count, 0)
+        
+    @override_settings(PAGINATION_COUNT_CACHE_TIMEOUT=60)
+    def test_counts_are_cached_per_version(self):
+        self.assertEqual(CachedCountPaginator(Problem.objects.all(), 2, count_version=1).count, 3)
+        Problem.objects.create(title="Problem 3", description="x", difficulty="easy")
+        self.assertEqual(CachedCountPaginator(Problem.objects.all(), 2, count_version=1).count, 3)
+        self.assertEqual(CachedCountPaginator(Problem.objects.all(), 2, count_version=2).count, 4)
+        
+    def test_estimated_counts_do_not_limit_pages(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('problem-list')
+        # The planner guessed low: three problems, two pages of two
+        with mock.patch.object(CachedCountPaginator, 'estimate_or_count', return_value=(1, True)):
+            first = self.client.get(url, {'page_size': 2})
+            last = self.client.get(url, {'page_size': 2, 'page': 2})
+            past = self.client.get(url, {'page_size': 2, 'page': 3})
+        
+        self.assertEqual(first.data['total_count'], 1)
+        self.assertTrue(first.data['total_count_approximate'])
+        self.assertEqual(first.data['total_pages'], 2)
+        self.assertEqual([problem['title'] for problem in last.data['results']], ["Problem 2"])
+        self.assertEqual(last.data['total_pages'], 2)
+        self.assertEqual(past.status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_cursor_pagination_keeps_response_shape(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('problem-list') + '?cursor=&page_size=2'
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(
+                set(response.data),
+                {'total_count', 'total_count_approximate', 'total_pages', 'current_page', 'page_size', 'next', 'results'}
+            )
+            self.assertIsNone(response.data['total_count'])
+            titles.extend(problem['title'] for problem in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(titles, ["Problem 0", "Problem 1", "Problem 2"])
+
+
+class ProblemSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.dijkstra = Problem.objects.create(
+            title="Dijkstra Shortest Path",
+            description="Find the cheapest route between two cities.",
+            difficulty="medium",
+            tags="graphs"
+        )
+        self.routes = Problem.objects.create(
+            title="Counting Routes",
+            description="Count paths in a grid, a classic shortest path warm-up.",
+            difficulty="easy",
+            tags="dp"
+        )
+        self.sorting = Problem.objects.create(
+            title="Sorting Strings",
+            description="Sort words alphabetically.",
+            difficulty="easy",
+            tags="sorting, strings"
+        )
+        
+    def search(self, **params):
+        response = self.client.get(reverse('problem-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [problem['id'] for problem in response.data['results']]
+        
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search(search='shortest path'), [self.dijkstra.id, self.routes.id])
+        
+    def test_search_covers_description_and_tags(self):
+        self.assertEqual(self.search(search='cities'), [self.dijkstra.id])
+        self.assertEqual(self.search(search='graphs'), [self.dijkstra.id])
+        
+    def test_prefix_and_typo_tolerance(self):
+        self.assertEqual(self.search(search='dijk'), [self.dijkstra.id])
+        self.assertEqual(self.search(search='dijkstar'), [self.dijkstra.id])
+        
+    def test_search_combines_with_difficulty(self):
+        self.assertEqual(self.search(search='path', difficulty='easy'), [self.routes.id])
+        
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.search(search='heaps'), [])
+        self.sorting.tags = 'heaps'
+        self.sorting.save()
+        self.assertEqual(self.search(search='heaps'), [self.sorting.id])
+
+
+
+class ProblemCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problem = Problem.objects.create(
+            title="Cached Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        self.detail_url = reverse('problem-detail', kwargs={'problem_id': self.problem.id})
+        
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get(reverse('problem-list'))
+        # Only the per-user status lookup touches the database
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse('problem-list'))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+        
+    def test_query_parameters_are_part_of_the_key(self):
+        self.client.get(reverse('problem-list'))
+        response = self.client.get(reverse('problem-list'), {'difficulty': 'hard'})
+        self.assertEqual(response.data['total_count'], 0)
+        
+    def test_conditional_requests(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn('Last-Modified', response)
+        
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+    def test_problem_and_test_case_changes_invalidate(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        
+        self.problem.title = "Renamed Problem"
+        self.problem.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], "Renamed Problem")
+        
+        TestCase.objects.create(problem=self.problem, input='1', expected_output='1', is_public=True)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.data['sample_tests']), 1)
+        
+    def test_missing_problem_is_not_cached(self):
+        url = reverse('problem-detail', kwargs={'problem_id': self.problem.id + 1})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', self.client.get(url))
+
+
+class ProblemStatusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.solved, self.attempted, self.untouched = [
+            Problem.objects.create(title=f"Problem {i}", description="Test", difficulty="easy", points=10)
+            for i in range(3)
+        ]
+        
+    def judge(self, problem, verdict, user=None):
+        submission = Submission.objects.create(
+            user=user or self.user, problem=problem, code="print(1)",
+            language="python", verdict=verdict
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            record_verdict(submission)
+        
+    def statuses(self, response):
+        return {row['id']: row['status'] for row in response.data['results']}
+        
+    def test_listing_marks_solved_and_attempted(self):
+        self.judge(self.solved, 'WA')
+        self.judge(self.solved, 'AC')
+        self.judge(self.attempted, 'TLE')
+        
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(self.statuses(response), {
+            self.solved.id: 'solved',
+            self.attempted.id: 'attempted',
+            self.untouched.id: None,
+        })
+        
+    def test_pending_submissions_do_not_count(self):
+        self.judge(self.attempted, 'P')
+        response = self.client.get(reverse('problem-list'))
+        self.assertIsNone(self.statuses(response)[self.attempted.id])
+        
+    def test_statuses_are_per_user(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.judge(self.solved, 'AC', user=other)
+        
+        response = self.client.get(reverse('problem-list'))
+        self.assertIsNone(self.statuses(response)[self.solved.id])
+        
+    def test_new_verdict_changes_etag(self):
+        etag = self.client.get(reverse('problem-list'))['ETag']
+        response = self.client.get(reverse('problem-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.judge(self.attempted, 'WA')
+        response = self.client.get(reverse('problem-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.statuses(response)[self.attempted.id], 'attempted')
+        
+    def test_status_respects_sparse_fieldsets(self):
+        response = self.client.get(reverse('problem-list'), {'exclude': 'status'})
+        self.assertNotIn('status', response.data['results'][0])
+        
+        response = self.client.get(reverse('problem-list'), {'fields': 'id,status'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+
+class TestCaseImportTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_authenticate(user=self.admin_user)
+        self.problem = Problem.objects.create(
+            title="Import Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        self.existing = TestCase.objects.create(problem=self.problem, input='0', expected_output='0')
+        self.url = reverse('testcase-import', kwargs={'problem_id': self.problem.id})
+        
+    def make_zip(self, files):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name, content in files.items():
+                archive.writestr(name, content)
+        return buffer.getvalue()
+        
+    def make_tar(self, files):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+            for name, content in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content.encode()))
+        return buffer.getvalue()
+        
+    def imported(self):
+        return list(
+            TestCase.objects.filter(problem=self.problem).exclude(id=self.existing.id)
+            .order_by('id').values_list('input', 'expected_output')
+        )
+        
+    def test_zip_pairs_files_in_natural_order(self):
+        data = self.make_zip({
+            'tests/10.in': 'ten', 'tests/10.out': 'TEN',
+            'tests/2.in': 'two', 'tests/2.ans': 'TWO',
+            'README.md': 'ignored',
+        })
+        upload = SimpleUploadedFile('tests.zip', data)
+        # The problem lookup and a single bulk insert inside a savepoint
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(self.imported(), [('two', 'TWO'), ('ten', 'TEN')])
+        
+    def test_tar_replace(self):
+        data = self.make_tar({'a.in': '1', 'b.in': '2', 'a.out': 'A', 'b.out': 'B'})
+        upload = SimpleUploadedFile('tests.tar.gz', data)
+        response = self.client.post(self.url + '?replace=true', {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(TestCase.objects.filter(id=self.existing.id).exists())
+        self.assertEqual(self.imported(), [('1', 'A'), ('2', 'B')])
+        
+    def test_replace_bumps_the_version_once(self):
+        TestCase.objects.bulk_create([
+            TestCase(problem=self.problem, input=str(i), expected_output=str(i)) for i in range(5)
+        ])
+        upload = SimpleUploadedFile('tests.zip', self.make_zip({'1.in': '1', '1.out': 'one'}))
+        with mock.patch('problems.cache._bump_state') as bump_state, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + '?replace=true', {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(TestCase.objects.filter(problem=self.problem).count(), 1)
+        self.assertEqual(bump_state.call_count, 1)
+        
+    def test_archive_format_parameter(self):
+        # The name says nothing about the format, so the parameter decides
+        upload = SimpleUploadedFile('upload.bin', self.make_zip({'1.in': '1', '1.out': 'one'}))
+        response = self.client.post(self.url + '?archive=zip', {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.imported(), [('1', 'one')])
+        
+    def test_streamed_ndjson_body(self):
+        lines = [
+            {'input': '1 2', 'expected_output': '3', 'is_public': True},
+            {'input': '2 2', 'expected_output': '4'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.imported(), [('1 2', '3'), ('2 2', '4')])
+        self.assertTrue(TestCase.objects.get(problem=self.problem, input='1 2').is_public)
+        
+    def test_errors_roll_back_the_whole_import(self):
+        body = json.dumps({'input': '1', 'expected_output': '1'}) + '\n{"input": 5}\n'
+        response = self.client.post(self.url + '?replace=true', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Line 2', response.data['detail'])
+        self.assertEqual(TestCase.objects.filter(problem=self.problem).count(), 1)
+        
+        upload = SimpleUploadedFile('tests.zip', self.make_zip({'1.in': '1'}))
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    def test_only_sample_tests_change_the_catalog(self):
+        url = reverse('problem-detail', kwargs={'problem_id': self.problem.id})
+        etag = self.client.get(url)['ETag']
+        testset_version = get_testset_state(self.problem.id)['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            upload = SimpleUploadedFile('tests.zip', self.make_zip({'1.in': '1', '1.out': '1'}))
+            self.client.post(self.url, {'file': upload})
+        self.existing.expected_output = '9'
+        self.existing.save()
+        # Hidden tests aren't in the catalog, so cached responses stay valid
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(get_testset_state(self.problem.id)['version'], testset_version)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            body = json.dumps({'input': '1', 'expected_output': '1', 'is_public': True}) + '\n'
+            self.client.post(self.url, body, content_type='application/x-ndjson')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sample_tests']), 1)
+        
+    def test_import_is_admin_only(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, '{}', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
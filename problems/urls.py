@@ -5,5 +5,7 @@ urlpatterns = [
     path('', views.ProblemListView.as_view(), name='problem-list'),
     path('create/', views.ProblemCreateView.as_view(), name='problem-create'),
     path('<int:problem_id>/', views.ProblemDetailView.as_view(), name='problem-detail'),
-    path('<int:problem_id>/testcases/', views.TestCaseCreateView.as_view(), name='testcase-create'),
+    path('<int:problem_id>/testcases/', views.TestCaseListCreateView.as_view(), name='testcase-list'),
+    path('<int:problem_id>/testcases/import/', views.TestCaseImportView.as_view(), name='testcase-import'),
+    path('<int:problem_id>/testcases/<int:testcase_id>/<str:kind>/', views.TestCaseDownloadView.as_view(), name='testcase-download'),
 ]
\ No newline at end of file
@@ -2,37 +2,146 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
+from django.db.models import Prefetch
+from django.db.models.functions import Length, Substr
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from .cache import cached_catalog_response, get_catalog_state, get_user_state
+from .importers import TestCaseImportError, detect_format, import_test_cases
 from .models import Problem, TestCase
-from .serializers import ProblemSerializer, ProblemListSerializer, TestCaseSerializer
-from utils.pagination import CustomPagination
-from django.db.models import Q
+from .search import search_problems
+from .serializers import (
+    DESCRIPTION_PREVIEW_LENGTH, TEST_PREVIEW_LENGTH, ProblemSerializer, ProblemListSerializer,
+    TestCaseAdminSerializer, TestCaseSerializer,
+)
+from utils.pagination import CountlessCursorPagination, CustomPagination
+from utils.serializers import parse_field_list, project_queryset
+from submissions.progress import get_problem_statuses
+from submissions.stats import get_problem_stats
+
+def catalog_pagination():
+    # Counts are keyed by the catalog version, like the cached responses
+    # they end up in, so a cached page never carries a stale total
+    state = get_catalog_state()
+    return CustomPagination(count_version=state['version'] if state else None)
 
 class ProblemListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        response = cached_catalog_response(
+            request,
+            lambda: self.list_problems(request),
+            user_state=get_user_state(request.user.id),
+            refresh_stats=self.refresh_stats
+        )
+        if response.status_code == status.HTTP_200_OK and self.wants_statuses(request):
+            # One lookup marks the whole page as solved/attempted
+            statuses = get_problem_statuses(request.user.id, self.page_problem_ids(response))
+            self.add_statuses(response, statuses)
+        return response
+    
+    @staticmethod
+    def wants_statuses(request):
+        params = request.query_params
+        if params.get('fields') and 'status' not in parse_field_list(params['fields']):
+            return False
+        return 'status' not in parse_field_list(params.get('exclude', ''))
+    
+    @staticmethod
+    def page_problem_ids(response):
+        return [row['id'] for row in response.data['results'] if 'id' in row]
+    
+    @staticmethod
+    def add_statuses(response, statuses):
+        rows = response.data['results']
+        # The body may be shared through the response cache, so copy it
+        response.data = {
+            **response.data,
+            'results': [{**row, 'status': statuses.get(row.get('id'))} for row in rows],
+        }
+
+    @staticmethod
+    def stats_problem_ids(data):
+        """Problems the body shows stats for, or None if its rows don't carry their ids"""
+        rows = [row for row in data['results'] if 'stats' in row]
+        if any('id' not in row for row in rows):
+            return None
+        return [row['id'] for row in rows]
+    
+    @staticmethod
+    def merge_stats(data, stats):
+        return {
+            **data,
+            'results': [{**row, 'stats': stats[row['id']]} if 'stats' in row else row for row in data['results']],
+        }
+    
+    def refresh_stats(self, data):
+        problem_ids = self.stats_problem_ids(data)
+        if problem_ids is None:
+            return None
+        return self.merge_stats(data, get_problem_stats(problem_ids))
+    
+    def list_problems(self, request):
         search_query = request.query_params.get('search', '')
         filter_query = request.query_params.get('difficulty', '')
-        problems = Problem.objects.all()
-
+        
+        # Only fetch the columns of the requested fields, and cut the
+        # description down to a preview in the database
+        problems = project_queryset(
+            Problem.objects.annotate(description_preview=Substr('description', 1, DESCRIPTION_PREVIEW_LENGTH)),
+            ProblemListSerializer,
+            request
+        )
+        
         if search_query:
-            problems = problems.filter(Q(title__icontains=search_query))
-        if filter_query:
-            problems = problems.filter(difficulty=filter_query)
+            # Ranked by relevance, with the difficulty filter applied in the index
+            problems = search_problems(problems, search_query, difficulty=filter_query)
+        else:
+            problems = problems.order_by('id')
+            if filter_query:
+                problems = problems.filter(difficulty=filter_query)
+            
+            # ?cursor= opts into count-free keyset paging
+            if 'cursor' in request.query_params:
+                paginator = CountlessCursorPagination()
+                page = paginator.paginate_queryset(problems, request)
+                serializer = ProblemListSerializer(page, many=True, context={'request': request})
+                return paginator.get_paginated_response(serializer.data)
 
-        paginator = CustomPagination()
+        paginator = catalog_pagination()
         paginated_problems = paginator.paginate_queryset(problems, request)
-        serializer = ProblemListSerializer(paginated_problems, many=True)
+        serializer = ProblemListSerializer(paginated_problems, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
 
 class ProblemDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, problem_id):
-        problem = get_object_or_404(Problem, id=problem_id)
-        serializer = ProblemSerializer(problem)
+        def refresh_stats(data):
+            if 'stats' not in data:
+                return data
+            return {**data, 'stats': get_problem_stats([problem_id])[problem_id]}
+        
+        return cached_catalog_response(
+            request, lambda: self.retrieve_problem(request, problem_id), refresh_stats=refresh_stats
+        )
+    
+    def retrieve_problem(self, request, problem_id):
+        problem = get_object_or_404(self.get_queryset(request), id=problem_id)
+        serializer = ProblemSerializer(problem, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    @staticmethod
+    def get_queryset(request):
+        problems = project_queryset(Problem.objects.all(), ProblemSerializer, request)
+        if 'sample_tests' in ProblemSerializer(context={'request': request}).fields:
+            problems = problems.prefetch_related(Prefetch(
+                'test_cases',
+                queryset=TestCase.objects.filter(is_public=True).with_previews(TEST_PREVIEW_LENGTH).order_by('id'),
+                to_attr='sample_tests'
+            ))
+        return problems
 
 # Admin-only views for creating problems and test cases
 class ProblemCreateView(APIView):
@@ -45,9 +154,18 @@ class ProblemCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TestCaseCreateView(APIView):
+class TestCaseListCreateView(APIView):
     permission_classes = [permissions.IsAdminUser]
     
+    def get(self, request, problem_id):
+        problem = get_object_or_404(Problem, id=problem_id)
+        test_cases = TestCase.objects.filter(problem=problem).with_previews(TEST_PREVIEW_LENGTH).order_by('id')
+        
+        paginator = catalog_pagination()
+        paginated_test_cases = paginator.paginate_queryset(test_cases, request)
+        serializer = TestCaseAdminSerializer(paginated_test_cases, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+    
     def post(self, request, problem_id):
         problem = get_object_or_404(Problem, id=problem_id)
         serializer = TestCaseSerializer(data=request.data)
@@ -55,4 +173,60 @@ class TestCaseCreateView(APIView):
         if serializer.is_valid():
             serializer.save(problem=problem)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class TestCaseImportView(APIView):
+    """Add many test cases from one upload.
+
+    Accepts a multipart 'file' (zip, tar or NDJSON, told apart by its name or
+    ?archive=) or a raw application/x-ndjson body, which is read as it
+    arrives. ?replace=true swaps out the problem's existing test cases.
+    The parameter isn't ?format=, which DRF keeps for picking a renderer.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request, problem_id):
+        problem = get_object_or_404(Problem, id=problem_id)
+        requested_format = request.query_params.get('archive', '')
+        replace = request.query_params.get('replace', '').lower() in ('1', 'true', 'yes')
+        
+        try:
+            if request.content_type.startswith('application/x-ndjson'):
+                fileobj, data_format = request.stream or [], 'ndjson'
+            else:
+                upload = request.FILES.get('file')
+                if upload is None:
+                    return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+                fileobj, data_format = upload, requested_format or detect_format(upload.name)
+            created = import_test_cases(problem, fileobj, data_format, replace=replace)
+        except TestCaseImportError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+class TestCaseDownloadView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    # Characters read from the database per streamed chunk
+    chunk_size = 1024 * 1024
+    
+    def get(self, request, problem_id, testcase_id, kind):
+        if kind not in ('input', 'output'):
+            raise Http404
+        column = 'input' if kind == 'input' else 'expected_output'
+        test_case = get_object_or_404(
+            TestCase.objects.only('id').annotate(size=Length(column)),
+            id=testcase_id,
+            problem_id=problem_id
+        )
+        
+        def chunks():
+            # Read the payload a slice at a time so it is never held in memory whole
+            for offset in range(1, test_case.size + 1, self.chunk_size):
+                yield TestCase.objects.filter(id=test_case.id).values_list(
+                    Substr(column, offset, self.chunk_size), flat=True
+                ).get()
+        
+        response = StreamingHttpResponse(chunks(), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="test_{test_case.id}.{"in" if kind == "input" else "out"}"'
+        return response
@@ -5,6 +5,7 @@ class SubmissionAdmin(admin.ModelAdmin):
     list_display = ('user', 'problem', 'language', 'verdict', 'execution_time', 'submitted_at')
     list_filter = ('verdict', 'language', 'submitted_at')
     search_fields = ('user__username', 'problem__title')
-    readonly_fields = ('submitted_at',)
+    readonly_fields = ('submitted_at', 'code')
+    exclude = ('code_blob',)
 
 admin.site.register(Submission, SubmissionAdmin)
\ No newline at end of file
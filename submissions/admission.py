@@ -0,0 +1,155 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_KEY = 'judge:backlog'
+# Contest submissions have their own judge queue and workers, so they are
+# counted apart and never hold back practice submissions
+CONTEST_BACKLOG_KEY = 'judge:backlog:contest'
+JUDGE_TIME_KEY = 'judge:seconds'
+
+# Weight of the newest judging time in the moving average
+JUDGE_TIME_SMOOTHING = 0.1
+
+
+def backlog_key(contest=False):
+    return CONTEST_BACKLOG_KEY if contest else BACKLOG_KEY
+
+
+def get_backlog(contest=False):
+    """Submissions queued or being judged"""
+    try:
+        return max(0, cache.get(backlog_key(contest)) or 0)
+    except Exception as e:
+        logger.warning(f"Backlog counter unavailable: {e}")
+        return 0
+
+
+def set_backlog(count, contest=False):
+    try:
+        cache.set(backlog_key(contest), count, None)
+    except Exception as e:
+        logger.warning(f"Failed to reset backlog counter: {e}")
+
+
+def record_enqueued(count=1, contest=False):
+    """Count submissions into the backlog before they are handed to the judge"""
+    try:
+        cache.add(backlog_key(contest), 0, None)
+        cache.incr(backlog_key(contest), count)
+    except Exception as e:
+        logger.warning(f"Failed to update backlog counter: {e}")
+
+
+def record_judged(seconds, contest=False):
+    """Count a submission out of the backlog and fold its judging time, if known, into the average"""
+    try:
+        cache.add(backlog_key(contest), 0, None)
+        cache.decr(backlog_key(contest))
+        if seconds is None:
+            return
+        average = cache.get(JUDGE_TIME_KEY)
+        if average is None:
+            average = seconds
+        else:
+            average += JUDGE_TIME_SMOOTHING * (seconds - average)
+        cache.set(JUDGE_TIME_KEY, average, None)
+    except Exception as e:
+        logger.warning(f"Failed to update backlog counter: {e}")
+
+
+def average_judge_seconds():
+    try:
+        return cache.get(JUDGE_TIME_KEY) or settings.JUDGE_DEFAULT_SECONDS
+    except Exception:
+        return settings.JUDGE_DEFAULT_SECONDS
+
+
+def estimate_wait(backlog=None):
+    """Seconds until a submission enqueued now would start judging"""
+    if backlog is None:
+        backlog = get_backlog()
+    return backlog * average_judge_seconds() / settings.JUDGE_CONCURRENCY
+
+
+def queue_status():
+    backlog = get_backlog()
+    return {
+        'backlog': backlog,
+        'capacity': settings.JUDGE_CONCURRENCY,
+        'max_backlog': settings.JUDGE_MAX_BACKLOG,
+        'average_judge_seconds': round(average_judge_seconds(), 3),
+        'estimated_wait': round(estimate_wait(backlog), 1),
+    }
+
+
+def submission_cost(request, view):
+    """Submissions the request would enqueue, as declared by the view; 1 by default"""
+    cost = getattr(view, 'submission_cost', None)
+    return cost(request) if cost else 1
+
+
+class JudgeBacklogThrottle(BaseThrottle):
+    """Refuse new work that would take the judge backlog past JUDGE_MAX_BACKLOG.
+
+    Batches are charged at most SUBMISSION_BATCH_MAX_COST, so a large one
+    can take the backlog past the limit, and the work after it waits for
+    the judges to catch up. The wait is how long the judges need to drain the backlog far enough
+    for it at their current pace.
+    """
+
+    def allow_request(self, request, view):
+        self.backlog = get_backlog()
+        self.cost = submission_cost(request, view)
+        return self.backlog + self.cost <= settings.JUDGE_MAX_BACKLOG
+
+    def wait(self):
+        excess = self.backlog + self.cost - settings.JUDGE_MAX_BACKLOG
+        return math.ceil(estimate_wait(excess))
+
+
+class SubmissionRateThrottle(BaseThrottle):
+    """Per-user token bucket: bursts of SUBMISSION_BURST, refilled at SUBMISSION_RATE per second.
+
+    Each submission costs a token, up to SUBMISSION_BATCH_MAX_COST for a
+    batch. A batch bigger than the bucket needs a full one and leaves it in
+    debt, so it is paid for before the user's
+    next submission. The bucket is a read-modify-write on the shared cache,
+    so concurrent requests from one user can overshoot it by at most one
+    each.
+    """
+
+    def allow_request(self, request, view):
+        self.key = f'judge:bucket:{request.user.pk}'
+        rate = settings.SUBMISSION_RATE
+        burst = settings.SUBMISSION_BURST
+        now = time.time()
+
+        try:
+            tokens, updated = cache.get(self.key) or (burst, now)
+        except Exception as e:
+            logger.warning(f"Rate limit state unavailable: {e}")
+            return True
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        cost = submission_cost(request, view)
+        needed = min(cost, burst)
+        allowed = tokens >= needed
+        if allowed:
+            tokens -= cost
+        self.shortfall = needed - tokens
+        try:
+            # Kept until a full bucket would have refilled, debt included
+            cache.set(self.key, (tokens, now), math.ceil((burst - min(tokens, 0)) / rate))
+        except Exception as e:
+            logger.warning(f"Failed to save rate limit state: {e}")
+        return allowed
+
+    def wait(self):
+        return math.ceil(self.shortfall / settings.SUBMISSION_RATE)
@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+# A new segment file is started once the current one reaches this size
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def archive_dir():
+    return str(settings.SUBMISSION_ARCHIVE_DIR)
+
+
+def record_fields():
+    """Submission columns kept in an archive record; the code is stored as text"""
+    from .models import Submission
+
+    return [field.attname for field in Submission._meta.concrete_fields if field.name != 'code_blob']
+
+
+class SegmentWriter:
+    """Appends submissions to gzip JSONL segment files.
+
+    Each record is written as a separate gzip member. The members of a file
+    concatenate into a valid .jsonl.gz, and any one record can be read back
+    with a single seek.
+    """
+
+    def __init__(self, directory=None, max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = directory or archive_dir()
+        self.max_bytes = max_bytes
+        self.file = None
+        self.segment = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _open_segment(self):
+        self.close()
+        self.segment = f'submissions-{time.time_ns()}.jsonl.gz'
+        self.file = open(os.path.join(self.directory, self.segment), 'ab')
+
+    def write(self, record):
+        """Append one record and return its (segment, offset, length)"""
+        if self.file is None or self.file.tell() >= self.max_bytes:
+            self._open_segment()
+        line = json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+        data = gzip.compress(line.encode('utf-8'))
+        offset = self.file.tell()
+        self.file.write(data)
+        return self.segment, offset, len(data)
+
+    def sync(self):
+        """Make everything written so far durable before the rows are deleted"""
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+
+def read_record(segment, offset, length, directory=None):
+    path = os.path.join(directory or archive_dir(), os.path.basename(segment))
+    with open(path, 'rb') as segment_file:
+        segment_file.seek(offset)
+        return json.loads(gzip.decompress(segment_file.read(length)))
+
+
+def load_archived_submission(submission_id, user):
+    """Rebuild an archived submission as an unsaved Submission, or raise Http404"""
+    from .models import ArchivedSubmission, Submission
+
+    try:
+        entry = ArchivedSubmission.objects.get(id=submission_id, user=user)
+    except ArchivedSubmission.DoesNotExist:
+        raise Http404
+    record = read_record(entry.segment, entry.offset, entry.length)
+
+    fields = {name: record.get(name) for name in record_fields()}
+    fields['submitted_at'] = parse_datetime(record['submitted_at'])
+    return Submission(code=record['code'], **fields)
+
+
+def delete_orphaned_blobs(hashes):
+    """Delete the given code blobs once nothing references them.
+
+    Freeing a delta can leave its base unreferenced, so the bases of
+    deleted blobs are checked in turn. Returns the number deleted.
+    """
+    from .models import CodeBlob, Submission
+
+    deleted = 0
+    candidates = set(hashes)
+    while candidates:
+        orphans = CodeBlob.objects.filter(pk__in=candidates).exclude(
+            Exists(Submission.objects.filter(code_blob=OuterRef('pk')))
+        ).exclude(
+            Exists(CodeBlob.objects.filter(base=OuterRef('pk')))
+        )
+        rows = list(orphans.values_list('pk', 'base_id'))
+        if not rows:
+            break
+        CodeBlob.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        deleted += len(rows)
+        candidates = {base_id for _, base_id in rows if base_id}
+    return deleted
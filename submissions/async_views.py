@@ -0,0 +1,54 @@
+"""Async versions of the submission reads, routed by BenchCoder.urls_async"""
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from django.http import Http404
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.async_views import async_api_view
+from utils.serializers import project_queryset
+from .archive import load_archived_submission
+from .live_status import await_status, public_status
+from .models import Submission, SubmissionBatch
+from .serializers import SubmissionSerializer
+from .views import SubmissionBatchStatusView, SubmissionStatusView
+
+
+@async_api_view
+async def submission_detail(request, submission_id):
+    submissions = project_queryset(Submission.objects.all(), SubmissionSerializer, request)
+    submission = await submissions.filter(id=submission_id, user=request.user).afirst()
+    if submission is None:
+        # Old submissions are read back from the archive
+        submission = await sync_to_async(load_archived_submission)(submission_id, request.user)
+
+    # The code and percentiles are loaded as the fields are read, so
+    # serialize off the event loop
+    def serialize():
+        return SubmissionSerializer(submission, context={'request': request}).data
+
+    return Response(await sync_to_async(serialize)(), status=status.HTTP_200_OK)
+
+
+@async_api_view
+async def submission_batch_status(request, batch_id):
+    try:
+        batch = await SubmissionBatch.objects.aget(id=batch_id, user=request.user)
+    except SubmissionBatch.DoesNotExist:
+        raise Http404
+    verdicts = {
+        verdict: count
+        async for verdict, count in batch.submissions.values_list('verdict').annotate(count=Count('id')).order_by()
+    }
+    return Response(SubmissionBatchStatusView.summarize(batch, verdicts), status=status.HTTP_200_OK)
+
+
+@async_api_view
+async def submission_status(request, submission_id):
+    # Long polls wait on the event loop, so they cost a worker nothing
+    try:
+        since, wait = SubmissionStatusView.wait_params(request)
+    except ValueError:
+        return Response({'detail': 'since and wait must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+    entry = await await_status(submission_id, request.user.id, since=since, timeout=wait)
+    return Response(public_status(entry), status=status.HTTP_200_OK)
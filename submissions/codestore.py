@@ -0,0 +1,33 @@
+import hashlib
+import zlib
+
+# A delta is only decoded after its whole chain of bases, so chains are cut
+# off at this length and the next blob is stored standalone
+MAX_DELTA_DEPTH = 8
+
+COMPRESSION_LEVEL = 9
+
+# zlib only looks back this far, so only the tail of a base is useful
+ZDICT_SIZE = 32 * 1024
+
+
+def code_hash(code):
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def compress(code, base_code=None):
+    """zlib-compress code, primed with base_code as a preset dictionary if given"""
+    raw = code.encode('utf-8')
+    if base_code is None:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=base_code.encode('utf-8')[-ZDICT_SIZE:])
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decompress(data, base_code=None):
+    if base_code is None:
+        decompressor = zlib.decompressobj()
+    else:
+        decompressor = zlib.decompressobj(zdict=base_code.encode('utf-8')[-ZDICT_SIZE:])
+    return (decompressor.decompress(bytes(data)) + decompressor.flush()).decode('utf-8')
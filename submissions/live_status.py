@@ -0,0 +1,128 @@
+"""Verdict and judging progress of submissions, kept in the cache by the judge.
+
+Each write gets a new version (a nanosecond timestamp), so a client that
+passes back the version it last saw can long-poll until there is a newer
+one. Entries missing from the cache are rebuilt from the database.
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .progress import UNJUDGED_VERDICTS
+
+logger = logging.getLogger(__name__)
+
+# Fields of an entry that are shown to the client
+PUBLIC_FIELDS = ('id', 'verdict', 'done', 'passed', 'total', 'execution_time', 'memory_used', 'version')
+
+
+def status_key(submission_id):
+    return f'submission:status:{submission_id}'
+
+
+def _entry(submission, passed=None, total=None):
+    return {
+        'id': submission.id,
+        'user_id': submission.user_id,
+        'verdict': submission.verdict,
+        'done': submission.verdict not in UNJUDGED_VERDICTS,
+        'passed': passed,
+        'total': total,
+        'execution_time': submission.execution_time,
+        'memory_used': submission.memory_used,
+        'version': time.time_ns(),
+    }
+
+
+def publish_status(submission, passed=None, total=None):
+    """Record the submission's current verdict, and how many of its tests have passed"""
+    try:
+        cache.set(status_key(submission.id), _entry(submission, passed, total), settings.SUBMISSION_STATUS_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Failed to publish status of submission {submission.id}: {e}")
+
+
+def publish_statuses(submissions):
+    try:
+        cache.set_many(
+            {status_key(submission.id): _entry(submission) for submission in submissions},
+            settings.SUBMISSION_STATUS_TIMEOUT
+        )
+    except Exception as e:
+        logger.warning(f"Failed to publish submission statuses: {e}")
+
+
+def public_status(entry):
+    return {field: entry[field] for field in PUBLIC_FIELDS}
+
+
+def _owned(entry, user_id):
+    if entry['user_id'] != user_id:
+        raise Http404
+    return entry
+
+
+def _read(submission_id):
+    try:
+        return cache.get(status_key(submission_id))
+    except Exception as e:
+        logger.warning(f"Status cache read failed: {e}")
+        return None
+
+
+async def _aread(submission_id):
+    try:
+        return await cache.aget(status_key(submission_id))
+    except Exception as e:
+        logger.warning(f"Status cache read failed: {e}")
+        return None
+
+
+def _rebuild(submission_id, user_id):
+    """Entry for a submission whose status isn't cached, from its row or archive index"""
+    from .models import ArchivedSubmission, Submission
+
+    submission = (
+        Submission.objects.only('id', 'user', 'verdict', 'execution_time', 'memory_used')
+        .filter(id=submission_id, user_id=user_id).first()
+    ) or ArchivedSubmission.objects.filter(id=submission_id, user_id=user_id).first()
+    if submission is None:
+        raise Http404
+    entry = _entry(submission)
+    try:
+        # A judge write racing this one is newer, so don't replace it
+        if not cache.add(status_key(submission_id), entry, settings.SUBMISSION_STATUS_TIMEOUT):
+            entry = cache.get(status_key(submission_id)) or entry
+    except Exception as e:
+        logger.warning(f"Status cache write failed: {e}")
+    return entry
+
+
+def get_status(submission_id, user_id):
+    entry = _read(submission_id)
+    return _owned(entry, user_id) if entry is not None else _rebuild(submission_id, user_id)
+
+
+async def await_status(submission_id, user_id, since=None, timeout=0):
+    """The submission's status once it differs from version `since`, or after `timeout` seconds.
+
+    Without `since`, waits for a change from the status at the time of the
+    call. Returns at once if judging is already over. Waiting holds no
+    thread, which is why only the async view offers it.
+    """
+    entry = await _aread(submission_id)
+    if entry is None:
+        entry = await sync_to_async(_rebuild)(submission_id, user_id)
+    _owned(entry, user_id)
+
+    since = entry['version'] if since is None else since
+    deadline = time.monotonic() + timeout
+    while not entry['done'] and entry['version'] == since and time.monotonic() < deadline:
+        await asyncio.sleep(settings.SUBMISSION_STATUS_POLL_INTERVAL)
+        entry = await _aread(submission_id) or entry
+    return entry
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from submissions.archive import SegmentWriter, delete_orphaned_blobs, record_fields
+from submissions.models import ArchivedSubmission, Submission
+from submissions.progress import UNJUDGED_VERDICTS
+
+
+class Command(BaseCommand):
+    help = "Move judged submissions older than --days out of the database into archive segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SUBMISSION_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dir', default=None, help="Segment directory (default SUBMISSION_ARCHIVE_DIR)")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        fields = record_fields()
+        old_submissions = (
+            Submission.objects.filter(submitted_at__lt=cutoff)
+            .exclude(verdict__in=UNJUDGED_VERDICTS)
+            .order_by('id')
+        )
+
+        writer = SegmentWriter(options['dir'])
+        archived = 0
+        blobs_deleted = 0
+        last_id = 0
+        try:
+            while True:
+                # Keyset over ids so each batch is one indexed range scan
+                batch = list(
+                    old_submissions.filter(id__gt=last_id)
+                    .select_related('code_blob')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                # Deltas in a batch often share bases; decode each blob once
+                texts = {}
+                entries = []
+                for submission in batch:
+                    if submission.code_blob_id not in texts:
+                        texts[submission.code_blob_id] = submission.code_blob.text()
+                    record = {name: getattr(submission, name) for name in fields}
+                    record['code'] = texts[submission.code_blob_id]
+                    segment, offset, length = writer.write(record)
+                    entries.append(ArchivedSubmission(
+                        id=submission.id,
+                        user_id=submission.user_id,
+                        problem_id=submission.problem_id,
+                        language=submission.language,
+                        verdict=submission.verdict,
+                        execution_time=submission.execution_time,
+                        memory_used=submission.memory_used,
+                        submitted_at=submission.submitted_at,
+                        segment=segment,
+                        offset=offset,
+                        length=length,
+                    ))
+                writer.sync()
+
+                with transaction.atomic():
+                    ArchivedSubmission.objects.bulk_create(entries)
+                    Submission.objects.filter(id__in=[entry.id for entry in entries]).delete()
+                    blobs_deleted += delete_orphaned_blobs(texts)
+                archived += len(entries)
+        finally:
+            writer.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} submissions and deleted {blobs_deleted} unreferenced code blobs"
+        ))
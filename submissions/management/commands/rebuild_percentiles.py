@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from submissions.models import ArchivedSubmission, RuntimeHistogram, Submission
+from submissions.percentiles import BUCKET_COUNT, METRIC_FIELDS, bucket_for
+
+FLAG_BATCH_SIZE = 5000
+
+
+def batches(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), FLAG_BATCH_SIZE):
+        yield ids[start:start + FLAG_BATCH_SIZE]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-problem runtime and memory histograms from accepted submissions"
+
+    def handle(self, *args, **options):
+        histograms = defaultdict(lambda: [0] * BUCKET_COUNT)
+        fields = ('id', 'problem_id', 'language', 'execution_time', 'memory_used')
+
+        def count(rows):
+            for _, problem_id, language, execution_time, memory_used in rows:
+                values = {'time': execution_time, 'memory': memory_used}
+                for metric in METRIC_FIELDS:
+                    if values[metric] is not None:
+                        histograms[(problem_id, language, metric)][bucket_for(metric, values[metric])] += 1
+
+        scanned = set()
+        for model in (Submission, ArchivedSubmission):
+            accepted = model.objects.filter(verdict='AC').values_list(*fields).iterator(chunk_size=5000)
+            for row in accepted:
+                if model is Submission:
+                    scanned.add(row[0])
+                count([row])
+
+        with transaction.atomic():
+            # Only the scanned submissions are flagged as counted. Accepts
+            # judged since were either recorded in the histograms being
+            # replaced, and are counted again here, or are still to be
+            # recorded and will be counted on top of the rebuilt ones
+            for batch in batches(scanned):
+                Submission.objects.filter(id__in=batch, in_histograms=False).update(in_histograms=True)
+            flagged = Submission.objects.filter(verdict='AC', in_histograms=True).values_list('id', flat=True)
+            late = [submission_id for submission_id in flagged.iterator(chunk_size=5000) if submission_id not in scanned]
+            for batch in batches(late):
+                count(Submission.objects.filter(id__in=batch).values_list(*fields))
+            Submission.objects.exclude(verdict='AC').filter(in_histograms=True).update(in_histograms=False)
+
+            RuntimeHistogram.objects.all().delete()
+            RuntimeHistogram.objects.bulk_create(
+                [
+                    RuntimeHistogram(
+                        problem_id=problem_id,
+                        language=language,
+                        metric=metric,
+                        counts=counts,
+                        total=sum(counts),
+                    )
+                    for (problem_id, language, metric), counts in histograms.items()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(histograms)} histograms"))
@@ -0,0 +1,57 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from problems.cache import bump_stats_version
+from submissions.models import ArchivedSubmission, ProblemStats, ProblemStatsEvent, Submission, UserProblemStatus
+from submissions.progress import UNJUDGED_VERDICTS
+
+
+class Command(BaseCommand):
+    help = "Recompute every problem's submission stats from submission history"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Queued events are covered by the recount; later ones are not
+            last_event = ProblemStatsEvent.objects.aggregate(last=Max('id'))['last']
+
+            verdicts = defaultdict(Counter)
+            for model in (Submission, ArchivedSubmission):
+                rows = (
+                    model.objects.exclude(verdict__in=UNJUDGED_VERDICTS)
+                    .values('problem_id', 'verdict')
+                    .annotate(count=Count('id'))
+                    .order_by()
+                )
+                for row in rows:
+                    verdicts[row['problem_id']][row['verdict']] += row['count']
+
+            solvers = dict(
+                UserProblemStatus.objects.filter(solved_at__isnull=False)
+                .values('problem_id')
+                .annotate(count=Count('id'))
+                .values_list('problem_id', 'count')
+                .order_by()
+            )
+
+            ProblemStats.objects.all().delete()
+            ProblemStats.objects.bulk_create(
+                [
+                    ProblemStats(
+                        problem_id=problem_id,
+                        submissions=sum(counts.values()),
+                        accepted=counts['AC'],
+                        unique_solvers=solvers.get(problem_id, 0),
+                        verdicts=dict(counts),
+                    )
+                    for problem_id, counts in verdicts.items()
+                ],
+                batch_size=1000,
+            )
+            if last_event is not None:
+                ProblemStatsEvent.objects.filter(id__lte=last_event).delete()
+            transaction.on_commit(bump_stats_version)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {len(verdicts)} problems"))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0002_alter_submission_ai_status_alter_submission_verdict'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='complexity',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='profile_result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='profile_status',
+            field=models.CharField(default='Not Requested', max_length=30),
+        ),
+    ]
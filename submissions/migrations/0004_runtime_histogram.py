@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-19 02:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0002_profile_inputs'),
+        ('submissions', '0003_submission_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuntimeHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(choices=[('python', 'Python'), ('java', 'Java'), ('cpp', 'C++'), ('c', 'C'), ('javascript', 'JavaScript')], max_length=10)),
+                ('metric', models.CharField(choices=[('time', 'Execution Time'), ('memory', 'Memory Used')], max_length=10)),
+                ('counts', models.JSONField(default=list)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runtime_histograms', to='problems.problem')),
+            ],
+            options={
+                'unique_together': {('problem', 'language', 'metric')},
+            },
+        ),
+    ]
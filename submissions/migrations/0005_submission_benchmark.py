@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0004_runtime_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='benchmark_result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='benchmark_status',
+            field=models.CharField(default='Not Requested', max_length=30),
+        ),
+    ]
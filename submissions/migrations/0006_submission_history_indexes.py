@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0005_submission_benchmark'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-submitted_at', '-id'], name='submission_user_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', 'problem', '-submitted_at', '-id'], name='submission_user_problem_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from submissions.codestore import code_hash, compress, decompress
+
+BATCH_SIZE = 2000
+
+
+def move_code_to_blobs(apps, schema_editor):
+    CodeBlob = apps.get_model('submissions', 'CodeBlob')
+    Submission = apps.get_model('submissions', 'Submission')
+
+    rows = Submission.objects.order_by('id').values_list('id', 'code')
+    batch = []
+    for submission_id, code in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append((submission_id, code))
+        if len(batch) >= BATCH_SIZE:
+            _store_batch(CodeBlob, Submission, batch)
+            batch = []
+    if batch:
+        _store_batch(CodeBlob, Submission, batch)
+
+
+def _store_batch(CodeBlob, Submission, batch):
+    # Existing rows are stored standalone; deltas start with new submissions
+    blobs = {}
+    submissions = []
+    for submission_id, code in batch:
+        digest = code_hash(code)
+        blobs.setdefault(digest, CodeBlob(hash=digest, data=compress(code), size=len(code.encode('utf-8'))))
+        submissions.append(Submission(id=submission_id, code_blob_id=digest))
+    CodeBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+    Submission.objects.bulk_update(submissions, ['code_blob'])
+
+
+def restore_code(apps, schema_editor):
+    CodeBlob = apps.get_model('submissions', 'CodeBlob')
+    Submission = apps.get_model('submissions', 'Submission')
+
+    texts = {}
+
+    def text(digest):
+        if digest not in texts:
+            blob = CodeBlob.objects.get(pk=digest)
+            base = text(blob.base_id) if blob.base_id else None
+            texts[digest] = decompress(blob.data, base)
+        return texts[digest]
+
+    for submission in Submission.objects.only('id', 'code_blob').iterator(chunk_size=BATCH_SIZE):
+        submission.code = text(submission.code_blob_id)
+        submission.save(update_fields=['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0009_submission_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('depth', models.PositiveSmallIntegerField(default=0)),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submissions.codeblob')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='code_blob',
+            field=models.ForeignKey(db_column='code_hash', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submissions.codeblob'),
+        ),
+        # Lets the reverse migration re-add the column before refilling it
+        migrations.AlterField(
+            model_name='submission',
+            name='code',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(move_code_to_blobs, restore_code),
+        migrations.RemoveField(
+            model_name='submission',
+            name='code',
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='code_blob',
+            field=models.ForeignKey(db_column='code_hash', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submissions.codeblob'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0011_archived_submission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='queue_tag',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('queue_tag__isnull', False)), fields=['queue_tag', 'id'], name='submission_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['dispatched_at'], name='submission_dispatched_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 03:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0001_initial'),
+        ('submissions', '0012_fair_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='contest',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='contests.contest'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0013_submission_contest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='judge_node',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 03:42
+
+from django.db import migrations, models
+
+
+def mark_accepted(apps, schema_editor):
+    # Accepted submissions so far were counted when they were judged
+    Submission = apps.get_model('submissions', 'Submission')
+    Submission.objects.filter(verdict='AC').update(in_histograms=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0014_submission_judge_node'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='in_histograms',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_accepted, migrations.RunPython.noop),
+    ]
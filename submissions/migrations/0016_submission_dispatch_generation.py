@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0015_submission_in_histograms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='dispatch_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,6 +1,94 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 
+from .codestore import MAX_DELTA_DEPTH, code_hash, compress, decompress
+
+class CodeBlob(models.Model):
+    """Compressed source code, stored once per distinct text and keyed by its SHA-256.
+
+    A blob may be delta-encoded against an earlier one (usually the same
+    user's previous attempt at the problem), in which case the base's text
+    is the preset dictionary needed to decompress it.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    base = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    # Length of the chain of bases behind this blob
+    depth = models.PositiveSmallIntegerField(default=0)
+    size = models.PositiveIntegerField()  # uncompressed bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    @classmethod
+    def store(cls, code, base_hash=None):
+        """Save code unless an identical blob exists, returning its hash"""
+        digest = code_hash(code)
+        if cls.objects.filter(pk=digest).exists():
+            return digest
+        
+        blob = cls(hash=digest, data=compress(code), size=len(code.encode('utf-8')))
+        if base_hash and base_hash != digest:
+            base = cls.objects.filter(pk=base_hash).first()
+            if base is not None and base.depth < MAX_DELTA_DEPTH:
+                delta = compress(code, base.text())
+                # Keep the delta only if it actually saves space
+                if len(delta) < len(blob.data):
+                    blob.data, blob.base, blob.depth = delta, base, base.depth + 1
+        
+        # Another writer may have stored the same text in the meantime
+        cls.objects.bulk_create([blob], ignore_conflicts=True)
+        return digest
+    
+    @classmethod
+    def store_many(cls, codes):
+        """Save several texts standalone with two queries, returning their hashes"""
+        digests = [code_hash(code) for code in codes]
+        existing = set(cls.objects.filter(pk__in=set(digests)).values_list('pk', flat=True))
+        new_blobs = {}
+        for digest, code in zip(digests, codes):
+            if digest not in existing and digest not in new_blobs:
+                new_blobs[digest] = cls(hash=digest, data=compress(code), size=len(code.encode('utf-8')))
+        cls.objects.bulk_create(new_blobs.values(), ignore_conflicts=True)
+        return digests
+    
+    def text(self):
+        chain = [self]
+        while chain[-1].base_id:
+            chain.append(CodeBlob.objects.get(pk=chain[-1].base_id))
+        
+        code = None
+        for blob in reversed(chain):
+            code = decompress(blob.data, code)
+        return code
+    
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.size} bytes)"
+
+
+class SubmissionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        pending = [obj for obj in objs if obj.has_unsaved_code()]
+        if pending:
+            hashes = CodeBlob.store_many([obj.code for obj in pending])
+            for obj, digest in zip(pending, hashes):
+                obj.code_blob_id = digest
+                obj.__dict__['_code_changed'] = False
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class SubmissionBatch(models.Model):
+    """Submissions created together through the batch API"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='submission_batches')
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user_id} - batch {self.id} ({self.size})"
+
+
 class Submission(models.Model):
     VERDICT_CHOICES = [
         ('AC', 'Accepted'),
@@ -24,7 +112,8 @@ class Submission(models.Model):
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE)  # Use string reference
-    code = models.TextField()
+    # Source lives in CodeBlob; read and assign it through .code
+    code_blob = models.ForeignKey(CodeBlob, on_delete=models.PROTECT, db_column='code_hash', related_name='+')
     language = models.CharField(max_length=10, choices=LANGUAGE_CHOICES, default='python')
     verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, default='P')
     execution_time = models.FloatField(null=True, blank=True)
@@ -32,6 +121,174 @@ class Submission(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     ai_feedback = models.TextField(null=True, blank=True)
     ai_status = models.CharField(max_length=30, default='Not Requested')
+    profile_status = models.CharField(max_length=30, default='Not Requested')
+    profile_result = models.JSONField(null=True, blank=True)
+    complexity = models.CharField(max_length=20, blank=True, default='')
+    benchmark_status = models.CharField(max_length=30, default='Not Requested')
+    benchmark_result = models.JSONField(null=True, blank=True)
+    # Counted in its problem's runtime histograms, see submissions.percentiles
+    in_histograms = models.BooleanField(default=False)
+    batch = models.ForeignKey(SubmissionBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions')
+    contest = models.ForeignKey(
+        'contests.Contest', on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions'
+    )
+    # Fair-share start tag while waiting for the judge, see submissions.scheduler
+    queue_tag = models.BigIntegerField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Bumped each time the dispatcher claims it; sent with the judging task so
+    # that a message from before a requeue is recognised as stale
+    dispatch_generation = models.PositiveIntegerField(default=0)
+    # Judge worker whose own queue it was sent to, blank for the shared queue; see judge.routing
+    judge_node = models.CharField(max_length=255, blank=True, default='')
+    
+    objects = SubmissionQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's history, optionally per problem
+            models.Index(fields=['user', '-submitted_at', '-id'], name='submission_user_history_idx'),
+            models.Index(fields=['user', 'problem', '-submitted_at', '-id'], name='submission_user_problem_idx'),
+            # Only waiting submissions have a tag, so the queue index stays small
+            models.Index(
+                fields=['queue_tag', 'id'], condition=models.Q(queue_tag__isnull=False), name='submission_queue_idx'
+            ),
+            models.Index(fields=['dispatched_at'], name='submission_dispatched_idx'),
+        ]
+    
+    @property
+    def code(self):
+        """Source code, loaded from its blob on first access"""
+        if '_code' not in self.__dict__:
+            self.__dict__['_code'] = self.code_blob.text() if self.code_blob_id else None
+        return self.__dict__['_code']
+    
+    @code.setter
+    def code(self, value):
+        self.__dict__['_code'] = value
+        self.__dict__['_code_changed'] = True
+    
+    def has_unsaved_code(self):
+        return self.__dict__.get('_code_changed', False)
+    
+    def save(self, *args, **kwargs):
+        if self.has_unsaved_code():
+            # Delta-encode against the user's previous attempt at the problem
+            previous = (
+                Submission.objects.filter(user_id=self.user_id, problem_id=self.problem_id)
+                .exclude(pk=self.pk)
+                .order_by('-submitted_at', '-id')
+                .values_list('code_blob_id', flat=True)
+                .first()
+            )
+            self.code_blob_id = CodeBlob.store(self.code, base_hash=previous)
+            self.__dict__['_code_changed'] = False
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'code_blob'}
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.problem.title} - {self.verdict}"
+
+class RuntimeHistogram(models.Model):
+    """Distribution of accepted runtimes or memory use for one problem and language"""
+    METRIC_CHOICES = [
+        ('time', 'Execution Time'),
+        ('memory', 'Memory Used'),
+    ]
+    
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE, related_name='runtime_histograms')
+    language = models.CharField(max_length=10, choices=Submission.LANGUAGE_CHOICES)
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    counts = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('problem', 'language', 'metric')
+    
+    def add(self, value):
+        from .percentiles import BUCKET_COUNT, bucket_for
+        
+        if len(self.counts) != BUCKET_COUNT:
+            self.counts = [0] * BUCKET_COUNT
+        self.counts[bucket_for(self.metric, value)] += 1
+        self.total += 1
+    
+    def __str__(self):
+        return f"{self.problem_id} - {self.language} - {self.metric} ({self.total})"
+
+
+class UserProblemStatus(models.Model):
+    """Progress of one user on one problem, maintained by the judge.
+
+    A row exists once the user has a judged submission for the problem;
+    solved_at is set by their first AC.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='problem_statuses')
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE, related_name='user_statuses')
+    solved_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ('user', 'problem')
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.problem_id} - {'solved' if self.solved_at else 'unsolved'}"
+
+
+class ProblemStats(models.Model):
+    """Submission counters for one problem, applied in batches from ProblemStatsEvent"""
+    problem = models.OneToOneField('problems.Problem', on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    submissions = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    unique_solvers = models.PositiveIntegerField(default=0)
+    # verdict -> count
+    verdicts = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def acceptance_rate(self):
+        if not self.submissions:
+            return None
+        return round(100 * self.accepted / self.submissions, 2)
+    
+    def __str__(self):
+        return f"{self.problem_id} - {self.accepted}/{self.submissions}"
+
+
+class ProblemStatsEvent(models.Model):
+    """One judged submission waiting to be counted in ProblemStats.
+
+    Rows are only ever inserted by the judge and deleted by the flush, so
+    recording a verdict never waits on a lock held by another submission.
+    """
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE, related_name='+')
+    verdict = models.CharField(max_length=20, choices=Submission.VERDICT_CHOICES)
+    # The submission was the user's first AC on the problem
+    first_solve = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.problem_id} - {self.verdict}"
+
+
+class ArchivedSubmission(models.Model):
+    """Index entry for a submission moved out to an archive segment.
+
+    The full row lives in the segment file; the columns kept here are the
+    ones rebuild jobs aggregate over.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the submission's id
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    problem = models.ForeignKey('problems.Problem', on_delete=models.CASCADE, related_name='+')
+    language = models.CharField(max_length=10, choices=Submission.LANGUAGE_CHOICES)
+    verdict = models.CharField(max_length=20, choices=Submission.VERDICT_CHOICES)
+    execution_time = models.FloatField(null=True, blank=True)
+    memory_used = models.FloatField(null=True, blank=True)
+    submitted_at = models.DateTimeField()
+    segment = models.CharField(max_length=100)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
     
     def __str__(self):
-        return f"{self.user.username} - {self.problem.title} - {self.verdict}"
\ No newline at end of file
+        return f"{self.id} in {self.segment}@{self.offset}"
@@ -0,0 +1,98 @@
+import math
+
+from django.db import transaction
+
+# Histograms use fixed log-scale buckets so every lookup touches the same
+# number of counters however many submissions a problem has
+BUCKET_COUNT = 64
+
+# Value range covered by each metric: seconds for time, MB for memory.
+# Values outside the range are clamped into the first or last bucket.
+METRIC_RANGES = {
+    'time': (0.001, 100.0),
+    'memory': (0.5, 4096.0),
+}
+
+METRIC_FIELDS = {
+    'time': 'execution_time',
+    'memory': 'memory_used',
+}
+
+
+def bucket_for(metric, value):
+    low, high = METRIC_RANGES[metric]
+    if value <= low:
+        return 0
+    if value >= high:
+        return BUCKET_COUNT - 1
+    position = math.log(value / low) / math.log(high / low)
+    return min(BUCKET_COUNT - 1, int(position * BUCKET_COUNT))
+
+
+def beats_percentage(counts, total, value, metric):
+    """Share of the other recorded submissions that used more than value.
+
+    The histogram is expected to already include value itself. Submissions
+    sharing its bucket count as half slower, half faster.
+    """
+    others = total - 1
+    if others <= 0:
+        return 100.0
+
+    bucket = bucket_for(metric, value)
+    slower = sum(counts[bucket + 1:]) + (counts[bucket] - 1) / 2
+    return round(max(0.0, min(100.0, 100.0 * slower / others)), 2)
+
+
+def record_accepted_submission(submission):
+    """Add an accepted submission's runtime and memory to its histograms.
+
+    A submission is only ever counted once: a retried judging task or a
+    rejudge that accepts it again finds it already flagged.
+    """
+    from .models import RuntimeHistogram, Submission
+
+    with transaction.atomic():
+        if not Submission.objects.filter(pk=submission.pk, in_histograms=False).update(in_histograms=True):
+            return
+        submission.in_histograms = True
+        for metric, field in METRIC_FIELDS.items():
+            value = getattr(submission, field)
+            if value is None:
+                continue
+
+            RuntimeHistogram.objects.get_or_create(
+                problem_id=submission.problem_id,
+                language=submission.language,
+                metric=metric,
+            )
+            histogram = RuntimeHistogram.objects.select_for_update().get(
+                problem_id=submission.problem_id,
+                language=submission.language,
+                metric=metric,
+            )
+            histogram.add(value)
+            histogram.save(update_fields=['counts', 'total', 'updated_at'])
+
+
+def get_percentiles(submission):
+    """Return the "beats X%" figures for an accepted submission"""
+    from .models import RuntimeHistogram
+
+    percentiles = {'runtime': None, 'memory': None}
+    if submission.verdict != 'AC':
+        return percentiles
+
+    histograms = RuntimeHistogram.objects.filter(
+        problem_id=submission.problem_id,
+        language=submission.language,
+    ).only('metric', 'counts', 'total')
+
+    for histogram in histograms:
+        value = getattr(submission, METRIC_FIELDS[histogram.metric])
+        if value is None or not histogram.total:
+            continue
+        key = 'runtime' if histogram.metric == 'time' else 'memory'
+        percentiles[key] = beats_percentage(histogram.counts, histogram.total, value, histogram.metric)
+
+    return percentiles
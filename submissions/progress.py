@@ -0,0 +1,93 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from problems.cache import bump_user_version
+from .stats import record_stats_event
+
+# Verdicts that are not a final judgement of the code
+UNJUDGED_VERDICTS = ('P', 'Judging')
+
+
+def record_solve(submission):
+    """Award the problem's points if this is the user's first AC on it.
+
+    The status row is locked while checking, so concurrent ACs for the same
+    user and problem award points exactly once. Returns True if points were
+    awarded.
+    """
+    from users.leaderboard import get_leaderboard
+    from .models import UserProblemStatus
+
+    User = apps.get_model('users', 'User')
+
+    with transaction.atomic():
+        status, _ = UserProblemStatus.objects.select_for_update().get_or_create(
+            user_id=submission.user_id,
+            problem_id=submission.problem_id,
+        )
+        if status.solved_at is not None:
+            return False
+
+        status.solved_at = submission.submitted_at or timezone.now()
+        status.save(update_fields=['solved_at'])
+
+        User.objects.filter(pk=submission.user_id).update(
+            score=F('score') + submission.problem.points,
+            problems_solved=F('problems_solved') + 1,
+        )
+        score = User.objects.values_list('score', flat=True).get(pk=submission.user_id)
+
+        # Only publish the new score once it is durable
+        transaction.on_commit(lambda: get_leaderboard().update(submission.user_id, score))
+        transaction.on_commit(lambda: bump_user_version(submission.user_id))
+    return True
+
+
+def record_verdict(submission):
+    """Update the user's status on the problem once a verdict is final"""
+    from .models import UserProblemStatus
+
+    if submission.verdict in UNJUDGED_VERDICTS:
+        return
+    if submission.contest_id:
+        from contests.scoreboard import record_contest_verdict
+
+        record_contest_verdict(submission)
+    if submission.verdict == 'AC':
+        record_stats_event(submission, first_solve=record_solve(submission))
+        return
+
+    record_stats_event(submission)
+    _, created = UserProblemStatus.objects.get_or_create(
+        user_id=submission.user_id,
+        problem_id=submission.problem_id,
+    )
+    if created:
+        bump_user_version(submission.user_id)
+
+
+def get_problem_statuses(user_id, problem_ids):
+    """Map each of problem_ids the user has tried to 'solved' or 'attempted'"""
+    from .models import UserProblemStatus
+
+    rows = UserProblemStatus.objects.filter(
+        user_id=user_id, problem_id__in=problem_ids
+    ).values_list('problem_id', 'solved_at')
+    return {
+        problem_id: 'solved' if solved_at else 'attempted'
+        for problem_id, solved_at in rows
+    }
+
+
+async def aget_problem_statuses(user_id, problem_ids):
+    from .models import UserProblemStatus
+
+    rows = UserProblemStatus.objects.filter(
+        user_id=user_id, problem_id__in=problem_ids
+    ).values_list('problem_id', 'solved_at')
+    return {
+        problem_id: 'solved' if solved_at else 'attempted'
+        async for problem_id, solved_at in rows
+    }
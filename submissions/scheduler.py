@@ -0,0 +1,89 @@
+"""Fair-share ordering of submissions waiting for the judge.
+
+Pending submissions wait in the database rather than in the Celery queue.
+Each one gets a start tag by start-time fair queuing with unit cost: a
+user's next submission starts one after their previous queued one, and
+never before the head of the queue. Dispatching in tag order therefore
+interleaves users round-robin, so someone who submits 200 solutions
+delays everyone else by at most one judging each, instead of 200.
+
+Only JUDGE_DISPATCH_WINDOW submissions are handed to Celery at a time;
+the dispatcher tops the window up as verdicts come in, and judge.routing
+decides which worker's queue each one goes to.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .progress import UNJUDGED_VERDICTS
+
+
+def queued_submissions():
+    from .models import Submission
+
+    return Submission.objects.filter(queue_tag__isnull=False)
+
+
+def next_queue_tags(user_id, count=1):
+    """Start tags for `count` new submissions from one user, in submission order.
+
+    Two requests from the same user racing here can be given the same tag,
+    which only costs that user a little of their share.
+    """
+    bounds = queued_submissions().aggregate(head=Min('queue_tag'), last=Max('queue_tag', filter=Q(user_id=user_id)))
+    head = bounds['head'] or 0
+    start = head if bounds['last'] is None else max(head, bounds['last'] + 1)
+    return list(range(start, start + count))
+
+
+def _in_flight_submissions():
+    from .models import Submission
+
+    cutoff = timezone.now() - timedelta(seconds=settings.JUDGE_DISPATCH_TIMEOUT)
+    return Submission.objects.filter(dispatched_at__gte=cutoff, verdict__in=UNJUDGED_VERDICTS)
+
+
+def in_flight():
+    """Submissions handed to the judge that have no verdict yet.
+
+    Ones dispatched longer than JUDGE_DISPATCH_TIMEOUT ago are assumed lost
+    so that they can't hold the window shut.
+    """
+    return _in_flight_submissions().count()
+
+
+def in_flight_by_node():
+    """In-flight submissions per judge worker they were routed to"""
+    return dict(
+        _in_flight_submissions().exclude(judge_node='').values_list('judge_node').annotate(count=Count('id')).order_by()
+    )
+
+
+def requeue_routed(nodes):
+    """Put submissions routed to `nodes` that haven't started back at the head of the queue"""
+    from .models import Submission
+
+    head = queued_submissions().aggregate(head=Min('queue_tag'))['head'] or 0
+    return Submission.objects.filter(judge_node__in=nodes, verdict='P').update(
+        queue_tag=head, dispatched_at=None, judge_node=''
+    )
+
+
+def claim_next(limit):
+    """Take up to `limit` submissions off the front of the queue and return their ids"""
+    from .models import Submission
+
+    with transaction.atomic():
+        ids = list(
+            queued_submissions().order_by('queue_tag', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            Submission.objects.filter(id__in=ids).update(
+                queue_tag=None, dispatched_at=timezone.now(), dispatch_generation=F('dispatch_generation') + 1
+            )
+    return ids
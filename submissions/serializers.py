@@ -1,22 +1,59 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Submission
+from problems.models import Problem
+from .models import ProblemStats, Submission
+from .percentiles import get_percentiles
+from utils.serializers import SparseFieldsetMixin
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     problem_title = serializers.CharField(source='problem.title', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
+    percentiles = serializers.SerializerMethodField()
+    # Loaded from the blob only when this field is selected
+    code = serializers.CharField(read_only=True)
     
     class Meta:
         model = Submission
-        fields = '__all__'
+        exclude = ('code_blob', 'queue_tag', 'dispatched_at', 'dispatch_generation', 'judge_node', 'in_histograms')
         read_only_fields = ('id', 'submitted_at', 'verdict', 'execution_time', 
-                           'memory_used', 'ai_feedback', 'ai_status')
+                           'memory_used', 'ai_feedback', 'ai_status',
+                           'profile_status', 'profile_result', 'complexity',
+                           'benchmark_status', 'benchmark_result', 'batch', 'contest')
+        field_sources = {
+            'percentiles': ('problem', 'language', 'verdict', 'execution_time', 'memory_used'),
+            'code': ('code_blob',),
+        }
+    
+    def get_percentiles(self, obj):
+        return get_percentiles(obj)
 
 class SubmissionCreateSerializer(serializers.ModelSerializer):
+    code = serializers.CharField()
+    
     class Meta:
         model = Submission
         fields = ('problem', 'code', 'language')
 
-class SubmissionListSerializer(serializers.ModelSerializer):
+class SubmissionBatchItemSerializer(serializers.Serializer):
+    # Problems are checked for the whole batch at once, not with a query per item
+    problem = serializers.IntegerField()
+    code = serializers.CharField()
+    language = serializers.ChoiceField(choices=Submission.LANGUAGE_CHOICES, default='python')
+
+class SubmissionBatchCreateSerializer(serializers.Serializer):
+    submissions = SubmissionBatchItemSerializer(
+        many=True, allow_empty=False, max_length=settings.SUBMISSION_BATCH_MAX_SIZE
+    )
+    
+    def validate_submissions(self, items):
+        problem_ids = {item['problem'] for item in items}
+        found = set(Problem.objects.filter(id__in=problem_ids).values_list('id', flat=True))
+        missing = sorted(problem_ids - found)
+        if missing:
+            raise serializers.ValidationError(f"Invalid problem ids: {', '.join(map(str, missing))}")
+        return items
+
+class SubmissionListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Instead of importing from other apps, define the fields directly
     problem_title = serializers.CharField(source='problem.title', read_only=True)
     problem_difficulty = serializers.CharField(source='problem.difficulty', read_only=True)
@@ -25,4 +62,11 @@ class SubmissionListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Submission
         fields = ('id', 'problem_title', 'problem_difficulty', 'user_username', 
-                 'language', 'verdict', 'execution_time', 'submitted_at')
\ No newline at end of file
+                 'language', 'verdict', 'execution_time', 'submitted_at')
+
+class ProblemStatsSerializer(serializers.ModelSerializer):
+    acceptance_rate = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ProblemStats
+        fields = ('submissions', 'accepted', 'acceptance_rate', 'unique_solvers', 'verdicts')
@@ -0,0 +1,95 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from problems.cache import bump_stats_version
+
+# Events applied per flush transaction
+FLUSH_BATCH_SIZE = 5000
+
+
+def record_stats_event(submission, first_solve=False):
+    """Queue a judged submission to be counted in its problem's stats"""
+    from .models import ProblemStatsEvent
+
+    ProblemStatsEvent.objects.create(
+        problem_id=submission.problem_id,
+        verdict=submission.verdict,
+        first_solve=first_solve,
+    )
+
+
+def get_problem_stats(problem_ids):
+    """Map each of problem_ids to its serialized stats; None before its first flush"""
+    from .models import ProblemStats
+    from .serializers import ProblemStatsSerializer
+
+    stats = {problem_id: None for problem_id in problem_ids}
+    for row in ProblemStats.objects.filter(problem_id__in=problem_ids):
+        stats[row.problem_id] = ProblemStatsSerializer(row).data
+    return stats
+
+
+async def aget_problem_stats(problem_ids):
+    from .models import ProblemStats
+    from .serializers import ProblemStatsSerializer
+
+    stats = {problem_id: None for problem_id in problem_ids}
+    async for row in ProblemStats.objects.filter(problem_id__in=problem_ids):
+        stats[row.problem_id] = ProblemStatsSerializer(row).data
+    return stats
+
+
+def flush_problem_stats(batch_size=FLUSH_BATCH_SIZE):
+    """Fold up to batch_size queued events into ProblemStats.
+
+    Events are claimed with SKIP LOCKED, so concurrent flushes split the
+    queue rather than counting an event twice. Returns the number of events
+    applied.
+    """
+    from .models import ProblemStats, ProblemStatsEvent
+
+    with transaction.atomic():
+        event_ids = list(
+            ProblemStatsEvent.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not event_ids:
+            return 0
+
+        verdicts = defaultdict(Counter)
+        solvers = Counter()
+        rows = (
+            ProblemStatsEvent.objects.filter(id__in=event_ids)
+            .values('problem_id', 'verdict')
+            .annotate(count=Count('id'), first_solves=Count('id', filter=Q(first_solve=True)))
+            .order_by()
+        )
+        for row in rows:
+            verdicts[row['problem_id']][row['verdict']] += row['count']
+            solvers[row['problem_id']] += row['first_solves']
+
+        ProblemStats.objects.bulk_create(
+            [ProblemStats(problem_id=problem_id) for problem_id in verdicts],
+            ignore_conflicts=True,
+        )
+        # Lock in a fixed order so overlapping flushes can't deadlock
+        stats = ProblemStats.objects.select_for_update().filter(pk__in=list(verdicts)).order_by('pk')
+        updated = []
+        for row in stats:
+            counts = Counter(row.verdicts)
+            counts.update(verdicts[row.pk])
+            row.verdicts = dict(counts)
+            row.submissions += sum(verdicts[row.pk].values())
+            row.accepted += verdicts[row.pk]['AC']
+            row.unique_solvers += solvers[row.pk]
+            updated.append(row)
+        ProblemStats.objects.bulk_update(
+            updated, ['verdicts', 'submissions', 'accepted', 'unique_solvers', 'updated_at'], batch_size=1000
+        )
+
+        ProblemStatsEvent.objects.filter(id__in=event_ids).delete()
+        transaction.on_commit(bump_stats_version)
+    return len(event_ids)
@@ -0,0 +1,107 @@
+from celery import shared_task
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import logging
+
+from .admission import set_backlog
+from .progress import UNJUDGED_VERDICTS
+from .scheduler import claim_next, in_flight
+from .stats import FLUSH_BATCH_SIZE, flush_problem_stats
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_LOCK_KEY = 'judge:dispatching'
+DISPATCH_LOCK_TIMEOUT = 60
+
+
+@shared_task
+def flush_problem_stats_task():
+    """Apply every queued stats event, one batch per transaction"""
+    total = 0
+    while True:
+        flushed = flush_problem_stats(FLUSH_BATCH_SIZE)
+        total += flushed
+        if flushed < FLUSH_BATCH_SIZE:
+            break
+    if total:
+        logger.info(f"Flushed {total} problem stats events")
+    return total
+
+
+@shared_task
+def sync_judge_backlog():
+    """Reset the backlog counters to the number of unjudged submissions in each lane"""
+    from .models import Submission
+
+    unjudged = Submission.objects.filter(verdict__in=UNJUDGED_VERDICTS)
+    backlog = unjudged.filter(contest__isnull=True).count()
+    set_backlog(backlog)
+    set_backlog(unjudged.filter(contest__isnull=False).count(), contest=True)
+    return backlog
+
+
+@shared_task
+def fail_stale_judging():
+    """Give up on submissions still judging JUDGE_STALE_TIMEOUT after they were sent to the judge.
+
+    A judge worker lost mid-task, or a sharded submission whose chord never
+    completes, leaves nothing behind that would ever give it a verdict or
+    free its backlog slot.
+    """
+    from judge.tasks import fail_judging
+    from .models import Submission
+
+    cutoff = timezone.now() - timedelta(seconds=settings.JUDGE_STALE_TIMEOUT)
+    stale = list(
+        Submission.objects.filter(verdict='Judging')
+        .alias(sent_at=Coalesce('dispatched_at', 'submitted_at'))
+        .filter(sent_at__lt=cutoff)
+        .values_list('id', flat=True)
+    )
+    for submission_id in stale:
+        fail_judging(submission_id, None, None)
+    if stale:
+        logger.warning(f"Gave up on {len(stale)} submissions stuck judging")
+    return len(stale)
+
+
+@shared_task
+def dispatch_judging():
+    """Top the judge up to JUDGE_DISPATCH_WINDOW submissions, fairest first.
+
+    Runs after every enqueue and verdict. Only one dispatcher runs at a time,
+    so the window isn't overfilled; a call that finds another one running
+    returns at once, and the running one picks up whatever is free when it
+    loops.
+    """
+    from judge.routing import route_submissions
+    from judge.tasks import judge_submission
+    from .models import Submission
+
+    if not cache.add(DISPATCH_LOCK_KEY, 1, DISPATCH_LOCK_TIMEOUT):
+        return 0
+    dispatched = 0
+    try:
+        while True:
+            free = settings.JUDGE_DISPATCH_WINDOW - in_flight()
+            if free <= 0:
+                break
+            submission_ids = claim_next(free)
+            if not submission_ids:
+                break
+            generations = dict(
+                Submission.objects.filter(id__in=submission_ids).values_list('id', 'dispatch_generation')
+            )
+            for submission_id, queue in route_submissions(submission_ids).items():
+                args = (submission_id, generations[submission_id])
+                if queue:
+                    judge_submission.apply_async(args, queue=queue)
+                else:
+                    judge_submission.delay(*args)
+            dispatched += len(submission_ids)
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
+    return dispatched
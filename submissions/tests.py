@@ -1,15 +1,39 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from problems.models import Problem
-from .models import Submission
+from judge.tasks import benchmark_submission
+from problems.models import Problem, ProfileInput, TestCase
+from .admission import get_backlog, set_backlog
+from .live_status import publish_status, status_key
+from .management.commands import rebuild_percentiles
+from .models import ArchivedSubmission, CodeBlob, Submission, SubmissionBatch, RuntimeHistogram, ProblemStats, ProblemStatsEvent
+from .percentiles import get_percentiles, record_accepted_submission
+from .progress import record_verdict
+from .scheduler import claim_next, in_flight, next_queue_tags
+from .stats import flush_problem_stats
 
 User = get_user_model()
 
 class SubmissionTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='testuser', password='testpass123')
         self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
         
@@ -52,7 +76,57 @@ class SubmissionTests(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.submission_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+        
+    def test_list_submissions_keyset_pages(self):
+        submissions = [
+            Submission.objects.create(user=self.user, problem=self.problem, code='x', language='python')
+            for _ in range(5)
+        ]
+        Submission.objects.create(user=self.admin_user, problem=self.problem, code='x', language='python')
+        
+        self.client.force_authenticate(user=self.user)
+        seen = []
+        url = self.submission_list_url + '?page_size=2'
+        while url:
+            # Each page is one joined query however deep the history goes
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        
+        self.assertEqual(seen, [submission.id for submission in reversed(submissions)])
+        
+    def test_list_submissions_sparse_fields_keep_cursor_columns(self):
+        for _ in range(3):
+            Submission.objects.create(user=self.user, problem=self.problem, code='x', language='python')
+        
+        self.client.force_authenticate(user=self.user)
+        # The cursor is built from submitted_at and id even when neither is asked for
+        with self.assertNumQueries(1):
+            response = self.client.get(self.submission_list_url, {'fields': 'verdict', 'page_size': 2})
+        self.assertEqual(response.data['results'], [{'verdict': 'P'}, {'verdict': 'P'}])
+        self.assertIsNotNone(response.data['next'])
+        
+    def test_list_submissions_filters(self):
+        other_problem = Problem.objects.create(title="Other", description="x", difficulty="hard")
+        Submission.objects.create(user=self.user, problem=self.problem, code='x', language='python', verdict='AC')
+        Submission.objects.create(user=self.user, problem=self.problem, code='x', language='cpp', verdict='WA')
+        Submission.objects.create(user=self.user, problem=other_problem, code='x', language='python', verdict='WA')
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.submission_list_url, {'problem': self.problem.id, 'verdict': 'WA'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['language'], 'cpp')
+        
+        response = self.client.get(self.submission_list_url, {'language': 'python'})
+        self.assertEqual(len(response.data['results']), 2)
+        
+    def test_list_submissions_invalid_cursor(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.submission_list_url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         
     def test_list_submissions_unauthenticated(self):
         response = self.client.get(self.submission_list_url)
@@ -71,6 +145,26 @@ class SubmissionTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['id'], submission.id)
         
+    def test_get_submission_detail_sparse_fieldset(self):
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='x' * 10000,
+            language='python'
+        )
+        
+        self.client.force_authenticate(user=self.user)
+        url = reverse('submission-detail', kwargs={'submission_id': submission.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,verdict'})
+        self.assertEqual(response.data, {'id': submission.id, 'verdict': 'P'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"code"', queries[0]['sql'])
+        
+        response = self.client.get(url, {'exclude': 'code,ai_feedback'})
+        self.assertNotIn('code', response.data)
+        self.assertEqual(response.data['problem_title'], self.problem.title)
+        
     def test_request_ai_analysis(self):
         submission = Submission.objects.create(
             user=self.user,
@@ -85,4 +179,707 @@ class SubmissionTests(APITestCase):
         
         # Check that AI status was updated
         submission.refresh_from_db()
-        self.assertEqual(submission.ai_status, 'Completed')
\ No newline at end of file
+        self.assertEqual(submission.ai_status, 'Completed')
+        
+    def test_profile_rejects_unaccepted_submission(self):
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='test code',
+            language='python'
+        )
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('submission-profile', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    def test_profile_accepted_submission(self):
+        for size in (100, 200, 400):
+            ProfileInput.objects.create(problem=self.problem, size=size, input=str(size))
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='n = int(input())\nprint(sum(range(n)))',
+            language='python',
+            verdict='AC'
+        )
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('submission-profile', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Results are stored on the submission and exposed by the detail view
+        response = self.client.get(reverse('submission-detail', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.data['profile_status'], 'Completed')
+        self.assertEqual(len(response.data['profile_result']['samples']), 3)
+        self.assertTrue(response.data['complexity'])
+
+        
+    @override_settings(BENCHMARK_RUNS=3, BENCHMARK_WARMUP_RUNS=1)
+    def test_benchmark_accepted_submission(self):
+        TestCase.objects.create(problem=self.problem, input='5', expected_output='10', is_benchmark=True)
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='n = int(input())\nprint(sum(range(n)))',
+            language='python',
+            verdict='AC'
+        )
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('submission-benchmark', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        submission.refresh_from_db()
+        self.assertEqual(submission.benchmark_status, 'Completed')
+        self.assertEqual(submission.benchmark_result['runs'], 3)
+        self.assertEqual(len(submission.benchmark_result['tests']), 1)
+        self.assertIn('mad', submission.benchmark_result['total']['cpu_time'])
+        
+    @override_settings(BENCHMARK_RUNS=1, BENCHMARK_WARMUP_RUNS=0, BENCHMARK_CPU=3)
+    def test_benchmark_runs_in_a_pinned_container(self):
+        TestCase.objects.create(problem=self.problem, input='5', expected_output='10', is_benchmark=True)
+        submission = Submission.objects.create(
+            user=self.user, problem=self.problem, code='print(10)', language='python', verdict='AC'
+        )
+        client = mock.Mock()
+        client.containers.run.return_value.logs.return_value = (
+            b"10\nb0undary\nstatus 0\nwall 1000\n"
+            b"/sys/fs/cgroup/cpuacct/cpuacct.usage 5000000 \n/sys/fs/cgroup/memory/memory.max_usage_in_bytes 1048576 \nb0undary\n"
+        )
+        with mock.patch('judge.tasks.get_docker_client', return_value=client), \
+                mock.patch('judge.sandbox.uuid.uuid4', return_value=mock.Mock(hex='b0undary')):
+            benchmark_submission(submission.id)
+        
+        self.assertEqual(client.containers.run.call_args.kwargs['cpuset_cpus'], '3')
+        submission.refresh_from_db()
+        self.assertEqual(submission.benchmark_status, 'Completed')
+        self.assertEqual(submission.benchmark_result['total']['cpu_time']['median'], 0.005)
+        
+    def test_benchmark_requires_benchmark_tests(self):
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='test code',
+            language='python',
+            verdict='AC'
+        )
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('submission-benchmark', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class PercentileTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.problem = Problem.objects.create(
+            title="Test Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        
+    def create_accepted(self, execution_time, memory_used=None):
+        submission = Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='test code',
+            language='python',
+            verdict='AC',
+            execution_time=execution_time,
+            memory_used=memory_used
+        )
+        record_accepted_submission(submission)
+        return submission
+        
+    def test_histogram_counts_accepted_runs(self):
+        for execution_time in (0.01, 0.1, 1.0):
+            self.create_accepted(execution_time)
+        
+        histogram = RuntimeHistogram.objects.get(problem=self.problem, language='python', metric='time')
+        self.assertEqual(histogram.total, 3)
+        self.assertEqual(sum(histogram.counts), 3)
+        self.assertFalse(RuntimeHistogram.objects.filter(metric='memory').exists())
+        
+    def test_each_submission_is_counted_once(self):
+        submission = self.create_accepted(0.1)
+        # A retried judging task or a rejudge records the same AC again
+        record_accepted_submission(submission)
+        record_accepted_submission(Submission.objects.get(pk=submission.pk))
+        
+        histogram = RuntimeHistogram.objects.get(problem=self.problem, language='python', metric='time')
+        self.assertEqual(histogram.total, 1)
+        
+    def test_rebuild_keeps_accepts_judged_during_the_scan(self):
+        self.create_accepted(0.1)
+        late = []
+        batches = rebuild_percentiles.batches
+        
+        def accept_after_scan(ids):
+            if not late:
+                # One accept is recorded after the scan, one is still to be
+                late.append(self.create_accepted(0.2))
+                late.append(Submission.objects.create(
+                    user=self.user, problem=self.problem, code='x', verdict='AC', execution_time=0.3
+                ))
+            return batches(ids)
+        
+        with mock.patch.object(rebuild_percentiles, 'batches', accept_after_scan):
+            call_command('rebuild_percentiles', stdout=StringIO())
+        self.assertFalse(Submission.objects.get(pk=late[1].pk).in_histograms)
+        record_accepted_submission(late[1])
+        
+        histogram = RuntimeHistogram.objects.get(problem=self.problem, language='python', metric='time')
+        self.assertEqual(histogram.total, 3)
+        
+    def test_detail_reports_beats_percentage(self):
+        for execution_time in (0.5, 1.0, 2.0, 4.0):
+            self.create_accepted(execution_time, memory_used=50)
+        fastest = self.create_accepted(0.01, memory_used=50)
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('submission-detail', kwargs={'submission_id': fastest.id}))
+        self.assertEqual(response.data['percentiles']['runtime'], 100.0)
+        self.assertEqual(response.data['percentiles']['memory'], 50.0)
+        
+    def test_no_percentiles_for_unaccepted_submission(self):
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='x')
+        self.assertEqual(get_percentiles(submission), {'runtime': None, 'memory': None})
+
+
+class ProblemStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problem = Problem.objects.create(
+            title="Test Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        
+    def judge(self, verdict, user=None):
+        submission = Submission.objects.create(
+            user=user or self.user,
+            problem=self.problem,
+            code='test code',
+            language='python',
+            verdict=verdict
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            record_verdict(submission)
+        
+    def judge_history(self):
+        for verdict in ('WA', 'AC', 'AC', 'TLE'):
+            self.judge(verdict)
+        self.judge('AC', user=self.other)
+        
+    def test_verdicts_are_buffered_until_flushed(self):
+        self.judge_history()
+        self.assertEqual(ProblemStatsEvent.objects.count(), 5)
+        self.assertFalse(ProblemStats.objects.exists())
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_problem_stats(), 5)
+        self.assertFalse(ProblemStatsEvent.objects.exists())
+        
+        stats = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual(stats.submissions, 5)
+        self.assertEqual(stats.accepted, 3)
+        self.assertEqual(stats.unique_solvers, 2)
+        self.assertEqual(stats.verdicts, {'WA': 1, 'AC': 3, 'TLE': 1})
+        self.assertEqual(stats.acceptance_rate, 60.0)
+        
+    def test_flushes_accumulate_in_batches(self):
+        self.judge_history()
+        self.assertEqual(flush_problem_stats(batch_size=2), 2)
+        self.assertEqual(flush_problem_stats(batch_size=2), 2)
+        self.judge('WA', user=self.other)
+        self.assertEqual(flush_problem_stats(batch_size=2), 2)
+        self.assertEqual(flush_problem_stats(batch_size=2), 0)
+        
+        stats = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual(stats.submissions, 6)
+        self.assertEqual(stats.unique_solvers, 2)
+        self.assertEqual(stats.verdicts['WA'], 2)
+        
+    def test_rebuild_matches_flushed_stats(self):
+        self.judge_history()
+        flush_problem_stats()
+        flushed = ProblemStats.objects.get(problem=self.problem)
+        
+        # A pending submission and an unflushed event are both covered
+        Submission.objects.create(user=self.user, problem=self.problem, code='x', language='python')
+        self.judge('RE')
+        call_command('rebuild_problem_stats', stdout=StringIO())
+        
+        self.assertFalse(ProblemStatsEvent.objects.exists())
+        rebuilt = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual(rebuilt.submissions, flushed.submissions + 1)
+        self.assertEqual(rebuilt.accepted, flushed.accepted)
+        self.assertEqual(rebuilt.unique_solvers, flushed.unique_solvers)
+        self.assertEqual(rebuilt.verdicts, {**flushed.verdicts, 'RE': 1})
+        
+    def test_stats_on_problem_endpoints(self):
+        response = self.client.get(reverse('problem-list'))
+        self.assertIsNone(response.data['results'][0]['stats'])
+        
+        self.judge_history()
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_problem_stats()
+        
+        # Joined into the page query rather than fetched per problem
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.data['results'][0]['stats']['acceptance_rate'], 60.0)
+        self.assertEqual(len([q for q in queries if 'submissions_problemstats' in q['sql']]), 1)
+        
+        response = self.client.get(reverse('problem-detail', kwargs={'problem_id': self.problem.id}))
+        self.assertEqual(response.data['stats']['unique_solvers'], 2)
+        
+    def test_stats_flushes_keep_cached_responses(self):
+        self.client.get(reverse('problem-list'))
+        self.client.get(reverse('problem-detail', kwargs={'problem_id': self.problem.id}))
+        self.judge_history()
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_problem_stats()
+        
+        # Only the stats are reloaded, not the page or its count
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.data['results'][0]['stats']['acceptance_rate'], 60.0)
+        self.assertEqual([q['sql'] for q in queries if 'problems_problem' in q['sql']], [])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('problem-detail', kwargs={'problem_id': self.problem.id}))
+        self.assertEqual(response.data['stats']['unique_solvers'], 2)
+        
+        # and stored back, so the next request is a plain hit
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('problem-list'))
+        self.assertEqual([q['sql'] for q in queries if 'submissions_problemstats' in q['sql']], [])
+
+
+class SubmissionBatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problems = [
+            Problem.objects.create(title=f"Problem {i}", description="Test", difficulty="easy", points=10)
+            for i in range(2)
+        ]
+        self.items = [
+            {'problem': self.problems[i % 2].id, 'code': f'print({i})', 'language': 'python'}
+            for i in range(3)
+        ]
+        
+    def create_batch(self, items, execute=False):
+        with self.captureOnCommitCallbacks(execute=execute):
+            return self.client.post(reverse('submission-batch-create'), {'submissions': items}, format='json')
+        
+    def get_status(self, batch_id):
+        return self.client.get(reverse('submission-batch-status', kwargs={'batch_id': batch_id}))
+        
+    def test_batch_is_created_in_bulk(self):
+        # Problem check, then in a savepoint the batch row, the queue tags,
+        # the code blobs (existence check and insert) and the submissions
+        with self.assertNumQueries(8):
+            response = self.create_batch(self.items)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['size'], 3)
+        
+        batch = SubmissionBatch.objects.get(id=response.data['batch_id'])
+        self.assertEqual(
+            sorted(batch.submissions.values_list('id', flat=True)), sorted(response.data['submissions'])
+        )
+        self.assertFalse(batch.submissions.exclude(verdict='P').exists())
+        
+    def test_status_aggregates_verdicts(self):
+        batch_id = self.create_batch(self.items).data['batch_id']
+        response = self.get_status(batch_id)
+        self.assertEqual(response.data['pending'], 3)
+        self.assertFalse(response.data['done'])
+        
+        Submission.objects.filter(batch_id=batch_id).update(verdict='WA')
+        with self.assertNumQueries(2):
+            response = self.get_status(batch_id)
+        self.assertTrue(response.data['done'])
+        self.assertEqual(response.data['completed'], 3)
+        self.assertEqual(response.data['verdicts'], {'WA': 3})
+        
+    def test_batch_is_judged_after_commit(self):
+        response = self.create_batch(self.items, execute=True)
+        response = self.get_status(response.data['batch_id'])
+        self.assertTrue(response.data['done'])
+        
+    def test_invalid_batches_create_nothing(self):
+        response = self.create_batch(self.items + [{'problem': 9999, 'code': 'x'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('9999', str(response.data['submissions']))
+        
+        response = self.create_batch([self.items[0]] * (settings.SUBMISSION_BATCH_MAX_SIZE + 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.create_batch([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Submission.objects.exists())
+        
+    def test_batches_are_private(self):
+        batch_id = self.create_batch(self.items).data['batch_id']
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.get_status(batch_id).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AdmissionControlTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problem = Problem.objects.create(title="Problem", description="Test", difficulty="easy", points=10)
+        TestCase.objects.create(problem=self.problem, input="", expected_output="1")
+        self.submission_data = {'problem': self.problem.id, 'code': 'print(1)', 'language': 'python'}
+        
+    def submit(self):
+        return self.client.post(reverse('submission-create'), self.submission_data, format='json')
+        
+    def test_backlog_drains_as_submissions_are_judged(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['estimated_wait'], 0)
+        self.assertEqual(get_backlog(), 0)
+        
+        response = self.client.get(reverse('submission-queue'))
+        self.assertEqual(response.data['backlog'], 0)
+        self.assertGreater(response.data['average_judge_seconds'], 0)
+        
+    @override_settings(JUDGE_MAX_BACKLOG=5, JUDGE_CONCURRENCY=2, JUDGE_DEFAULT_SECONDS=3.0)
+    def test_full_backlog_is_refused_with_retry_after(self):
+        set_backlog(6)
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Two submissions over the limit at 3s each across two judges
+        self.assertEqual(response['Retry-After'], '3')
+        
+        response = self.client.post(
+            reverse('submission-batch-create'), {'submissions': [self.submission_data]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(Submission.objects.exists())
+        
+        set_backlog(4)
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['estimated_wait'], 6)
+        
+    def submit_batch(self, size):
+        return self.client.post(
+            reverse('submission-batch-create'), {'submissions': [self.submission_data] * size}, format='json'
+        )
+        
+    @override_settings(JUDGE_MAX_BACKLOG=5, JUDGE_CONCURRENCY=2, JUDGE_DEFAULT_SECONDS=3.0)
+    def test_batches_must_fit_in_the_backlog(self):
+        set_backlog(3)
+        response = self.submit_batch(3)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # One submission over the limit at 3s across two judges
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertFalse(Submission.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit_batch(2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+    @override_settings(SUBMISSION_BURST=3, SUBMISSION_RATE=0.5)
+    def test_batches_are_charged_per_submission(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.submit_batch(3).status_code, status.HTTP_201_CREATED)
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        # A batch bigger than the bucket takes a full one and leaves a debt
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.submit_batch(7).status_code, status.HTTP_201_CREATED)
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Four tokens owed plus the one needed, at half a token a second
+        self.assertEqual(response['Retry-After'], '10')
+        
+    @override_settings(JUDGE_MAX_BACKLOG=5, SUBMISSION_BURST=3, SUBMISSION_RATE=0.5, SUBMISSION_BATCH_MAX_COST=4)
+    def test_batch_cost_is_bounded(self):
+        # Bigger than the backlog limit, and charged four tokens, not twelve
+        response = self.submit_batch(12)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Submission.objects.count(), 12)
+        
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # One token owed plus the one needed, at half a token a second
+        self.assertEqual(response['Retry-After'], '4')
+        
+    @override_settings(SUBMISSION_BURST=3, SUBMISSION_RATE=0.5)
+    def test_users_are_rate_limited_independently(self):
+        for _ in range(3):
+            self.assertEqual(self.submit().status_code, status.HTTP_201_CREATED)
+        response = self.submit()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '2')
+        
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.submit().status_code, status.HTTP_201_CREATED)
+
+
+class FairSchedulingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.heavy = User.objects.create_user(username='heavy', password='testpass123')
+        self.light = User.objects.create_user(username='light', password='testpass123')
+        self.problem = Problem.objects.create(title="Problem", description="Test", difficulty="easy", points=10)
+        
+    def queue(self, user, count=1):
+        return Submission.objects.bulk_create([
+            Submission(user=user, problem=self.problem, code='print(1)', verdict='P', queue_tag=queue_tag)
+            for queue_tag in next_queue_tags(user.id, count)
+        ])
+        
+    def test_users_are_interleaved(self):
+        heavy = self.queue(self.heavy, 3)
+        light = self.queue(self.light, 2)
+        self.assertEqual([s.queue_tag for s in heavy], [0, 1, 2])
+        self.assertEqual([s.queue_tag for s in light], [0, 1])
+        
+        order = claim_next(10)
+        self.assertEqual(order, [heavy[0].id, light[0].id, heavy[1].id, light[1].id, heavy[2].id])
+        self.assertFalse(Submission.objects.filter(queue_tag__isnull=False).exists())
+        self.assertEqual(in_flight(), 5)
+        
+    def test_new_work_starts_at_the_head_of_the_queue(self):
+        self.queue(self.heavy, 5)
+        claim_next(3)
+        # The light user doesn't inherit credit for the time they were idle,
+        # and doesn't wait behind the heavy user's remaining backlog either
+        self.assertEqual(next_queue_tags(self.light.id), [3])
+        self.assertEqual(next_queue_tags(self.heavy.id, 2), [5, 6])
+        
+    @override_settings(JUDGE_DISPATCH_TIMEOUT=60)
+    def test_lost_dispatches_stop_holding_the_window(self):
+        self.queue(self.heavy, 2)
+        claim_next(2)
+        Submission.objects.update(dispatched_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(in_flight(), 0)
+        
+    def test_submissions_are_judged_through_the_dispatcher(self):
+        TestCase.objects.create(problem=self.problem, input="", expected_output="1")
+        self.client.force_authenticate(user=self.light)
+        response = self.client.post(
+            reverse('submission-create'), {'problem': self.problem.id, 'code': 'print(1)'}, format='json'
+        )
+        submission = Submission.objects.get(id=response.data['id'])
+        self.assertEqual(submission.verdict, 'AC')
+        self.assertIsNone(submission.queue_tag)
+        self.assertIsNotNone(submission.dispatched_at)
+
+
+class SubmissionStatusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problem = Problem.objects.create(title="Problem", description="Test", difficulty="easy", points=10)
+        for i in range(2):
+            TestCase.objects.create(problem=self.problem, input="", expected_output="1")
+        
+    def get_status(self, submission_id, **params):
+        return self.client.get(reverse('submission-status', kwargs={'submission_id': submission_id}), params)
+        
+    def test_judge_publishes_verdict_and_progress(self):
+        response = self.client.post(
+            reverse('submission-create'), {'problem': self.problem.id, 'code': 'print(1)'}, format='json'
+        )
+        with self.assertNumQueries(0):
+            response = self.get_status(response.data['id'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('verdict', 'done', 'passed', 'total')},
+            {'verdict': 'AC', 'done': True, 'passed': 2, 'total': 2}
+        )
+        self.assertNotIn('user_id', response.data)
+        self.assertNotIn('code', response.data)
+        
+    def test_missing_entries_are_rebuilt_from_the_database(self):
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='x', verdict='WA')
+        with self.assertNumQueries(1):
+            response = self.get_status(submission.id)
+        self.assertEqual(response.data['verdict'], 'WA')
+        self.assertTrue(response.data['done'])
+        self.assertIsNotNone(cache.get(status_key(submission.id)))
+        
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.get_status(submission.id).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_status(9999).status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_sync_view_does_not_wait(self):
+        submission = Submission.objects.create(user=self.user, problem=self.problem, code='x', verdict='P')
+        version = self.get_status(submission.id).data['version']
+        
+        # Long polls are only served under ASGI; here ?wait= would hold a worker
+        started = time.monotonic()
+        response = self.get_status(submission.id, since=version, wait=10)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.data['version'], version)
+        
+        submission.verdict = 'Judging'
+        publish_status(submission, passed=0, total=2)
+        with self.assertNumQueries(0):
+            response = self.get_status(submission.id, since=version, wait=10)
+        self.assertEqual(response.data['verdict'], 'Judging')
+        self.assertEqual(response.data['total'], 2)
+        
+        self.assertEqual(self.get_status(submission.id, wait='soon').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CodeStorageTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.problem = Problem.objects.create(
+            title="Test Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        self.code = ''.join(f'value_{i} = compute({i}, memo)\n' for i in range(200))
+        
+    def submit(self, code, user=None):
+        return Submission.objects.create(
+            user=user or self.user, problem=self.problem, code=code, language='python'
+        )
+        
+    def test_identical_code_is_stored_once(self):
+        first = self.submit(self.code)
+        second = self.submit(self.code, user=User.objects.create_user(username='other', password='x'))
+        self.assertEqual(first.code_blob_id, second.code_blob_id)
+        self.assertEqual(CodeBlob.objects.count(), 1)
+        
+        blob = CodeBlob.objects.get()
+        self.assertEqual(blob.size, len(self.code))
+        self.assertLess(len(blob.data), len(self.code) / 3)
+        
+    def test_resubmissions_are_delta_encoded(self):
+        first = self.submit(self.code)
+        edited = self.code.replace('value_100', 'result_100')
+        second = self.submit(edited)
+        
+        blob = CodeBlob.objects.get(pk=second.code_blob_id)
+        self.assertEqual(blob.base_id, first.code_blob_id)
+        self.assertEqual(blob.depth, 1)
+        self.assertLess(len(blob.data), len(CodeBlob.objects.get(pk=first.code_blob_id).data) / 4)
+        self.assertEqual(Submission.objects.get(pk=second.pk).code, edited)
+        
+    def test_code_is_loaded_lazily(self):
+        submission = self.submit(self.code)
+        
+        with CaptureQueriesContext(connection) as queries:
+            loaded = Submission.objects.get(pk=submission.pk)
+        self.assertNotIn('submissions_codeblob', queries[0]['sql'])
+        with self.assertNumQueries(1):
+            self.assertEqual(loaded.code, self.code)
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('submission-detail', kwargs={'submission_id': submission.id}))
+        self.assertEqual(response.data['code'], self.code)
+        self.assertNotIn('code_blob', response.data)
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+        settings_override = override_settings(SUBMISSION_ARCHIVE_DIR=self.archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.problem = Problem.objects.create(
+            title="Test Problem",
+            description="Test Description",
+            difficulty="easy",
+            points=10
+        )
+        
+    def submit(self, code, verdict='AC', age_days=0):
+        submission = Submission.objects.create(
+            user=self.user, problem=self.problem, code=code, language='python',
+            verdict=verdict, execution_time=0.5
+        )
+        Submission.objects.filter(pk=submission.pk).update(
+            submitted_at=timezone.now() - timedelta(days=age_days)
+        )
+        return submission
+        
+    def archive(self, **options):
+        call_command('archive_submissions', days=30, batch_size=2, stdout=StringIO(), **options)
+        
+    def test_old_judged_submissions_are_archived(self):
+        old = [self.submit(f'print({i})', verdict='WA', age_days=100) for i in range(3)]
+        pending = self.submit('print("pending")', verdict='P', age_days=100)
+        recent = self.submit('print(0)', age_days=1)
+        
+        self.archive()
+        self.assertEqual(
+            sorted(ArchivedSubmission.objects.values_list('id', flat=True)), [s.id for s in old]
+        )
+        self.assertEqual(
+            sorted(Submission.objects.values_list('id', flat=True)), [pending.id, recent.id]
+        )
+        
+        # print(0) is still used by the recent submission
+        self.assertEqual(
+            set(CodeBlob.objects.values_list('pk', flat=True)),
+            {pending.code_blob_id, recent.code_blob_id}
+        )
+        
+        # Segments are plain gzip JSONL
+        records = []
+        for name in os.listdir(self.archive_dir.name):
+            with gzip.open(os.path.join(self.archive_dir.name, name), 'rt') as segment:
+                records.extend(json.loads(line) for line in segment)
+        self.assertEqual(sorted(record['code'] for record in records), ['print(0)', 'print(1)', 'print(2)'])
+        
+    def test_detail_reads_archived_submission(self):
+        submission = self.submit('print("old")', age_days=100)
+        self.archive()
+        
+        url = reverse('submission-detail', kwargs={'submission_id': submission.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['code'], 'print("old")')
+        self.assertEqual(response.data['verdict'], 'AC')
+        self.assertEqual(response.data['problem_title'], self.problem.title)
+        
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_rebuilds_include_archived_history(self):
+        self.submit('print(1)', verdict='WA', age_days=100)
+        self.submit('print(2)', age_days=100)
+        self.submit('print(3)', verdict='TLE', age_days=1)
+        self.archive()
+        
+        call_command('rebuild_problem_stats', stdout=StringIO())
+        stats = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual(stats.verdicts, {'WA': 1, 'AC': 1, 'TLE': 1})
+        
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.problems_solved, 1)
+        
+        call_command('rebuild_percentiles', stdout=StringIO())
+        self.assertEqual(RuntimeHistogram.objects.get(problem=self.problem, metric='time').total, 1)
@@ -4,6 +4,12 @@ from . import views
 urlpatterns = [
     path('', views.SubmissionListView.as_view(), name='submission-list'),
     path('create/', views.SubmissionCreateView.as_view(), name='submission-create'),
+    path('queue/', views.SubmissionQueueView.as_view(), name='submission-queue'),
+    path('batch/', views.SubmissionBatchCreateView.as_view(), name='submission-batch-create'),
+    path('batch/<uuid:batch_id>/', views.SubmissionBatchStatusView.as_view(), name='submission-batch-status'),
     path('<int:submission_id>/', views.SubmissionDetailView.as_view(), name='submission-detail'),
+    path('<int:submission_id>/status/', views.SubmissionStatusView.as_view(), name='submission-status'),
     path('<int:submission_id>/analyze/', views.SubmissionAnalysisView.as_view(), name='submission-analyze'),
+    path('<int:submission_id>/profile/', views.SubmissionProfileView.as_view(), name='submission-profile'),
+    path('<int:submission_id>/benchmark/', views.SubmissionBenchmarkView.as_view(), name='submission-benchmark'),
 ]
\ No newline at end of file
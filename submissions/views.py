@@ -1,64 +1,228 @@
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
-from .models import Submission
-from .serializers import SubmissionSerializer, SubmissionCreateSerializer, SubmissionListSerializer
+from .admission import (
+    JudgeBacklogThrottle, SubmissionRateThrottle, estimate_wait, queue_status, record_enqueued,
+)
+from .archive import load_archived_submission
+from .live_status import get_status, public_status, publish_status, publish_statuses
+from .models import Submission, SubmissionBatch
+from .progress import UNJUDGED_VERDICTS
+from .scheduler import next_queue_tags
+from .tasks import dispatch_judging
+from .serializers import (
+    SubmissionSerializer, SubmissionCreateSerializer, SubmissionListSerializer,
+    SubmissionBatchCreateSerializer,
+)
+from utils.pagination import KeysetPagination
+from utils.serializers import project_queryset
 
 # Use a try-except block to handle the import
 try:
-    from judge.tasks import judge_submission, analyze_submission
+    from judge.tasks import (
+        analyze_submission, profile_submission, benchmark_submission,
+    )
 except ImportError:
     # Fallback for when judge app is not available
-    def judge_submission(submission_id):
+    def analyze_submission(submission_id):
         # Mock function for testing
         submission = Submission.objects.get(id=submission_id)
-        submission.verdict = 'AC'
-        submission.execution_time = 0.5
-        submission.memory_used = 10.5
+        submission.ai_feedback = "Mock AI analysis"
+        submission.ai_status = 'Completed'
         submission.save()
     
-    def analyze_submission(submission_id):
+    def profile_submission(submission_id):
         # Mock function for testing
         submission = Submission.objects.get(id=submission_id)
-        submission.ai_feedback = "Mock AI analysis"
-        submission.ai_status = 'Completed'
+        submission.profile_status = 'Completed'
+        submission.save()
+    
+    def benchmark_submission(submission_id):
+        # Mock function for testing
+        submission = Submission.objects.get(id=submission_id)
+        submission.benchmark_status = 'Completed'
         submission.save()
 
 class SubmissionListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        submissions = Submission.objects.filter(user=request.user).order_by('-submitted_at')
-        serializer = SubmissionListSerializer(submissions, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        submissions = Submission.objects.filter(user=request.user)
+        
+        problem_id = request.query_params.get('problem', '')
+        verdict = request.query_params.get('verdict', '')
+        language = request.query_params.get('language', '')
+        if problem_id:
+            if not problem_id.isdigit():
+                return Response({'problem': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+            submissions = submissions.filter(problem_id=problem_id)
+        if verdict:
+            submissions = submissions.filter(verdict=verdict)
+        if language:
+            submissions = submissions.filter(language=language)
+        
+        # Fetch only the columns the list serializer reads, joined in one
+        # query, and the ones the cursor is made of
+        paginator = KeysetPagination()
+        submissions = project_queryset(submissions, SubmissionListSerializer, request, ordering=paginator.ordering)
+        
+        page = paginator.paginate_queryset(submissions, request)
+        serializer = SubmissionListSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 class SubmissionDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, submission_id):
-        submission = get_object_or_404(Submission, id=submission_id, user=request.user)
-        serializer = SubmissionSerializer(submission)
+        submissions = project_queryset(Submission.objects.all(), SubmissionSerializer, request)
+        submission = submissions.filter(id=submission_id, user=request.user).first()
+        if submission is None:
+            # Old submissions are read back from the archive
+            submission = load_archived_submission(submission_id, request.user)
+        serializer = SubmissionSerializer(submission, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class SubmissionStatusView(APIView):
+    """Verdict and judging progress only, read from the cache the judge writes to.
+
+    Under ASGI, ?wait=N (up to SUBMISSION_STATUS_MAX_WAIT seconds) holds
+    the request until the status changes from ?since=<version>, or from what
+    it was when the request came in, so a client needs one request per
+    change (see submissions.async_views). Here a wait would hold a worker
+    thread for its whole length, so the current status comes back at once.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, submission_id):
+        try:
+            self.wait_params(request)
+        except ValueError:
+            return Response({'detail': 'since and wait must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+        entry = get_status(submission_id, request.user.id)
+        return Response(public_status(entry), status=status.HTTP_200_OK)
+    
+    @staticmethod
+    def wait_params(request):
+        params = request.query_params
+        since = int(params['since']) if params.get('since') else None
+        wait = max(0.0, min(float(params.get('wait') or 0), settings.SUBMISSION_STATUS_MAX_WAIT))
+        return since, wait
+
 class SubmissionCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    # 429 with Retry-After when the judges are saturated or the user is over their rate
+    throttle_classes = [JudgeBacklogThrottle, SubmissionRateThrottle]
     
     def post(self, request):
         serializer = SubmissionCreateSerializer(data=request.data)
         if serializer.is_valid():
-            # Create submission with pending status
+            # Create submission with pending status, in its fair-share place in the queue
             submission = serializer.save(
                 user=request.user,
-                verdict='P'  # Pending
+                verdict='P',  # Pending
+                queue_tag=next_queue_tags(request.user.id)[0],
             )
             
-            # Enqueue the judging task
-            judge_submission.delay(submission.id)
+            # Wake the dispatcher to hand it to the judge
+            publish_status(submission)
+            wait = estimate_wait()
+            record_enqueued()
+            dispatch_judging.delay()
             
-            return Response(SubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
+            data = SubmissionSerializer(submission).data
+            data['estimated_wait'] = round(wait, 1)
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SubmissionBatchCreateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [JudgeBacklogThrottle, SubmissionRateThrottle]
+    
+    @staticmethod
+    def submission_cost(request):
+        """The throttles charge for each submission in the batch, up to SUBMISSION_BATCH_MAX_COST.
+
+        Batches too big to accept cost nothing, so they get the validation error.
+        """
+        items = request.data.get('submissions') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or len(items) > settings.SUBMISSION_BATCH_MAX_SIZE:
+            return 0
+        return min(len(items), settings.SUBMISSION_BATCH_MAX_COST)
+    
+    def post(self, request):
+        serializer = SubmissionBatchCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = serializer.validated_data['submissions']
+        with transaction.atomic():
+            batch = SubmissionBatch.objects.create(user=request.user, size=len(items))
+            # The batch queues behind the user's earlier work, interleaved with everyone else's
+            queue_tags = next_queue_tags(request.user.id, len(items))
+            submissions = Submission.objects.bulk_create([
+                Submission(
+                    user=request.user,
+                    problem_id=item['problem'],
+                    code=item['code'],
+                    language=item['language'],
+                    verdict='P',  # Pending
+                    batch=batch,
+                    queue_tag=queue_tag,
+                )
+                for item, queue_tag in zip(items, queue_tags)
+            ])
+            submission_ids = [submission.id for submission in submissions]
+            
+            # Wake the dispatcher once it can see the rows
+            def enqueue():
+                publish_statuses(submissions)
+                record_enqueued(len(submission_ids))
+                dispatch_judging.delay()
+            
+            wait = estimate_wait()
+            transaction.on_commit(enqueue)
+        
+        return Response({
+            'batch_id': batch.id,
+            'size': batch.size,
+            'submissions': submission_ids,
+            'estimated_wait': round(wait, 1),
+        }, status=status.HTTP_201_CREATED)
+
+class SubmissionBatchStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, batch_id):
+        batch = get_object_or_404(SubmissionBatch, id=batch_id, user=request.user)
+        # One grouped count covers the whole batch
+        verdicts = dict(
+            batch.submissions.values_list('verdict').annotate(count=Count('id')).order_by()
+        )
+        return Response(self.summarize(batch, verdicts), status=status.HTTP_200_OK)
+    
+    @staticmethod
+    def summarize(batch, verdicts):
+        pending = sum(verdicts.get(verdict, 0) for verdict in UNJUDGED_VERDICTS)
+        return {
+            'batch_id': batch.id,
+            'size': batch.size,
+            'completed': sum(verdicts.values()) - pending,
+            'pending': pending,
+            'done': pending == 0,
+            'verdicts': {verdict: count for verdict, count in verdicts.items() if verdict not in UNJUDGED_VERDICTS},
+        }
+
+class SubmissionQueueView(APIView):
+    """Current judge backlog and the expected wait for a new submission"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        return Response(queue_status(), status=status.HTTP_200_OK)
+
 class SubmissionAnalysisView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
@@ -72,4 +236,63 @@ class SubmissionAnalysisView(APIView):
         # Enqueue the AI analysis task
         analyze_submission.delay(submission.id)
         
-        return Response(SubmissionSerializer(submission).data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(SubmissionSerializer(submission).data, status=status.HTTP_200_OK)
+
+class SubmissionProfileView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, submission_id):
+        submission = get_object_or_404(
+            Submission.objects.select_related('problem'),
+            id=submission_id,
+            user=request.user
+        )
+        
+        # Only accepted programs are worth profiling
+        if submission.verdict != 'AC':
+            return Response(
+                {'detail': 'Only accepted submissions can be profiled.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        problem = submission.problem
+        if not problem.profile_generator and not problem.profile_inputs.exists():
+            return Response(
+                {'detail': 'This problem does not provide profiling inputs.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        submission.profile_status = 'Processing'
+        submission.save(update_fields=['profile_status'])
+        
+        # Enqueue the profiling run
+        profile_submission.delay(submission.id)
+        
+        return Response(SubmissionSerializer(submission).data, status=status.HTTP_200_OK)
+
+
+class SubmissionBenchmarkView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, submission_id):
+        submission = get_object_or_404(Submission, id=submission_id, user=request.user)
+        
+        if submission.verdict != 'AC':
+            return Response(
+                {'detail': 'Only accepted submissions can be benchmarked.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not submission.problem.test_cases.filter(is_benchmark=True).exists():
+            return Response(
+                {'detail': 'This problem has no benchmark tests.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        submission.benchmark_status = 'Queued'
+        submission.save(update_fields=['benchmark_status'])
+        
+        # Runs on the dedicated benchmark queue, see CELERY_TASK_ROUTES
+        benchmark_submission.delay(submission.id)
+        
+        return Response(SubmissionSerializer(submission).data, status=status.HTTP_200_OK)
@@ -0,0 +1,28 @@
+"""Async version of the leaderboard, routed by BenchCoder.urls_async"""
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.async_views import async_api_view
+from .models import User
+from .views import leaderboard_body, leaderboard_params, read_leaderboard
+
+
+@async_api_view
+async def leaderboard(request):
+    try:
+        limit, radius = leaderboard_params(request)
+    except ValueError:
+        return Response({'detail': 'limit and radius must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The Redis client blocks, and doesn't touch the database, so it can
+    # run on any thread
+    top, position, neighbours = await sync_to_async(read_leaderboard, thread_sensitive=False)(
+        request.user.id, limit, radius
+    )
+    user_ids = {user_id for user_id, _ in top + neighbours}
+    usernames = {
+        user_id: username
+        async for user_id, username in User.objects.filter(id__in=user_ids).values_list('id', 'username')
+    }
+    return Response(leaderboard_body(top, position, neighbours, radius, usernames), status=status.HTTP_200_OK)
@@ -0,0 +1,198 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+# The only user fields loaded on a cache hit; anything else is fetched from
+# the database the first time it is read
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'token_version')
+
+
+def tokens_for_user(user):
+    """Refresh token (and through it access tokens) tagged with the user's token version"""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def user_version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def _user_values(user, version):
+    values = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    values['cache_version'] = version
+    if api_settings.CHECK_REVOKE_TOKEN:
+        # Only the digest that tokens carry, never the password hash itself
+        values['password_digest'] = get_md5_hash_password(user.password)
+    return values
+
+
+def _current(found, user_id):
+    """The cached values of user_id from a get_many() result if they are current, and the current version"""
+    version = found.get(user_version_key(user_id))
+    values = found.get(user_cache_key(user_id))
+    if version is None or values is None or values.get('cache_version') != version:
+        return None, version
+    return values, version
+
+
+def get_user_version(user_id):
+    """Version of the user's cached entry; nanosecond timestamps, as for the catalog"""
+    try:
+        version = cache.get(user_version_key(user_id))
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(user_version_key(user_id), version, None):
+                version = cache.get(user_version_key(user_id)) or version
+        return version
+    except Exception as e:
+        logger.warning(f"Auth cache version unavailable: {e}")
+        return None
+
+
+async def aget_user_version(user_id):
+    try:
+        version = await cache.aget(user_version_key(user_id))
+        if version is None:
+            version = time.time_ns()
+            if not await cache.aadd(user_version_key(user_id), version, None):
+                version = await cache.aget(user_version_key(user_id)) or version
+        return version
+    except Exception as e:
+        logger.warning(f"Auth cache version unavailable: {e}")
+        return None
+
+
+def cache_user(user, version=None):
+    """Cache the user's fields under the version read before they were loaded.
+
+    If the user changed in between, the version has moved on and the entry
+    is never served.
+    """
+    version = version or get_user_version(user.pk)
+    if version is None:
+        return
+    try:
+        cache.set(user_cache_key(user.pk), _user_values(user, version), settings.AUTH_USER_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Auth cache write failed: {e}")
+
+
+def cached_user(values):
+    """User instance with the cached fields loaded and the rest deferred"""
+    # from_db() expects values in model field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db('default', names, [values[name] for name in names])
+
+
+async def acache_user(user, version=None):
+    version = version or await aget_user_version(user.pk)
+    if version is None:
+        return
+    try:
+        await cache.aset(user_cache_key(user.pk), _user_values(user, version), settings.AUTH_USER_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Auth cache write failed: {e}")
+
+
+def invalidate_cached_user(user_id):
+    try:
+        cache.set(user_version_key(user_id), time.time_ns(), None)
+        cache.delete(user_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Auth cache invalidation failed: {e}")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user from the cache.
+
+    Cache entries hold CACHED_USER_FIELDS and are tagged with the user's
+    cache version, which moves whenever the user is saved or deleted, so
+    deactivation and revocation apply immediately, even against a request
+    that loaded the user just before the change. Tokens whose token_version
+    claim is behind the user's are rejected, and with CHECK_REVOKE_TOKEN on,
+    so are tokens issued before the last password change.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            found = cache.get_many([user_cache_key(user_id), user_version_key(user_id)])
+        except Exception as e:
+            logger.warning(f"Auth cache read failed: {e}")
+            found = {}
+        values, version = _current(found, user_id)
+
+        if values is None:
+            # Read before loading, so a change made meanwhile outdates the entry
+            version = version or get_user_version(user_id)
+            user = super().get_user(validated_token)
+            cache_user(user, version)
+            values = _user_values(user, version)
+        else:
+            user = cached_user(values)
+        return self.check_user(user, values, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views; the user is looked up without blocking"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            found = await cache.aget_many([user_cache_key(user_id), user_version_key(user_id)])
+        except Exception as e:
+            logger.warning(f"Auth cache read failed: {e}")
+            found = {}
+        values, version = _current(found, user_id)
+
+        if values is None:
+            version = version or await aget_user_version(user_id)
+            try:
+                user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                raise AuthenticationFailed("User not found", code='user_not_found')
+            await acache_user(user, version)
+            values = _user_values(user, version)
+        else:
+            user = cached_user(values)
+        return self.check_user(user, values, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed("Token contained no recognizable user identification", code='token_not_valid')
+
+    def check_user(self, user, values, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed("Token has been revoked", code='token_revoked')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != values['password_digest']:
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
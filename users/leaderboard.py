@@ -0,0 +1,95 @@
+import bisect
+import threading
+
+from django.conf import settings
+
+LEADERBOARD_KEY = 'leaderboard:score'
+
+
+class RedisLeaderboard:
+    """Scores kept in a Redis sorted set; rank lookups are O(log n)"""
+
+    def __init__(self, client, key=LEADERBOARD_KEY):
+        self.client = client
+        self.key = key
+
+    def update(self, user_id, score):
+        self.client.zadd(self.key, {user_id: score})
+
+    def top(self, count):
+        entries = self.client.zrevrange(self.key, 0, count - 1, withscores=True)
+        return [(int(member), int(score)) for member, score in entries]
+
+    def rank(self, user_id):
+        """Zero-based position of the user, or None if they have no score"""
+        return self.client.zrevrank(self.key, user_id)
+
+    def range(self, start, stop):
+        entries = self.client.zrevrange(self.key, max(start, 0), stop, withscores=True)
+        return [(int(member), int(score)) for member, score in entries]
+
+    def replace(self, scores, batch_size=5000):
+        """Swap in a freshly computed set of scores in one atomic rename"""
+        staging_key = f'{self.key}:rebuild'
+        self.client.delete(staging_key)
+        items = list(scores.items())
+        for start in range(0, len(items), batch_size):
+            self.client.zadd(staging_key, dict(items[start:start + batch_size]))
+        if items:
+            self.client.rename(staging_key, self.key)
+        else:
+            self.client.delete(self.key)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+class MemoryLeaderboard:
+    """Process-local equivalent of RedisLeaderboard for tests and development"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.scores = {}
+        self.order = []  # sorted (-score, user_id)
+
+    def update(self, user_id, score):
+        with self.lock:
+            if user_id in self.scores:
+                self.order.remove((-self.scores[user_id], user_id))
+            self.scores[user_id] = score
+            bisect.insort(self.order, (-score, user_id))
+
+    def top(self, count):
+        return self.range(0, count - 1)
+
+    def rank(self, user_id):
+        if user_id not in self.scores:
+            return None
+        return bisect.bisect_left(self.order, (-self.scores[user_id], user_id))
+
+    def range(self, start, stop):
+        return [(user_id, -score) for score, user_id in self.order[max(start, 0):stop + 1]]
+
+    def replace(self, scores):
+        with self.lock:
+            self.scores = dict(scores)
+            self.order = sorted((-score, user_id) for user_id, score in scores.items())
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    global _leaderboard
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            if settings.LEADERBOARD_BACKEND == 'redis':
+                import redis
+                _leaderboard = RedisLeaderboard(redis.Redis.from_url(settings.REDIS_URL))
+            else:
+                _leaderboard = MemoryLeaderboard()
+        return _leaderboard
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Min, When
+
+from problems.cache import bump_user_version
+from problems.models import Problem
+from submissions.models import ArchivedSubmission, Submission, UserProblemStatus
+from submissions.progress import UNJUDGED_VERDICTS
+from users.leaderboard import get_leaderboard
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute scores, solved/attempted statuses and the leaderboard from submission history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        points = dict(Problem.objects.values_list('id', 'points'))
+
+        # A grouped query over live and archived submissions gives every
+        # judged (user, problem) pair with the time of its first AC, or None
+        # if it was never solved
+        first_solves = {}
+        for model in (Submission, ArchivedSubmission):
+            rows = (
+                model.objects.exclude(verdict__in=UNJUDGED_VERDICTS)
+                .values_list('user_id', 'problem_id')
+                .annotate(solved_at=Min(Case(When(verdict='AC', then='submitted_at'))))
+                .order_by()
+            )
+            for user_id, problem_id, solved_at in rows.iterator(chunk_size=batch_size):
+                earlier = first_solves.get((user_id, problem_id))
+                if earlier is not None and (solved_at is None or earlier < solved_at):
+                    solved_at = earlier
+                first_solves[(user_id, problem_id)] = solved_at
+
+        scores = defaultdict(int)
+        solved = defaultdict(int)
+        with transaction.atomic():
+            # Their cached per-problem statuses are outdated once the rows are replaced
+            affected = set(UserProblemStatus.objects.values_list('user_id', flat=True).distinct())
+            affected.update(user_id for user_id, _ in first_solves)
+            UserProblemStatus.objects.all().delete()
+            statuses = []
+            for (user_id, problem_id), solved_at in first_solves.items():
+                if solved_at is not None:
+                    scores[user_id] += points.get(problem_id, 0)
+                    solved[user_id] += 1
+                statuses.append(UserProblemStatus(user_id=user_id, problem_id=problem_id, solved_at=solved_at))
+                if len(statuses) >= batch_size:
+                    UserProblemStatus.objects.bulk_create(statuses)
+                    statuses = []
+            UserProblemStatus.objects.bulk_create(statuses)
+
+            User.objects.update(score=0, problems_solved=0)
+            users = [
+                User(id=user_id, score=scores[user_id], problems_solved=solved[user_id])
+                for user_id in scores
+            ]
+            User.objects.bulk_update(users, ['score', 'problems_solved'], batch_size=batch_size)
+
+        for user_id in affected:
+            bump_user_version(user_id)
+        get_leaderboard().replace(dict(scores))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt leaderboard for {len(scores)} users"))
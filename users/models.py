@@ -5,6 +5,21 @@ from django.contrib.auth.models import AbstractUser
 class User(AbstractUser):
     score = models.IntegerField(default=0)
     problems_solved = models.IntegerField(default=0)
+    # Carried in issued tokens; bumping it revokes every outstanding token
+    token_version = models.PositiveIntegerField(default=0)
+    
+    def revoke_tokens(self):
+        self.token_version = models.F('token_version') + 1
+        self.save(update_fields=['token_version'])
+        self.refresh_from_db(fields=['token_version'])
+    
+    def refresh_from_db(self, using=None, fields=None):
+        # Users resolved from the auth cache only carry a few fields; load
+        # the rest together on first use instead of one query per field
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields)
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
@@ -1,7 +1,20 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.settings import api_settings
+from problems.cache import get_user_state
+from problems.models import Problem
+from submissions.models import Submission, UserProblemStatus
+from submissions.progress import record_solve
+from .authentication import cache_user, get_user_version
+from .leaderboard import get_leaderboard
 from .models import User
 
 class UserAuthenticationTests(APITestCase):
@@ -34,4 +47,149 @@ class UserAuthenticationTests(APITestCase):
         response = self.client.post(self.login_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue('access' in response.data)
-        self.assertTrue('refresh' in response.data)
\ No newline at end of file
+        self.assertTrue('refresh' in response.data)
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        get_leaderboard().clear()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(5)
+        ]
+        self.easy = Problem.objects.create(title="Easy", description="x", difficulty="easy", points=10)
+        self.hard = Problem.objects.create(title="Hard", description="x", difficulty="hard", points=30)
+        
+    def accept(self, user, problem):
+        submission = Submission.objects.create(user=user, problem=problem, code='x', verdict='AC')
+        with self.captureOnCommitCallbacks(execute=True):
+            return record_solve(submission)
+        
+    def test_points_are_awarded_on_first_ac_only(self):
+        self.assertTrue(self.accept(self.users[0], self.easy))
+        self.assertFalse(self.accept(self.users[0], self.easy))
+        self.assertTrue(self.accept(self.users[0], self.hard))
+        
+        user = User.objects.get(pk=self.users[0].pk)
+        self.assertEqual((user.score, user.problems_solved), (40, 2))
+        self.assertEqual(get_leaderboard().top(1), [(user.id, 40)])
+        
+    def test_leaderboard_top_rank_and_neighbours(self):
+        for user, problems in zip(self.users, ([], [self.easy], [self.hard], [self.easy, self.hard], [])):
+            for problem in problems:
+                self.accept(user, problem)
+        
+        self.client.force_authenticate(user=self.users[1])
+        response = self.client.get(reverse('leaderboard'), {'limit': 2, 'radius': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['username'], row['score']) for row in response.data['top']],
+            [('user3', 40), ('user2', 30)]
+        )
+        self.assertEqual(response.data['rank'], 3)
+        self.assertEqual(
+            [(row['rank'], row['username']) for row in response.data['neighbours']],
+            [(2, 'user2'), (3, 'user1')]
+        )
+        
+    def test_rebuild_from_history(self):
+        Submission.objects.create(user=self.users[0], problem=self.easy, code='x', verdict='AC')
+        Submission.objects.create(user=self.users[0], problem=self.easy, code='x', verdict='AC')
+        Submission.objects.create(user=self.users[1], problem=self.hard, code='x', verdict='WA')
+        User.objects.filter(pk=self.users[1].pk).update(score=99)
+        # A status no submission backs any more
+        UserProblemStatus.objects.create(user=self.users[2], problem=self.easy)
+        versions = [get_user_state(user.id)['version'] for user in self.users]
+        
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        
+        # Everyone whose statuses changed has their cached progress outdated
+        self.assertEqual(
+            [get_user_state(user.id)['version'] != version for user, version in zip(self.users, versions)],
+            [True, True, True, False, False]
+        )
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).score, 10)
+        self.assertEqual(User.objects.get(pk=self.users[1].pk).score, 0)
+        self.assertEqual(UserProblemStatus.objects.filter(solved_at__isnull=False).count(), 1)
+        self.assertEqual(get_leaderboard().top(5), [(self.users[0].id, 10)])
+
+
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpass123', score=40
+        )
+        
+    def login(self, password='testpass123'):
+        self.client.credentials()
+        response = self.client.post(reverse('login'), {'username': 'testuser', 'password': password}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response
+        
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q for q in queries if 'users_user' in q['sql']]
+        
+    def test_repeat_requests_skip_user_lookup(self):
+        self.login()
+        self.client.get(reverse('problem-list'))
+        response, queries = self.user_queries(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        
+    def test_uncached_fields_load_in_one_query(self):
+        self.login()
+        self.client.get(reverse('problem-list'))
+        response, queries = self.user_queries(reverse('profile'))
+        self.assertEqual(response.data['email'], 'test@example.com')
+        self.assertEqual(response.data['score'], 40)
+        self.assertEqual(len(queries), 1)
+        
+    def test_deactivation_applies_immediately(self):
+        self.login()
+        self.client.get(reverse('problem-list'))
+        
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_revoked_tokens_are_rejected(self):
+        self.login()
+        self.client.get(reverse('problem-list'))
+        
+        self.user.revoke_tokens()
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.login()
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+    def test_stale_cache_write_does_not_undo_deactivation(self):
+        self.login()
+        # A request that loaded the user just before the deactivation, and caches it after
+        version = get_user_version(self.user.id)
+        stale = User.objects.get(id=self.user.id)
+        
+        self.user.is_active = False
+        self.user.save()
+        cache_user(stale, version)
+        response = self.client.get(reverse('problem-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_password_change_revokes_cached_tokens(self):
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.login()
+            response = self.client.get(reverse('problem-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            
+            self.user.set_password('newpass456')
+            self.user.save()
+            response = self.client.get(reverse('problem-list'))
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            
+            self.login(password='newpass456')
+            response = self.client.get(reverse('problem-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
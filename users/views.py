@@ -2,8 +2,10 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import login
+from .authentication import tokens_for_user
+from .leaderboard import get_leaderboard
 from .models import User
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 
@@ -13,7 +15,7 @@ def register_user(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'user': UserProfileSerializer(user).data,
@@ -29,7 +31,7 @@ def login_user(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'access': str(refresh.access_token),
@@ -42,4 +44,45 @@ def login_user(request):
 @permission_classes([IsAuthenticated])
 def get_user_profile(request):
     serializer = UserProfileSerializer(request.user)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leaderboard(request):
+    """Top scores plus the caller's own rank and the users around it"""
+    try:
+        limit, radius = leaderboard_params(request)
+    except ValueError:
+        return Response({'detail': 'limit and radius must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    top, position, neighbours = read_leaderboard(request.user.id, limit, radius)
+    # Resolve usernames for just the users on show
+    user_ids = {user_id for user_id, _ in top + neighbours}
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    return Response(leaderboard_body(top, position, neighbours, radius, usernames), status=status.HTTP_200_OK)
+
+def leaderboard_params(request):
+    """limit and radius from the query string, clamped; raises ValueError if not integers"""
+    limit = max(1, min(int(request.query_params.get('limit', 10)), settings.LEADERBOARD_MAX_SIZE))
+    radius = max(0, min(int(request.query_params.get('radius', 2)), settings.LEADERBOARD_MAX_SIZE))
+    return limit, radius
+
+def read_leaderboard(user_id, limit, radius):
+    board = get_leaderboard()
+    top = board.top(limit)
+    position = board.rank(user_id)
+    neighbours = board.range(position - radius, position + radius) if position is not None else []
+    return top, position, neighbours
+
+def leaderboard_body(top, position, neighbours, radius, usernames):
+    def entries(rows, first_rank):
+        return [
+            {'rank': first_rank + offset, 'user_id': user_id, 'username': usernames.get(user_id), 'score': score}
+            for offset, (user_id, score) in enumerate(rows)
+        ]
+
+    return {
+        'top': entries(top, 1),
+        'rank': position + 1 if position is not None else None,
+        'neighbours': entries(neighbours, max(position - radius, 0) + 1) if position is not None else [],
+    }
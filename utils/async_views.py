@@ -0,0 +1,63 @@
+import functools
+
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from users.authentication import CachedJWTAuthentication
+
+
+def finalize(response):
+    """Render a DRF Response the way APIView would, for views outside DRF"""
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    return response.render()
+
+
+def async_api_view(view):
+    """Serve an authenticated, read-only async view with DRF's request and responses.
+
+    DRF's APIView only runs synchronously, so this does the parts the hot
+    read endpoints need: JWT authentication without blocking, the
+    IsAuthenticated check, and rendering the view's Response to JSON. The
+    view gets a DRF Request, so query_params and the sync helpers that take
+    a request work unchanged.
+    """
+    authenticator = CachedJWTAuthentication()
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return finalize(Response(
+                {'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED
+            ))
+
+        try:
+            result = await authenticator.aauthenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            data = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            return finalize(Response(data, status=e.status_code, headers={
+                'WWW-Authenticate': authenticator.authenticate_header(request),
+            }))
+        if result is None:
+            return finalize(Response(
+                {'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED,
+                headers={'WWW-Authenticate': authenticator.authenticate_header(request)}
+            ))
+
+        drf_request = Request(request)
+        drf_request.user, drf_request.auth = result
+        try:
+            response = await view(drf_request, *args, **kwargs)
+        except Exception as exc:
+            # Http404 and APIExceptions, such as pagination's NotFound, get the
+            # same JSON error responses as the sync views
+            response = exception_handler(exc, {'request': drf_request, 'view': None})
+            if response is None:
+                raise
+        return finalize(response)
+
+    return wrapper
@@ -1,16 +1,249 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+logger = logging.getLogger(__name__)
+
+def estimate_count(queryset):
+    """Row count the Postgres planner expects the queryset to return"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+class CachedCountPaginator(Paginator):
+    """Paginator that avoids running COUNT(*) on every page request.
+
+    Counts are cached per query signature for PAGINATION_COUNT_CACHE_TIMEOUT
+    seconds, and per count_version when the caller has one, so a count never
+    outlives the data it was taken from. On Postgres, querysets the planner
+    expects to return at least PAGINATION_ESTIMATE_THRESHOLD rows use that
+    estimate instead of an exact count, since nobody pages through that many
+    rows to check. An estimate is only reported: page numbers past it are
+    still served while they have rows.
+    """
+
+    def __init__(self, *args, count_version=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_version = count_version
+
+    @cached_property
+    def counted(self):
+        """The count and whether it is an estimate"""
+        if not isinstance(self.object_list, QuerySet):
+            return super().count, False
+
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+        key = f'pagination:count:{self.count_version}:{digest}'
+        try:
+            counted = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Count cache read failed: {e}")
+            counted = None
+
+        if counted is None:
+            counted = self.estimate_or_count()
+            try:
+                cache.set(key, counted, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Count cache write failed: {e}")
+        return tuple(counted)
+
+    @property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def approximate(self):
+        return self.counted[1]
+
+    def estimate_or_count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            if estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+                return estimate, True
+        return queryset.count(), False
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        # The real last page may lie past the estimated one, so only the
+        # lower bound is checked here and page() finds the end
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        if not self.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # One extra row tells whether there is a next page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return ApproximatePage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+class ApproximatePage(Page):
+    """Page of a CachedCountPaginator whose count is an estimate"""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
 
 class CustomPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size = 10
     page_size_query_param = 'page_size'   # allows ?page_size=20
     max_page_size = 50
 
+    def __init__(self, count_version=None):
+        # Views whose data carries a version key their cached counts by it
+        self.django_paginator_class = partial(CachedCountPaginator, count_version=count_version)
+
     def get_paginated_response(self, data):
+        # An estimate can fall short of the pages actually served
+        total_pages = max(self.page.paginator.num_pages, self.page.number + self.page.has_next())
         return Response({
             'total_count': self.page.paginator.count,
-            'total_pages': self.page.paginator.num_pages,
+            'total_count_approximate': self.page.paginator.approximate,
+            'total_pages': total_pages,
             'current_page': self.page.number,
             'page_size': self.page.paginator.per_page,
             'results': data
         })
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks on a unique composite ordering.
+
+    Each page is a single indexed range scan starting right after the last
+    row of the previous page, so the cost does not grow with how deep the
+    client has paged. The ordering must end in a unique field.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-submitted_at', '-id')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        position = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def seek_filter(self, position):
+        # (a, b) after (x, y) expands to: a > x OR (a = x AND b > y)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+
+        # Fetch one extra row to learn whether another page exists
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'page_size': self.page_size,
+            'results': data
+        })
+
+
+class CountlessCursorPagination(KeysetPagination):
+    """Keyset pagination that keeps the CustomPagination response shape.
+
+    Never counts: total_count, total_count_approximate, total_pages and
+    current_page are null, and
+    clients follow next instead of asking for page numbers.
+    """
+    page_size = CustomPagination.page_size
+    max_page_size = CustomPagination.max_page_size
+    ordering = ('id',)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'total_count': None,
+            'total_count_approximate': None,
+            'total_pages': None,
+            'current_page': None,
+            'page_size': self.page_size,
+            'next': self.get_next_link(),
+            'results': data
+        })
@@ -0,0 +1,77 @@
+from django.core.exceptions import FieldDoesNotExist
+
+
+def parse_field_list(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin honouring ?fields= and ?exclude= on GET requests.
+
+    Meta.default_fields narrows the output when ?fields= is not given; any
+    declared field can still be asked for by name. Meta.field_sources lists
+    the model fields a computed field reads, so project_queryset() keeps
+    them in the SELECT.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+
+        params = request.query_params
+        if params.get('fields'):
+            selected = parse_field_list(params['fields']) & set(fields)
+        else:
+            selected = set(getattr(self.Meta, 'default_fields', fields))
+        if params.get('exclude'):
+            selected -= parse_field_list(params['exclude'])
+
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+def project_queryset(queryset, serializer_class, request, ordering=()):
+    """Load only the columns the serializer fields selected by request read.
+
+    Related fields reached through a dotted source, and reverse one-to-one
+    relations, are joined with select_related. Annotations and other
+    reverse relations are left alone. The fields in ordering, given as to
+    order_by(), are always loaded, so a paginator can build its cursor from
+    the rows without a query each.
+    """
+    model = queryset.model
+    serializer = serializer_class(context={'request': request})
+    sources = getattr(serializer_class.Meta, 'field_sources', {})
+
+    columns = {model._meta.pk.name} | {name.lstrip('-') for name in ordering}
+    related = set()
+    for name, field in serializer.fields.items():
+        if name in sources:
+            paths = sources[name]
+        elif field.source == '*':
+            # A computed field that didn't declare its sources could read
+            # anything, so don't risk a query per row
+            return queryset
+        else:
+            paths = [field.source.replace('.', '__')]
+
+        for path in paths:
+            try:
+                model_field = model._meta.get_field(path.split('__')[0])
+            except FieldDoesNotExist:
+                continue
+            if not model_field.concrete:
+                # The row on the far side of a reverse one-to-one can still
+                # be joined in
+                if model_field.one_to_one:
+                    related.add(model_field.name)
+                continue
+            columns.add(path)
+            if '__' in path:
+                related.add(path.split('__')[0])
+                columns.add(path.split('__')[0])
+
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))